@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from utils import setup_logger, LLMLoader, PromptCategory, PromptLoader
-from typing import Any
+from typing import Any, Optional
 
 class BaseAgent(ABC):
     """
@@ -8,6 +8,10 @@ class BaseAgent(ABC):
     Provides common functionality and defines the interface that all agents must implement.
     """
 
+    # Usage accounting tags, subclasses override stage
+    component = "agent"
+    stage = None
+
     def __init__(
             self, 
             name: str,
@@ -43,6 +47,7 @@ class BaseAgent(ABC):
             category: PromptCategory,
             system_prompt_name: str,
             user_prompt_name: str,
+            stage: Optional[str] = None,
             **prompt_kwargs
     ) -> str:
         """
@@ -52,6 +57,7 @@ class BaseAgent(ABC):
         :param category: Prompt category
         :param system_prompt_name: Name of the system prompt
         :param user_prompt_name: Name of the user prompt
+        :param stage: Optional stage tag for usage accounting, defaults to the class stage
         :param prompt_kwargs: Additional keyword arguments for prompt formatting
         :return: Processing result
         """
@@ -77,7 +83,9 @@ class BaseAgent(ABC):
                     system_prompt=system_prompt,
                     user_prompt=user_prompt,
                     model_name=self.model_name,
-                    temperature=self.temperature 
+                    temperature=self.temperature,
+                    component=self.component,
+                    stage=stage or self.stage
                 )
 
             except Exception as e:
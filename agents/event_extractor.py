@@ -4,6 +4,8 @@ from utils import PromptCategory
 class EventExtractorAgent(BaseAgent):
     """EventExtractorAgent is responsible for extracting key events and information from news articles."""
 
+    stage = "event_extractor"
+
     def __init__(self):
         """Initialize the EventExtractorAgent."""
         super().__init__(
@@ -4,6 +4,8 @@ from utils import PromptCategory
 class HistoryAnalyzerAgent(BaseAgent):
     """HistoryAnalyzerAgent provides historical analysis of events."""
 
+    stage = "history_analyzer"
+
     def __init__(self):
         """Initialize the HistoryAnalyzerAgent."""
 
@@ -7,6 +7,8 @@ from utils import PromptCategory
 class InfoSearchAgent(BaseAgent):
     """InforSearchAgent handles supplementary information search using Perplexity."""
 
+    stage = "info_search"
+
     def __init__(self):
         """Initialize the InfoSearchAgent."""
 
@@ -7,6 +7,8 @@ from utils import PromptCategory
 class NewsSearchAgent(BaseAgent):
     """NewsSearchAgent handles news search using Perplexity."""
 
+    stage = "news_search"
+
     def __init__(self):
         """Initialize the NewsSearchAgent."""
 
@@ -4,6 +4,8 @@ from utils import PromptCategory
 class ReasoningAgent(BaseAgent):
     """ReasoningAgent provides direct LLM reasoning and responses."""
 
+    stage = "reasoning"
+
     def __init__(self):
         """Initialize the ReasoningAgent."""
 
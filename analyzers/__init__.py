@@ -1,5 +1,20 @@
-from analyzers.dual_engine_analyzer import DualEngineAnalyzer
+from analyzers.analysis_catalog import AnalysisCatalog
+from analyzers.analysis_history import AnalysisHistory
+from analyzers.output_layout import OutputLayout
+
+
+def __getattr__(name):
+    # The analyzer loads the executor and its LLM clients, so it is imported on first use
+    # and the history commands only import the catalog
+    if name == 'DualEngineAnalyzer':
+        from analyzers.dual_engine_analyzer import DualEngineAnalyzer
+        return DualEngineAnalyzer
+    raise AttributeError(f"module 'analyzers' has no attribute '{name}'")
+
 
 __all__ = [
-    'DualEngineAnalyzer'
-]
\ No newline at end of file
+    'DualEngineAnalyzer',
+    'AnalysisCatalog',
+    'AnalysisHistory',
+    'OutputLayout'
+]
@@ -0,0 +1,415 @@
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from utils import setup_logger
+
+# Listing sort keys and the columns they order by
+SORT_COLUMNS = {
+    "date": "created_at",
+    "nodes": "total_nodes",
+    "tokens": "total_tokens",
+    "cost": "cost",
+    "query": "query"
+}
+
+COLUMNS = (
+    "analysis_id", "query", "created_at", "completed_at", "platform", "model",
+    "total_nodes", "max_depth", "llm_calls", "total_tokens", "cost",
+    "directory", "result_file", "mermaid_file", "viewer_file", "indexed_at"
+)
+
+# Columns of the full-text index and their bm25 weights, a match in the query ranks highest
+TEXT_COLUMNS = ("query", "optimized_query", "summaries", "response")
+TEXT_WEIGHTS = (10.0, 5.0, 1.0, 2.0)
+
+# Quoted phrases or single words of a search, words may end with * to match a prefix
+SEARCH_TERM_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+class AnalysisCatalog:
+    """
+    AnalysisCatalog indexes saved analyses in SQLite, so listing and looking up
+    analyses reads one table instead of every result file in the output directory.
+
+    Each row holds the identifiers, query, timestamps, model, headline statistics and
+    file paths of one analysis. An FTS5 table with the same rowids indexes the query,
+    optimized query, node summaries and final response for search(). The result files
+    stay the source of truth: rows are written after the result file, and
+    AnalysisHistory.reindex() rebuilds both tables from disk.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize AnalysisCatalog.
+
+        :param path: Path of the SQLite database file
+        """
+
+        self.logger = setup_logger("AnalysisCatalog")
+        self.path = path
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    analysis_id TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    created_at TEXT,
+                    completed_at TEXT,
+                    platform TEXT,
+                    model TEXT,
+                    total_nodes INTEGER,
+                    max_depth INTEGER,
+                    llm_calls INTEGER,
+                    total_tokens INTEGER,
+                    cost REAL,
+                    directory TEXT,
+                    result_file TEXT NOT NULL,
+                    mermaid_file TEXT,
+                    viewer_file TEXT,
+                    indexed_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS analyses_created_at ON analyses (created_at)")
+
+        # Readers keep working while an analysis is saved or the catalog is rebuilt
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+
+        # SQLite builds without FTS5 keep the catalog but cannot search it. Analyses
+        # cataloged before the text index existed need a reindex to become searchable.
+        self.needs_reindex = False
+        try:
+            with self._connect() as conn:
+                exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'analysis_text'").fetchone()
+                if not exists:
+                    self.needs_reindex = conn.execute("SELECT 1 FROM analyses LIMIT 1").fetchone() is not None
+                conn.execute(f"""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS analysis_text USING fts5(
+                        {', '.join(TEXT_COLUMNS)}, tokenize = 'unicode61 remove_diacritics 2'
+                    )
+                """)
+            self.search_enabled = True
+        except sqlite3.OperationalError as e:
+            self.logger.warning(f"[INIT] Full-text search disabled, SQLite has no FTS5: {str(e)}")
+            self.search_enabled = False
+
+        self.logger.debug(f"[INIT] AnalysisCatalog initialized at {path}")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a short-lived connection that commits on success, so any process can use the catalog."""
+
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def entry(result: Dict[str, Any], result_file: str) -> Tuple:
+        """
+        Build the catalog row of a saved analysis result.
+
+        :param result: Analysis result as saved by DualEngineAnalyzer
+        :param result_file: Path of the result file
+        :return: Row values in COLUMNS order
+        """
+
+        stats = result.get("stats") or {}
+        totals = (stats.get("llm_usage") or {}).get("totals") or {}
+        info = result.get("execution_info") or {}
+        visualization = result.get("visualization") or {}
+        return (
+            result.get("analysis_id") or os.path.splitext(os.path.basename(result_file))[0],
+            result.get("query", ""),
+            result.get("timestamp"),
+            (result.get("generated_at") or {}).get("end_time"),
+            info.get("platform"),
+            info.get("model"),
+            stats.get("total_nodes"),
+            stats.get("max_depth"),
+            totals.get("calls"),
+            (totals.get("prompt_tokens") or 0) + (totals.get("completion_tokens") or 0) if totals else None,
+            totals.get("cost"),
+            result.get("output_directory") or os.path.dirname(result_file),
+            result_file,
+            visualization.get("mermaid_file"),
+            visualization.get("viewer_file"),
+            datetime.now().isoformat()
+        )
+
+    @staticmethod
+    def text(result: Dict[str, Any], summaries: Optional[Iterable[str]] = None) -> Tuple:
+        """
+        Build the full-text row of a saved analysis result.
+
+        :param result: Analysis result as saved by DualEngineAnalyzer
+        :param summaries: Node summaries of the analysis, they are not part of the result file
+        :return: Row values in TEXT_COLUMNS order
+        """
+
+        return (
+            result.get("query", ""),
+            result.get("optimized_query") or "",
+            "\n".join(summary for summary in summaries or [] if summary),
+            result.get("response") or ""
+        )
+
+    def _insert(self, conn: sqlite3.Connection, row: Tuple, text: Optional[Tuple]) -> None:
+        """Insert or replace one analysis and its full-text row, which shares the rowid."""
+
+        previous = conn.execute("SELECT rowid FROM analyses WHERE analysis_id = ?", (row[0],)).fetchone()
+        if previous is not None and self.search_enabled:
+            conn.execute("DELETE FROM analysis_text WHERE rowid = ?", (previous[0],))
+        cursor = conn.execute(
+            f"INSERT OR REPLACE INTO analyses ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+            row
+        )
+        if text is not None and self.search_enabled:
+            conn.execute(
+                f"INSERT INTO analysis_text (rowid, {', '.join(TEXT_COLUMNS)}) VALUES (?, ?, ?, ?, ?)",
+                (cursor.lastrowid,) + tuple(text)
+            )
+
+    def add(self, result: Dict[str, Any], result_file: str, summaries: Optional[Iterable[str]] = None) -> None:
+        """
+        Add or replace the row of a saved analysis and its full-text row, in one transaction.
+
+        :param result: Analysis result as saved by DualEngineAnalyzer
+        :param result_file: Path of the result file
+        :param summaries: Node summaries of the analysis
+        """
+
+        with self._connect() as conn:
+            self._insert(conn, self.entry(result, result_file), self.text(result, summaries))
+
+    def replace_all(self, entries: Iterable[Tuple[Tuple, Optional[Tuple]]]) -> int:
+        """
+        Replace all rows in one transaction, readers see either the old or the new catalog.
+
+        Entries are consumed one at a time, so the analyses are never all held in memory.
+
+        :param entries: Pairs of a row built with entry() and a full-text row built with text()
+        :return: Number of rows written
+        """
+
+        count = 0
+        with self._connect() as conn:
+            conn.execute("DELETE FROM analyses")
+            if self.search_enabled:
+                conn.execute("DELETE FROM analysis_text")
+            for row, text in entries:
+                self._insert(conn, row, text)
+                count += 1
+        self.needs_reindex = False
+        return count
+
+    def get(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the row of an analysis.
+
+        :param analysis_id: Analysis identifier
+        :return: Row as a dictionary, None if the analysis is not in the catalog
+        """
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM analyses WHERE analysis_id = ?", (analysis_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def move(self, analysis_id: str, directory: str) -> bool:
+        """
+        Point the directory and file paths of an analysis at the directory it was moved to.
+
+        The full-text row is kept, so a moved analysis stays searchable without a reindex.
+
+        :param analysis_id: Analysis identifier
+        :param directory: New analysis directory
+        :return: True if the row was updated, False if the analysis is not in the catalog
+        """
+
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT directory, result_file, mermaid_file, viewer_file FROM analyses WHERE analysis_id = ?",
+                (analysis_id,)
+            ).fetchone()
+            if row is None:
+                return False
+
+            # The saved output directory and the result file location can disagree, e.g. for copied analyses
+            old_directories = {row["directory"], os.path.dirname(row["result_file"])} - {None, ""}
+
+            def rebase(path: Optional[str]) -> Optional[str]:
+                for old_directory in old_directories:
+                    if path and (path == old_directory or path.startswith(old_directory + os.sep)):
+                        return directory + path[len(old_directory):]
+                return path
+
+            conn.execute(
+                "UPDATE analyses SET directory = ?, result_file = ?, mermaid_file = ?, viewer_file = ? WHERE analysis_id = ?",
+                (directory, rebase(row["result_file"]), rebase(row["mermaid_file"]), rebase(row["viewer_file"]), analysis_id)
+            )
+        return True
+
+    @staticmethod
+    def _filters(
+            search: Optional[str] = None,
+            since: Optional[str] = None,
+            until: Optional[str] = None,
+            model: Optional[str] = None
+    ) -> Tuple[str, List[Any]]:
+        """Build the WHERE clause and parameters of a listing."""
+
+        clauses = []
+        params = []
+        if search:
+            clauses.append("query LIKE ? ESCAPE '\\'")
+            params.append("%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until:
+            # Dates without a time include the whole day
+            clauses.append("created_at <= ?")
+            params.append(until if len(until) > 10 else until + "T23:59:59.999999")
+        if model:
+            clauses.append("model = ?")
+            params.append(model)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def list(
+            self,
+            limit: int = 10,
+            offset: int = 0,
+            search: Optional[str] = None,
+            since: Optional[str] = None,
+            until: Optional[str] = None,
+            model: Optional[str] = None,
+            sort: str = "date",
+            ascending: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        List analyses page by page.
+
+        :param limit: Maximum number of rows
+        :param offset: Rows skipped before the page
+        :param search: Text the query must contain, case-insensitive for ASCII
+        :param since: Earliest creation time in ISO format, a date includes the whole day
+        :param until: Latest creation time in ISO format, a date includes the whole day
+        :param model: Model the analysis used
+        :param sort: Sort key, one of SORT_COLUMNS
+        :param ascending: Whether the oldest or smallest rows come first
+        :return: Rows as dictionaries
+        :raises ValueError: If the sort key is unknown
+        """
+
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Unknown sort key '{sort}', expected one of {list(SORT_COLUMNS)}")
+
+        where, params = self._filters(search, since, until, model)
+        order = "ASC" if ascending else "DESC"
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM analyses{where} ORDER BY {SORT_COLUMNS[sort]} {order}, analysis_id {order} LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(
+            self,
+            search: Optional[str] = None,
+            since: Optional[str] = None,
+            until: Optional[str] = None,
+            model: Optional[str] = None
+    ) -> int:
+        """
+        Count the analyses matching the filters of list().
+
+        :return: Number of matching analyses
+        """
+
+        where, params = self._filters(search, since, until, model)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM analyses{where}", params).fetchone()[0]
+
+    @staticmethod
+    def _match_expression(terms: str) -> str:
+        """
+        Turn search terms into an FTS5 query matching all of them.
+
+        Words are quoted so punctuation is never read as query syntax, quoted phrases
+        stay phrases, and a trailing * keeps its prefix meaning.
+
+        :param terms: Search terms as typed by the user
+        :return: FTS5 match expression, empty if the terms have no words
+        """
+
+        parts = []
+        for phrase, word in SEARCH_TERM_PATTERN.findall(terms):
+            if phrase:
+                tokens = re.findall(r"\w+", phrase)
+                if tokens:
+                    parts.append('"' + " ".join(tokens) + '"')
+                continue
+            prefix = word.endswith("*")
+            tokens = re.findall(r"\w+", word)
+            for i, token in enumerate(tokens):
+                parts.append(f'"{token}"' + ("*" if prefix and i == len(tokens) - 1 else ""))
+        return " ".join(parts)
+
+    def search(
+            self,
+            terms: str,
+            limit: int = 10,
+            since: Optional[str] = None,
+            until: Optional[str] = None,
+            marker: Tuple[str, str] = ("[", "]")
+    ) -> List[Dict[str, Any]]:
+        """
+        Search the indexed text of all analyses, best matches first.
+
+        Matches are ranked with bm25 using TEXT_WEIGHTS, and each result carries a
+        snippet of the best matching column with the matched terms between markers.
+
+        :param terms: Words or quoted phrases that must all occur, word* matches a prefix
+        :param limit: Maximum number of results
+        :param since: Earliest creation time in ISO format, a date includes the whole day
+        :param until: Latest creation time in ISO format, a date includes the whole day
+        :param marker: Strings placed before and after every matched term in the snippet
+        :return: Catalog rows with 'snippet' and 'score' (lower is better)
+        :raises RuntimeError: If SQLite has no FTS5
+        """
+
+        if not self.search_enabled:
+            raise RuntimeError("Full-text search needs SQLite with FTS5")
+
+        expression = self._match_expression(terms)
+        if not expression:
+            return []
+
+        where, params = self._filters(since=since, until=until)
+        where = where.replace(" WHERE ", " AND ").replace("created_at", "a.created_at")
+        weights = ", ".join(str(weight) for weight in TEXT_WEIGHTS)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT a.*, snippet(analysis_text, -1, ?, ?, '...', 16) AS snippet,
+                       bm25(analysis_text, {weights}) AS score
+                FROM analysis_text JOIN analyses a ON a.rowid = analysis_text.rowid
+                WHERE analysis_text MATCH ?{where}
+                ORDER BY score LIMIT ?
+                """,
+                [marker[0], marker[1], expression] + params + [limit]
+            ).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,206 @@
+import os
+import json
+import sqlite3
+from typing import Dict, Any, List, Optional, Tuple
+from utils.logger import setup_logger
+from visualization.html_viewer import HtmlViewer
+from analyzers.analysis_catalog import AnalysisCatalog
+from analyzers.output_layout import OutputLayout
+
+
+class AnalysisHistory:
+    """
+    AnalysisHistory lists, searches and reindexes the saved analyses of an output directory.
+
+    It only holds the AnalysisCatalog and OutputLayout, so commands that read the history
+    do not set up the executor, its LLM clients or tokenizers. DualEngineAnalyzer delegates
+    its history methods here.
+    """
+
+    def __init__(self, output_dir: str, output_layout: str = "flat"):
+        """
+        Initialize AnalysisHistory.
+
+        :param output_dir: Output directory holding the analyses
+        :param output_layout: Layout of new analysis directories ('flat' or 'date')
+        """
+
+        self.logger = setup_logger("AnalysisHistory")
+        self.output_dir = output_dir
+
+        # Placement of the analysis directories, lookups find analyses in every layout
+        self.layout = OutputLayout(output_dir, output_layout)
+
+        # Index of the saved analyses, written with every result and rebuilt by reindex()
+        self.catalog = AnalysisCatalog(os.path.join(output_dir, "analyses.sqlite"))
+
+    def get_analysis_history(
+        self,
+        limit: int = 10,
+        offset: int = 0,
+        search: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        model: Optional[str] = None,
+        sort: str = "date",
+        ascending: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Get a page of the analysis history from the catalog.
+        
+        :param limit: Maximum number of history items to return
+        :param offset: Items skipped before the page
+        :param search: Text the query must contain
+        :param since: Earliest analysis time in ISO format, a date includes the whole day
+        :param until: Latest analysis time in ISO format, a date includes the whole day
+        :param model: Model the analysis used
+        :param sort: Sort key ('date', 'nodes', 'tokens', 'cost' or 'query')
+        :param ascending: Whether the oldest or smallest analyses come first
+        :return: List of analysis metadata, newest first by default
+        """
+        try:
+            self._ensure_catalog()
+            rows = self.catalog.list(
+                limit=limit, offset=offset, search=search, since=since, until=until,
+                model=model, sort=sort, ascending=ascending
+            )
+            history = []
+            for row in rows:
+                directory, file_path = row["directory"], row["result_file"]
+                # Directories moved outside of migrate_layout are found in their new layout
+                if directory and not os.path.isdir(directory):
+                    found = self.layout.find(row["analysis_id"])
+                    if found:
+                        directory, file_path = found, OutputLayout.rebase(file_path, directory, found)
+                history.append({
+                    "analysis_id": row["analysis_id"],
+                    "query": row["query"],
+                    "timestamp": row["created_at"] or "",
+                    "directory": directory,
+                    "file_path": file_path,
+                    "model": row["model"],
+                    "total_nodes": row["total_nodes"],
+                    "total_tokens": row["total_tokens"],
+                    "cost": row["cost"]
+                })
+            return history
+            
+        except sqlite3.Error as e:
+            self.logger.error(f"Failed to get analysis history: {str(e)}", exc_info=True)
+            return []
+
+    def count_analyses(
+        self,
+        search: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> int:
+        """
+        Count the analyses matching the filters of get_analysis_history.
+        
+        :return: Number of matching analyses
+        """
+        try:
+            self._ensure_catalog()
+            return self.catalog.count(search=search, since=since, until=until, model=model)
+        except sqlite3.Error as e:
+            self.logger.error(f"Failed to count analyses: {str(e)}", exc_info=True)
+            return 0
+
+    def _ensure_catalog(self) -> None:
+        """Build the catalog from disk when it is empty but analyses exist, e.g. on the first run after an upgrade."""
+        if self.catalog.needs_reindex:
+            self.logger.info("Analysis catalog has no search index yet, indexing the output directory")
+            self.reindex()
+        elif self.catalog.count() == 0 and self._get_analysis_directories():
+            self.logger.info("Analysis catalog is empty, indexing the output directory")
+            self.reindex()
+
+    def reindex(self) -> int:
+        """
+        Rebuild the analysis catalog from the result files in the output directory.
+        
+        The rows are replaced in one transaction, so the catalog stays usable while
+        the files are read and analyses removed from disk disappear from it. Node
+        summaries for the search index are read from the viewer of each analysis.
+        
+        :return: Number of indexed analyses
+        """
+        def entries():
+            for analysis_dir in self._get_analysis_directories():
+                analysis_id = os.path.basename(analysis_dir)
+                file_path = self.result_file(analysis_dir)
+                if not file_path:
+                    continue
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        result = json.load(f)
+                    viewer_dir = os.path.join(analysis_dir, HtmlViewer.VIEWER_DIR)
+                    summaries = [node.get("summary") for node in HtmlViewer.read_shards(viewer_dir)]
+                    yield AnalysisCatalog.entry(result, file_path), AnalysisCatalog.text(result, summaries)
+                except (OSError, ValueError) as e:
+                    self.logger.warning(f"Failed to index analysis {analysis_id}: {str(e)}")
+
+        count = self.catalog.replace_all(entries())
+        self.logger.info(f"Indexed {count} analyses")
+        return count
+    
+    def search_analyses(
+        self,
+        terms: str,
+        limit: int = 10,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        marker: Tuple[str, str] = ("[", "]")
+    ) -> List[Dict[str, Any]]:
+        """
+        Search the queries, optimized queries, node summaries and responses of past analyses.
+        
+        :param terms: Words or quoted phrases that must all occur, word* matches a prefix
+        :param limit: Maximum number of results
+        :param since: Earliest analysis time in ISO format, a date includes the whole day
+        :param until: Latest analysis time in ISO format, a date includes the whole day
+        :param marker: Strings placed around matched terms in the snippets
+        :return: Matching analyses, best first, with 'snippet' and 'score'
+        :raises RuntimeError: If SQLite has no FTS5
+        """
+        self._ensure_catalog()
+        return self.catalog.search(terms, limit=limit, since=since, until=until, marker=marker)
+
+    @staticmethod
+    def result_file(analysis_dir: str, analysis_id: Optional[str] = None) -> Optional[str]:
+        """
+        Find the result file in an analysis directory.
+        
+        Results saved by older versions are named after the executor's analysis ID,
+        which can differ from the directory name by a second.
+        
+        :param analysis_dir: Analysis directory
+        :param analysis_id: Analysis identifier, the directory name if None
+        :return: Path of the result file, None if the directory has none
+        """
+        file_path = os.path.join(analysis_dir, f"{analysis_id or os.path.basename(analysis_dir)}.json")
+        if os.path.exists(file_path):
+            return file_path
+        try:
+            names = sorted(
+                name for name in os.listdir(analysis_dir)
+                if name.endswith(".json") and not name.endswith("_metadata.json") and name != "trace.json"
+            )
+        except OSError:
+            return None
+        return os.path.join(analysis_dir, names[0]) if names else None
+
+    def _get_analysis_directories(self) -> List[str]:
+        """
+        Get list of analysis directories.
+        
+        :return: List of directory paths
+        """
+        try:
+            return list(self.layout.directories())
+            
+        except Exception as e:
+            self.logger.error(f"Failed to list analysis directories: {str(e)}", exc_info=True)
+            return []
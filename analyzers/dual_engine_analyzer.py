@@ -1,13 +1,17 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from datetime import datetime
 import os
 import json
 import re
+import sqlite3
 from dotenv import load_dotenv
 
 from utils.logger import setup_logger
+from utils.tracer import Tracer
 from executors.executor import Executor
-from visualization import MermaidGenerator
+from visualization import MermaidGenerator, HtmlViewer
+from analyzers.analysis_history import AnalysisHistory
+from analyzers.output_layout import OutputLayout
 
 
 # Load environment variables
@@ -28,7 +32,26 @@ class DualEngineAnalyzer:
         model_name: str = None, 
         temperature: float = None,
         output_dir: str = None,
-        enable_validation: bool = None  # Add validation mode parameter
+        enable_validation: bool = None,  # Add validation mode parameter
+        synthesis_mode: str = None,
+        synthesis_fan_in: int = None,
+        synthesis_workers: int = None,
+        fused_expansion: bool = None,
+        fused_planning: bool = None,
+        novelty_threshold: float = None,
+        dedupe_threshold: float = None,
+        node_memo: bool = None,
+        controller_model: str = None,
+        controller_confidence: float = None,
+        log_decisions: bool = None,
+        model_routing: str = None,
+        cascade: bool = None,
+        batch_decisions: bool = None,
+        diagram_depth: int = None,
+        label_length: int = None,
+        page_layers: int = None,
+        svg_export: bool = None,
+        output_layout: str = None
     ):
         """
         Initialize dual engine analyzer with configuration parameters.
@@ -41,6 +64,25 @@ class DualEngineAnalyzer:
         :param temperature: Temperature setting for LLM generation
         :param output_dir: Directory for storing analysis outputs
         :param enable_validation: Whether to enable validation mode
+        :param synthesis_mode: Final response synthesis mode ('single', 'tree' or 'auto')
+        :param synthesis_fan_in: Maximum syntheses merged by one intermediate call in tree mode
+        :param synthesis_workers: Maximum parallel intermediate syntheses in tree mode
+        :param fused_expansion: Whether the controller decision and the node expansion share one LLM call
+        :param fused_planning: Whether query optimization and root task decomposition share one LLM call
+        :param novelty_threshold: Novelty below which a branch is completed without a controller call, 0 disables it
+        :param dedupe_threshold: Query similarity at which a child links to an existing node instead of being generated, 0 disables it
+        :param node_memo: Whether fresh nodes of earlier analyses are reused
+        :param controller_model: Path of a trained controller model answering confident decisions locally
+        :param controller_confidence: Minimum model probability for a local controller decision
+        :param log_decisions: Whether LLM controller decisions are logged as training data
+        :param model_routing: Path of a stage model routing YAML file
+        :param cascade: Whether stages with a cascade try the small model first and escalate rejected responses
+        :param batch_decisions: Whether the children of a breadth node are decided with one batched controller call
+        :param diagram_depth: Deepest layer drawn in the diagram, deeper subtrees are collapsed, 0 draws all layers
+        :param label_length: Maximum diagram label length, 0 keeps full labels
+        :param page_layers: Layers per diagram file, 0 writes one file
+        :param svg_export: Whether the analysis tree is also rendered to an SVG file
+        :param output_layout: Layout of new analysis directories, 'flat' (output/<id>) or 'date' (output/YYYY/MM/DD/<id>)
         """
         self.logger = setup_logger("DualEngineAnalyzer")
         self.logger.debug("Initializing DualEngineAnalyzer...")
@@ -53,6 +95,25 @@ class DualEngineAnalyzer:
         self.temperature = temperature or float(os.getenv("LLM_TEMPERATURE", 0.3))
         self.output_dir = output_dir or os.getenv("OUTPUT_DIR", "output")
         self.enable_validation = enable_validation if enable_validation is not None else bool(os.getenv("ENABLE_VALIDATION", False))
+        self.synthesis_mode = synthesis_mode or os.getenv("SYNTHESIS_MODE", "auto")
+        self.synthesis_fan_in = synthesis_fan_in or int(os.getenv("SYNTHESIS_FAN_IN", 4))
+        self.synthesis_workers = synthesis_workers or int(os.getenv("SYNTHESIS_WORKERS", 4))
+        self.fused_expansion = fused_expansion if fused_expansion is not None else os.getenv("FUSED_EXPANSION", "false").lower() in {'1', 'true', 'yes'}
+        self.fused_planning = fused_planning if fused_planning is not None else os.getenv("FUSED_PLANNING", "false").lower() in {'1', 'true', 'yes'}
+        self.novelty_threshold = novelty_threshold if novelty_threshold is not None else float(os.getenv("NOVELTY_THRESHOLD", 0))
+        self.dedupe_threshold = dedupe_threshold if dedupe_threshold is not None else float(os.getenv("DEDUPE_THRESHOLD", 0))
+        self.node_memo = node_memo if node_memo is not None else os.getenv("NODE_MEMO", "false").lower() in {'1', 'true', 'yes'}
+        self.controller_model = controller_model or os.getenv("CONTROLLER_MODEL") or None
+        self.controller_confidence = controller_confidence or float(os.getenv("CONTROLLER_CONFIDENCE", 0.9))
+        self.log_decisions = log_decisions if log_decisions is not None else os.getenv("LOG_CONTROLLER_DECISIONS", "false").lower() in {'1', 'true', 'yes'}
+        self.model_routing = model_routing or os.getenv("MODEL_ROUTING_CONFIG") or None
+        self.cascade = cascade if cascade is not None else os.getenv("CASCADE", "false").lower() in {'1', 'true', 'yes'}
+        self.batch_decisions = batch_decisions if batch_decisions is not None else os.getenv("BATCH_DECISIONS", "false").lower() in {'1', 'true', 'yes'}
+        self.diagram_depth = diagram_depth if diagram_depth is not None else int(os.getenv("DIAGRAM_DEPTH", 0))
+        self.label_length = label_length if label_length is not None else int(os.getenv("DIAGRAM_LABEL_LENGTH", 0))
+        self.page_layers = page_layers if page_layers is not None else int(os.getenv("DIAGRAM_PAGE_LAYERS", 0))
+        self.svg_export = svg_export if svg_export is not None else os.getenv("SVG_EXPORT", "false").lower() in {'1', 'true', 'yes'}
+        self.output_layout = output_layout or os.getenv("OUTPUT_LAYOUT", "flat")
         
         # Log configuration details
         self.logger.debug(f"Analysis parameters: Max Layer: {self.max_layer}, Max Nodes: {self.max_nodes}, Validation: {self.enable_validation}")
@@ -64,7 +125,22 @@ class DualEngineAnalyzer:
             platform=self.platform,
             model_name=self.model_name,
             temperature=self.temperature,
-            enable_validation=self.enable_validation  # Pass validation mode to executor
+            output_dir=self.output_dir,  # Node memo and decision log live next to the analyses
+            enable_validation=self.enable_validation,  # Pass validation mode to executor
+            synthesis_mode=self.synthesis_mode,
+            synthesis_fan_in=self.synthesis_fan_in,
+            synthesis_workers=self.synthesis_workers,
+            fused_expansion=self.fused_expansion,
+            fused_planning=self.fused_planning,
+            novelty_threshold=self.novelty_threshold,
+            dedupe_threshold=self.dedupe_threshold,
+            node_memo=self.node_memo,
+            controller_model=self.controller_model,
+            controller_confidence=self.controller_confidence,
+            log_decisions=self.log_decisions,
+            model_routing=self.model_routing,
+            cascade=self.cascade,
+            batch_decisions=self.batch_decisions
         )
         
         # The visualizer will be initialized for each analysis with its specific output directory
@@ -72,6 +148,11 @@ class DualEngineAnalyzer:
         
         # Create main output directory
         os.makedirs(self.output_dir, exist_ok=True)
+
+        # Catalog and layout of the saved analyses, lookups find analyses in every layout
+        self.history = AnalysisHistory(self.output_dir, self.output_layout)
+        self.layout = self.history.layout
+        self.catalog = self.history.catalog
         
         self.logger.debug(f"Output directory: {self.output_dir}")
         
@@ -81,7 +162,9 @@ class DualEngineAnalyzer:
         self, 
         query: str, 
         use_cache: bool = False,  # Parameter kept for backward compatibility but not used
-        generate_visualization: bool = True
+        generate_visualization: bool = True,
+        stream_callback: Optional[Callable[[str], None]] = None,
+        trace: bool = False
     ) -> Dict[str, Any]:
         """
         Analyze a query using the dual-engine thinking approach.
@@ -89,6 +172,9 @@ class DualEngineAnalyzer:
         :param query: The user query to analyze
         :param use_cache: Ignored parameter (kept for compatibility)
         :param generate_visualization: Whether to generate visualization
+        :param stream_callback: Optional callback receiving final response chunks as they are generated.
+            The complete response is still returned and saved.
+        :param trace: Whether to record a Chrome Trace Event file (trace.json) in the analysis directory
             
         :return: Analysis result dictionary with final response and metadata
         """
@@ -102,19 +188,27 @@ class DualEngineAnalyzer:
         self.logger.info("Starting new analysis")
         self.logger.info(f"Processing query: {query}")
         
+        tracer = Tracer()
+        if trace:
+            tracer.start()
+
         try:
             # Initialize visualizer with analysis directory
-            self.visualizer = MermaidGenerator(output_dir=analysis_dir)
+            self.visualizer = MermaidGenerator(
+                output_dir=analysis_dir,
+                max_depth=self.diagram_depth,
+                max_label=self.label_length,
+                page_layers=self.page_layers
+            )
             
             # Log analysis configuration
             self.logger.debug(f"Analysis configuration: max_layer={self.max_layer}, max_nodes={self.max_nodes}, platform={self.platform}, model={self.model_name}")
             
             # 1. Process query with executor
             self.logger.debug("Starting query execution")
-            execution_result = self.executor.process_query(query, analysis_dir)
-            
-            # Update analysis_id to match executor's ID
-            analysis_id = execution_result.get("analysis_id", analysis_id)
+            execution_result = self.executor.process_query(
+                query, analysis_dir, stream_callback=stream_callback, analysis_id=analysis_id
+            )
             
             # Log execution completion
             node_count = len(execution_result.get("visualization_data", {}).get("nodes", []))
@@ -127,13 +221,23 @@ class DualEngineAnalyzer:
             if generate_visualization:
                 self.logger.debug("[VISUALIZE] Generating visualization")
                 viz_data = execution_result.get("visualization_data", {})
-                visualization_result = self.visualizer.generate(viz_data, analysis_id)
+                visualization_result = self.visualizer.generate(viz_data, analysis_id, llm_usage=stats.get("llm_usage"))
                 
                 visualization_data = {
                     "mermaid_file": visualization_result.get("mermaid_file", ""),
                     "mermaid_code": visualization_result.get("mermaid_code", ""),
                     "metadata": visualization_result.get("metadata", {})
                 }
+
+                if self.svg_export:
+                    svg_result = self.visualizer.generate_svg(viz_data, analysis_id)
+                    if svg_result.get("svg_file"):
+                        visualization_data["svg_file"] = svg_result["svg_file"]
+
+                # Static viewer loading node details on demand, opened by `deot open`
+                viewer_result = HtmlViewer(output_dir=analysis_dir).generate(viz_data, analysis_id, query=query)
+                if viewer_result.get("viewer_file"):
+                    visualization_data["viewer_file"] = viewer_result["viewer_file"]
                 
                 # Log visualization completion
                 self.logger.debug(f"Visualization generated with {len(viz_data.get('nodes', []))} nodes and {len(viz_data.get('edges', []))} edges")
@@ -149,9 +253,14 @@ class DualEngineAnalyzer:
                 "output_directory": analysis_dir,
                 "timestamp": datetime.now().isoformat()
             }
+
+            if trace:
+                tracer.stop()
+                result["trace_file"] = tracer.save(os.path.join(analysis_dir, "trace.json"))
             
-            # 4. Save result
-            self._save_result(result, analysis_id, analysis_dir)
+            # 4. Save result, the node summaries are only kept in the search index
+            summaries = [node.get("node_summary") for node in execution_result.get("visualization_data", {}).get("nodes", [])]
+            self._save_result(result, analysis_id, analysis_dir, summaries=summaries)
             
             # Log analysis completion
             response_length = len(result.get("response", ""))
@@ -166,6 +275,7 @@ class DualEngineAnalyzer:
             
             # Log error details
             self.logger.error(f"Stack trace: {self._get_stack_trace(e)}", exc_info=True)
+            tracer.stop()
             
             return {
                 "analysis_id": analysis_id,
@@ -175,57 +285,65 @@ class DualEngineAnalyzer:
                 "timestamp": datetime.now().isoformat()
             }
     
-    def get_analysis_history(self, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_analysis_history(
+        self,
+        limit: int = 10,
+        offset: int = 0,
+        search: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        model: Optional[str] = None,
+        sort: str = "date",
+        ascending: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Get a page of the analysis history from the catalog, see AnalysisHistory.get_analysis_history.
+
+        :return: List of analysis metadata, newest first by default
+        """
+        return self.history.get_analysis_history(
+            limit=limit, offset=offset, search=search, since=since, until=until,
+            model=model, sort=sort, ascending=ascending
+        )
+
+    def count_analyses(
+        self,
+        search: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> int:
         """
-        Get recent analysis history.
+        Count the analyses matching the filters of get_analysis_history.
         
-        :param limit: Maximum number of history items to return
-        :return: List of recent analysis metadata
+        :return: Number of matching analyses
         """
-        try:
-            history = []
-            analysis_dirs = self._get_analysis_directories()
-            
-            # Sort directories by modification time (newest first)
-            analysis_dirs.sort(key=lambda d: os.path.getmtime(d), reverse=True)
-            
-            # Limit the number of directories
-            analysis_dirs = analysis_dirs[:limit]
-            
-            for analysis_dir in analysis_dirs:
-                try:
-                    # Look for the main analysis file
-                    analysis_id = os.path.basename(analysis_dir)
-                    file_path = os.path.join(analysis_dir, f"{analysis_id}.json")
-                    
-                    if not os.path.exists(file_path):
-                        # Try to find any .json file
-                        json_files = [f for f in os.listdir(analysis_dir) if f.endswith('.json')]
-                        if json_files:
-                            file_path = os.path.join(analysis_dir, json_files[0])
-                        else:
-                            continue
-                    
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        analysis_data = json.load(f)
-                        
-                    # Include only necessary metadata
-                    history.append({
-                        "analysis_id": analysis_data.get("analysis_id", ""),
-                        "query": analysis_data.get("query", ""),
-                        "timestamp": analysis_data.get("timestamp", ""),
-                        "directory": analysis_dir,
-                        "file_path": file_path
-                    })
-                except Exception as e:
-                    self.logger.warning(f"Failed to read analysis directory {analysis_dir}: {str(e)}")
-            
-            return history
-            
-        except Exception as e:
-            self.logger.error(f"Failed to get analysis history: {str(e)}", exc_info=True)
-            return []
+        return self.history.count_analyses(search=search, since=since, until=until, model=model)
+
+    def reindex(self) -> int:
+        """
+        Rebuild the analysis catalog from the result files in the output directory.
+        
+        :return: Number of indexed analyses
+        """
+        return self.history.reindex()
     
+    def search_analyses(
+        self,
+        terms: str,
+        limit: int = 10,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        marker: Tuple[str, str] = ("[", "]")
+    ) -> List[Dict[str, Any]]:
+        """
+        Search the text of past analyses, see AnalysisHistory.search_analyses.
+        
+        :return: Matching analyses, best first, with 'snippet' and 'score'
+        :raises RuntimeError: If SQLite has no FTS5
+        """
+        return self.history.search_analyses(terms, limit=limit, since=since, until=until, marker=marker)
+
     def get_analysis(self, analysis_id: str) -> Optional[Dict[str, Any]]:
         """
         Get a specific analysis by ID.
@@ -234,10 +352,9 @@ class DualEngineAnalyzer:
         :return: Analysis data dictionary or None if not found
         """
         try:
-            # First try to find the analysis directory
-            analysis_dir = os.path.join(self.output_dir, analysis_id)
-            if os.path.isdir(analysis_dir):
-                file_path = os.path.join(analysis_dir, f"{analysis_id}.json")
+            analysis_dir = self.find_analysis_directory(analysis_id)
+            if analysis_dir:
+                file_path = AnalysisHistory.result_file(analysis_dir, analysis_id) or os.path.join(analysis_dir, f"{analysis_id}.json")
             else:
                 # Fall back to old path format
                 file_path = os.path.join(self.output_dir, f"{analysis_id}.json")
@@ -248,6 +365,11 @@ class DualEngineAnalyzer:
                 
             with open(file_path, 'r', encoding='utf-8') as f:
                 analysis_data = json.load(f)
+
+            # A directory moved by an interrupted migration still holds its old paths
+            saved_dir = analysis_data.get("output_directory")
+            if analysis_dir and saved_dir and saved_dir != analysis_dir:
+                OutputLayout.rebase(analysis_data, saved_dir, analysis_dir)
                 
             return analysis_data
             
@@ -255,6 +377,124 @@ class DualEngineAnalyzer:
             self.logger.error(f"Failed to retrieve analysis {analysis_id}: {str(e)}", exc_info=True)
             return None
     
+    def find_analysis_directory(self, analysis_id: str) -> Optional[str]:
+        """
+        Find the directory of an analysis in any output layout.
+        
+        :param analysis_id: Analysis identifier
+        :return: Path of the analysis directory, None if it does not exist
+        """
+        try:
+            entry = self.catalog.get(analysis_id)
+        except sqlite3.Error as e:
+            self.logger.warning(f"Failed to look up analysis {analysis_id} in the catalog: {str(e)}")
+            entry = None
+        if entry and entry["directory"] and os.path.isdir(entry["directory"]):
+            return entry["directory"]
+        return self.layout.find(analysis_id)
+
+    def migrate_layout(self, layout: str, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Move the analysis directories of the output directory into another layout.
+        
+        Directories are renamed in place, then the paths in their result and metadata
+        files and in the catalog are rewritten. Every step can be repeated, so an
+        interrupted migration is finished by running it again.
+        
+        :param layout: Target layout ('flat' or 'date')
+        :param dry_run: Only count the directories that would be moved
+        :return: Counts of 'moved', 'updated', 'unchanged' and 'conflicts'
+        :raises ValueError: If the layout is unknown
+        """
+        target = OutputLayout(self.output_dir, layout)
+        counts = {"moved": 0, "updated": 0, "unchanged": 0, "conflicts": 0}
+
+        for analysis_dir in list(target.directories()):
+            analysis_id = os.path.basename(analysis_dir)
+            new_dir = target.directory(analysis_id)
+
+            if os.path.abspath(new_dir) != os.path.abspath(analysis_dir):
+                if os.path.exists(new_dir):
+                    self.logger.warning(f"[MIGRATE] Skipping {analysis_dir}, {new_dir} already exists")
+                    counts["conflicts"] += 1
+                    continue
+                if dry_run:
+                    counts["moved"] += 1
+                    continue
+                os.makedirs(os.path.dirname(new_dir), exist_ok=True)
+                os.rename(analysis_dir, new_dir)
+                self._remove_empty_parents(os.path.dirname(analysis_dir))
+                self.logger.debug(f"[MIGRATE] Moved {analysis_dir} to {new_dir}")
+                counts["moved"] += 1
+            elif dry_run:
+                counts["unchanged"] += 1
+                continue
+
+            # Also repairs directories moved before an earlier run was interrupted
+            if self._rebase_analysis_files(analysis_id, new_dir):
+                counts["updated"] += 1
+            elif os.path.abspath(new_dir) == os.path.abspath(analysis_dir):
+                counts["unchanged"] += 1
+
+        self.logger.info(f"[MIGRATE] Output layout '{layout}': {counts}")
+        return counts
+
+    def _rebase_analysis_files(self, analysis_id: str, analysis_dir: str) -> bool:
+        """
+        Point the paths in the result and metadata files and the catalog row of a moved analysis at its directory.
+        
+        :param analysis_id: Analysis identifier
+        :param analysis_dir: Current directory of the analysis
+        :return: True if any path was rewritten
+        """
+        file_path = AnalysisHistory.result_file(analysis_dir)
+        if not file_path:
+            return False
+        with open(file_path, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+
+        old_dir = result.get("output_directory")
+        if not old_dir or old_dir == analysis_dir:
+            return False
+
+        # The result file is rewritten last, it marks the analysis as migrated
+        analysis_id = result.get("analysis_id") or analysis_id
+        metadata_path = os.path.join(analysis_dir, f"{analysis_id}_metadata.json")
+        if os.path.exists(metadata_path):
+            with open(metadata_path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            self._write_json(metadata_path, OutputLayout.rebase(metadata, old_dir, analysis_dir))
+        try:
+            self.catalog.move(analysis_id, analysis_dir)
+        except sqlite3.Error as e:
+            self.logger.warning(f"Failed to update analysis {analysis_id} in the catalog: {str(e)}")
+        self._write_json(file_path, OutputLayout.rebase(result, old_dir, analysis_dir))
+        return True
+
+    @staticmethod
+    def _write_json(path: str, data: Any) -> None:
+        """Write a JSON file through a temporary file, so readers never see a partial file."""
+        temp_path = f"{path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _remove_empty_parents(self, path: str) -> None:
+        """Remove the date directories emptied by a migration, up to the output directory."""
+        output_dir = os.path.abspath(self.output_dir)
+        path = os.path.abspath(path)
+        while path != output_dir and path.startswith(output_dir + os.sep):
+            try:
+                os.rmdir(path)
+            except OSError:
+                return
+            path = os.path.dirname(path)
+
     def _create_analysis_directory(self, analysis_id: str, query: str) -> str:
         """
         Create a directory for the specific analysis.
@@ -269,7 +509,7 @@ class DualEngineAnalyzer:
             query_part = self._sanitize_for_path(query)[:50]  # Limit length
             
             # Create directory name
-            analysis_dir = os.path.join(self.output_dir, analysis_id)
+            analysis_dir = self.layout.directory(analysis_id)
             
             # Create the directory
             os.makedirs(analysis_dir, exist_ok=True)
@@ -296,13 +536,20 @@ class DualEngineAnalyzer:
         sanitized = re.sub(r'_+', '_', sanitized)
         return sanitized.strip('_')
     
-    def _save_result(self, result: Dict[str, Any], analysis_id: str, analysis_dir: str) -> str:
+    def _save_result(
+        self,
+        result: Dict[str, Any],
+        analysis_id: str,
+        analysis_dir: str,
+        summaries: Optional[List[str]] = None
+    ) -> str:
         """
-        Save analysis result to a file.
+        Save analysis result to a file and add it to the catalog.
         
         :param result: Analysis result dictionary
         :param analysis_id: Analysis identifier
         :param analysis_dir: Analysis directory
+        :param summaries: Node summaries indexed for full-text search
         :return: Path to the saved file
         """
         try:
@@ -324,66 +571,43 @@ class DualEngineAnalyzer:
                 "model": self.model_name,
                 "temperature": self.temperature,
                 "max_layer": self.max_layer,
-                "max_nodes": self.max_nodes
+                "max_nodes": self.max_nodes,
+                "synthesis_mode": self.synthesis_mode,
+                "fused_expansion": self.fused_expansion,
+                "fused_planning": self.fused_planning,
+                "novelty_threshold": self.novelty_threshold,
+                "dedupe_threshold": self.dedupe_threshold,
+                "node_memo": self.node_memo,
+                "controller_model": self.controller_model,
+                "controller_confidence": self.controller_confidence,
+                "model_routing": self.executor.model_router.describe(),
+                "cascade": self.executor.model_router.describe_cascades(),
+                "batch_decisions": self.executor.batch_decisions,
+                "diagram": {
+                    "max_depth": self.diagram_depth,
+                    "label_length": self.label_length,
+                    "page_layers": self.page_layers,
+                    "svg_export": self.svg_export
+                },
+                "output_layout": self.output_layout
             }
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
+            self._write_json(file_path, result)
                 
             self.logger.debug(f"Analysis result saved to {file_path}")
+
+            # The result file is complete, a failed catalog update is repaired by `deot reindex`
+            try:
+                self.catalog.add(result, file_path, summaries=summaries)
+            except sqlite3.Error as e:
+                self.logger.warning(f"Failed to add analysis {analysis_id} to the catalog: {str(e)}")
+
             return file_path
             
         except Exception as e:
             self.logger.error(f"Failed to save analysis result: {str(e)}", exc_info=True)
             return ""
     
-    def _get_analysis_directories(self) -> List[str]:
-        """
-        Get list of analysis directories.
-        
-        :return: List of directory paths
-        """
-        try:
-            dirs = []
-            
-            for item in os.listdir(self.output_dir):
-                item_path = os.path.join(self.output_dir, item)
-                if os.path.isdir(item_path) and item.startswith('analysis_'):
-                    dirs.append(item_path)
-                    
-            return dirs
-            
-        except Exception as e:
-            self.logger.error(f"Failed to list analysis directories: {str(e)}", exc_info=True)
-            return []
-    
-    def _get_analysis_files(self) -> List[str]:
-        """
-        Get list of analysis output files (legacy method).
-        
-        :return: List of file paths
-        """
-        try:
-            files = []
-            
-            # Check both top-level files and files in analysis directories
-            for filename in os.listdir(self.output_dir):
-                if filename.endswith('.json') and filename.startswith('analysis_'):
-                    files.append(os.path.join(self.output_dir, filename))
-                
-                # Check if this is a directory
-                dir_path = os.path.join(self.output_dir, filename)
-                if os.path.isdir(dir_path) and filename.startswith('analysis_'):
-                    for inner_file in os.listdir(dir_path):
-                        if inner_file.endswith('.json'):
-                            files.append(os.path.join(dir_path, inner_file))
-                    
-            return files
-            
-        except Exception as e:
-            self.logger.error(f"Failed to list analysis files: {str(e)}", exc_info=True)
-            return []
-
     def _get_stack_trace(self, error: Exception) -> str:
         """
         Get formatted stack trace from exception.
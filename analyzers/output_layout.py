@@ -0,0 +1,116 @@
+import os
+import re
+from typing import Any, Iterator, List, Optional
+
+# Layouts of the analysis directories in the output directory
+LAYOUTS = ("flat", "date")
+
+# Analysis ids carry their start time, e.g. analysis_20240615_123456
+ANALYSIS_ID_PATTERN = re.compile(r"^analysis_(\d{4})(\d{2})(\d{2})_")
+
+
+class OutputLayout:
+    """
+    OutputLayout places analysis directories in the output directory.
+
+    The flat layout keeps every analysis in output/<analysis_id>/. The date layout
+    shards them by their start date into output/YYYY/MM/DD/<analysis_id>/, which
+    keeps every directory small with hundreds of thousands of analyses. Lookups and
+    listings find analyses in either layout, so both can coexist during a migration.
+    """
+
+    def __init__(self, output_dir: str, layout: str = "flat"):
+        """
+        Initialize OutputLayout.
+
+        :param output_dir: Output directory holding the analyses
+        :param layout: Layout of new analysis directories ('flat' or 'date')
+        """
+
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown output layout '{layout}', expected one of {list(LAYOUTS)}")
+
+        self.output_dir = output_dir
+        self.layout = layout
+
+    def directory(self, analysis_id: str, layout: Optional[str] = None) -> str:
+        """
+        Get the directory of an analysis in a layout.
+
+        Analysis ids without a start date always use the flat layout.
+
+        :param analysis_id: Analysis identifier
+        :param layout: Layout to use, the configured layout if None
+        :return: Path of the analysis directory
+        """
+
+        match = ANALYSIS_ID_PATTERN.match(analysis_id)
+        if (layout or self.layout) == "date" and match:
+            return os.path.join(self.output_dir, *match.groups(), analysis_id)
+        return os.path.join(self.output_dir, analysis_id)
+
+    def find(self, analysis_id: str) -> Optional[str]:
+        """
+        Find the directory of an analysis in any layout.
+
+        :param analysis_id: Analysis identifier
+        :return: Path of the existing analysis directory, None if there is none
+        """
+
+        for layout in (self.layout,) + tuple(other for other in LAYOUTS if other != self.layout):
+            path = self.directory(analysis_id, layout)
+            if os.path.isdir(path):
+                return path
+        return None
+
+    def directories(self) -> Iterator[str]:
+        """
+        Iterate the analysis directories of both layouts.
+
+        Only date directories (four, two and two digits) are descended into, so other
+        directories in the output directory are never walked.
+
+        :return: Iterator over analysis directory paths
+        """
+
+        def children(path: str, digits: Optional[int] = None) -> List[os.DirEntry]:
+            with os.scandir(path) as entries:
+                return [
+                    entry for entry in entries
+                    if entry.is_dir() and (digits is None or (entry.name.isdigit() and len(entry.name) == digits))
+                ]
+
+        if not os.path.isdir(self.output_dir):
+            return
+        for entry in children(self.output_dir):
+            if entry.name.startswith("analysis_"):
+                yield entry.path
+            elif entry.name.isdigit() and len(entry.name) == 4:
+                for month in children(entry.path, 2):
+                    for day in children(month.path, 2):
+                        for analysis in children(day.path):
+                            if analysis.name.startswith("analysis_"):
+                                yield analysis.path
+
+    @staticmethod
+    def rebase(data: Any, old_dir: str, new_dir: str) -> Any:
+        """
+        Replace the directory prefix of every path in a result or metadata structure.
+
+        :param data: Dictionary, list or string from a saved result
+        :param old_dir: Directory the paths point into
+        :param new_dir: Directory the paths should point into
+        :return: The data with the paths rebased, containers are updated in place
+        """
+
+        if isinstance(data, str):
+            if data == old_dir or data.startswith(old_dir + os.sep):
+                return new_dir + data[len(old_dir):]
+            return data
+        if isinstance(data, dict):
+            for key, value in data.items():
+                data[key] = OutputLayout.rebase(value, old_dir, new_dir)
+        elif isinstance(data, list):
+            for i, value in enumerate(data):
+                data[i] = OutputLayout.rebase(value, old_dir, new_dir)
+        return data
@@ -0,0 +1,11 @@
+from benchmarks.mock_llm import MockLLMHandler, MockLLMError, install_mock_llm
+from benchmarks.runner import run_benchmark, compare_results, load_benchmark_config
+
+__all__ = [
+    'MockLLMHandler',
+    'MockLLMError',
+    'install_mock_llm',
+    'run_benchmark',
+    'compare_results',
+    'load_benchmark_config'
+]
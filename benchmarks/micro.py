@@ -0,0 +1,415 @@
+import gc
+import re
+import os
+import json
+import time
+import tempfile
+import tracemalloc
+from typing import Dict, Any, List, Callable, Tuple
+from executors.analysis_tree import AnalysisNode, AnalysisTree
+from visualization.graph import VisualizationGraph
+from visualization.mermaid_generator import MermaidGenerator
+from visualization.html_viewer import HtmlViewer
+from visualization.tree_layout import TreeLayout
+
+# Shared by every synthetic node, so the measurements count the node structure only
+SUMMARY = "Synthetic node summary of the micro benchmark. " * 8
+QUESTIONS = ["What follows?"]
+
+
+def _shape(nodes: int, fan_out: int) -> List[Tuple[int, int, int]]:
+    """
+    Lay out a synthetic analysis tree breadth first.
+
+    :param nodes: Number of nodes
+    :param fan_out: Children per node
+    :return: (index, parent index, layer) per node, the root has parent -1
+    """
+
+    shape = [(0, -1, 1)]
+    for i in range(1, nodes):
+        parent = (i - 1) // fan_out
+        shape.append((i, parent, shape[parent][2] + 1))
+    return shape
+
+
+def build_dict_tree(nodes: int, fan_out: int = 3) -> Dict[str, Any]:
+    """
+    Build a synthetic tree of nested node dictionaries, as the Executor kept them before AnalysisNode.
+
+    :param nodes: Number of nodes
+    :param fan_out: Children per node
+    :return: Root node dictionary
+    """
+
+    built = []
+    for i, parent, layer in _shape(nodes, fan_out):
+        node = {
+            "node_id": f"node_{i}",
+            "type": "BREADTH",
+            "layer": layer,
+            "query": f"Synthetic query {i}",
+            "child_nodes": [],
+            "timestamp": "2024-01-01T00:00:00",
+            "node_summary": SUMMARY,
+            "engine_decision": {"type": "BREADTH", "focus": None, "questions": list(QUESTIONS)}
+        }
+        if parent >= 0:
+            node["parent_id"] = built[parent]["node_id"]
+            built[parent]["child_nodes"].append(node)
+        built.append(node)
+    return built[0]
+
+
+def build_analysis_tree(nodes: int, fan_out: int = 3) -> AnalysisTree:
+    """
+    Build the same synthetic tree as build_dict_tree with AnalysisNode objects.
+
+    :param nodes: Number of nodes
+    :param fan_out: Children per node
+    :return: The analysis tree
+    """
+
+    tree = AnalysisTree()
+    built = []
+    for i, parent, layer in _shape(nodes, fan_out):
+        node = AnalysisNode(f"node_{i}", "BREADTH", layer, f"Synthetic query {i}", timestamp="2024-01-01T00:00:00")
+        node.node_summary = SUMMARY
+        node.decide("BREADTH", None, list(QUESTIONS))
+        built.append(tree.add(node, built[parent] if parent >= 0 else None))
+    return tree
+
+
+def dict_tree_visualization(root: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Build visualization data from nested node dictionaries the way the Executor did before
+    AnalysisTree: a recursive walk with a linear scan for existing nodes and edges.
+
+    :param root: Root node dictionary
+    :return: Dictionary with 'nodes' and 'edges'
+    """
+
+    data = {"nodes": [], "edges": []}
+
+    def add(node: Dict[str, Any]) -> None:
+        entry = {
+            "node_id": node.get("node_id", ""),
+            "type": node.get("type", ""),
+            "layer": node.get("layer", 0),
+            "query": node.get("query", ""),
+            "node_summary": node.get("node_summary", ""),
+            "engine_decision": node.get("engine_decision", {})
+        }
+        existing = [n for n in data["nodes"] if n.get("node_id") == entry["node_id"]]
+        if existing:
+            data["nodes"][data["nodes"].index(existing[0])] = entry
+        else:
+            data["nodes"].append(entry)
+
+        if "parent_id" in node:
+            edge = {"source": node["parent_id"], "target": node["node_id"], "type": node.get("type", "unknown")}
+            if edge not in data["edges"]:
+                data["edges"].append(edge)
+
+        for child in node.get("child_nodes", []):
+            add(child)
+
+    add(root)
+    return data
+
+
+def dict_tree_depth(node: Dict[str, Any]) -> int:
+    """Get the maximum depth of nested node dictionaries by walking the whole tree."""
+
+    if not node.get("child_nodes"):
+        return node.get("layer", 1)
+    return max(dict_tree_depth(child) for child in node["child_nodes"])
+
+
+def _allocated(build: Callable[[], Any]) -> Tuple[Any, int]:
+    """
+    Measure the memory held by the result of a build function.
+
+    :param build: Function building the measured structure
+    :return: Tuple of the result and the bytes it holds
+    """
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def _timed(run: Callable[[], Any], repeats: int) -> float:
+    """
+    Get the best wall time of a function.
+
+    :param run: Function to time
+    :param repeats: Number of runs
+    :return: Best time in seconds
+    """
+
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench_tree(nodes: int = 1000, fan_out: int = 3, repeats: int = 5) -> Dict[str, Any]:
+    """
+    Compare nested node dictionaries with AnalysisTree for one tree size.
+
+    Memory is the traced allocation of the node structures. Serialization builds the
+    visualization data and dumps the nested tree to JSON.
+
+    :param nodes: Number of nodes
+    :param fan_out: Children per node
+    :param repeats: Timed runs, the best one is reported
+    :return: Bytes per node and serialization time of both representations
+    """
+
+    dict_root, dict_bytes = _allocated(lambda: build_dict_tree(nodes, fan_out))
+    tree, tree_bytes = _allocated(lambda: build_analysis_tree(nodes, fan_out))
+
+    def serialize_dicts():
+        dict_tree_visualization(dict_root)
+        json.dumps(dict_root)
+
+    def serialize_tree():
+        tree.to_visualization()
+        json.dumps(tree.to_dict())
+
+    return {
+        "nodes": nodes,
+        "dict_bytes_per_node": round(dict_bytes / nodes),
+        "tree_bytes_per_node": round(tree_bytes / nodes),
+        "dict_serialize_s": round(_timed(serialize_dicts, repeats), 4),
+        "tree_serialize_s": round(_timed(serialize_tree, repeats), 4)
+    }
+
+
+def bench_visualization(nodes: int = 10000, fan_out: int = 3, repeats: int = 3) -> Dict[str, Any]:
+    """
+    Compare building the visualization data after the analysis with list scans against
+    the incremental VisualizationGraph.
+
+    The scan builds the data from the finished tree and walks it twice for the depth, as
+    the Executor did. The incremental graph receives every node once as it is decided,
+    plus a repeated update of each node to exercise the upsert and edge dedupe paths.
+
+    :param nodes: Number of nodes
+    :param fan_out: Children per node
+    :param repeats: Timed runs of the incremental graph, the best one is reported
+    :return: Build times of both approaches and the resulting sizes
+    """
+
+    dict_root = build_dict_tree(nodes, fan_out)
+    tree = build_analysis_tree(nodes, fan_out)
+    order = list(tree)
+
+    def scan():
+        data = dict_tree_visualization(dict_root)
+        # The depth was computed once for the log and once for the metrics
+        dict_tree_depth(dict_root)
+        return data, dict_tree_depth(dict_root)
+
+    def incremental():
+        graph = VisualizationGraph()
+        for node in order:
+            graph.add_node(node.to_visualization(), node.parent_id)
+        for node in order:
+            graph.add_node(node.to_visualization(), node.parent_id)
+        return graph.to_dict(), graph.max_depth
+
+    # The scan is quadratic, a single run is enough at this size
+    started = time.perf_counter()
+    scan_data, scan_depth = scan()
+    scan_s = time.perf_counter() - started
+    incremental_s = _timed(incremental, repeats)
+    graph_data, graph_depth = incremental()
+
+    if (len(scan_data["nodes"]), len(scan_data["edges"]), scan_depth) != (len(graph_data["nodes"]), len(graph_data["edges"]), graph_depth):
+        raise RuntimeError("Incremental graph does not match the scanned visualization data")
+
+    return {
+        "nodes": nodes,
+        "edges": len(graph_data["edges"]),
+        "max_depth": graph_depth,
+        "scan_build_s": round(scan_s, 4),
+        "incremental_build_s": round(incremental_s, 4),
+        "incremental_us_per_upsert": round(incremental_s / (2 * nodes) * 1e6, 2)
+    }
+
+
+def chained_sanitize(content: str) -> str:
+    """Sanitize a label with the chained replacements MermaidGenerator used before its translation table."""
+
+    content = (content
+        .replace('**', '').replace('*', '').replace('###', '').replace('####', '').replace('#', ''))
+    content = (content
+        .replace('{{', '').replace('}}', '').replace('(', '').replace(')', '').replace('[', '').replace(']', '')
+        .replace('{', '').replace('}', '').replace(':', ': ').replace('\n', '<br>').replace('"', "'").replace('&', 'and'))
+    content = ' '.join(content.split())
+    content = re.sub(r'http[s]?://\S+', '', content)
+    return content.strip()
+
+
+def bench_mermaid(nodes: int = None, fan_out: int = 3, repeats: int = 3) -> Dict[str, Any]:
+    """
+    Measure the Mermaid diagram generation at 100, 1,000 and 10,000 nodes.
+
+    Every size is written with full detail and with level of detail (depth 4, labels of
+    60 characters). The peak is the traced memory while the full diagram is streamed.
+    The sanitizer is compared with the chained replacements on a query and a summary label.
+
+    :param nodes: Single tree size instead of the default sizes
+    :param fan_out: Children per node
+    :param repeats: Timed runs, the best one is reported
+    :return: Sanitizer time per label, and generation time, output size and peak memory per size
+    """
+
+    query = "How does **factor 1** (e.g. rates: 5%) affect [markets] & trade?\n### Context"
+    summary = (SUMMARY + "**Key finding**: rates (see [1]) & spreads\n") * 4
+    sanitizer = MermaidGenerator(tempfile.gettempdir())
+    runs = 2000
+    report = {"sanitize": {
+        f"{name}_{kind}_us": round(_timed(lambda: [clean(label) for _ in range(runs)], repeats) / runs * 1e6, 2)
+        for name, label in (("query", query), ("summary", summary))
+        for kind, clean in (("chained", chained_sanitize), ("table", sanitizer._sanitize_content))
+    }}
+
+    for size in ([nodes] if nodes else [100, 1000, 10000]):
+        data = build_analysis_tree(size, fan_out).to_visualization()
+        for i, entry in enumerate(data["nodes"]):
+            entry["query"] = f"How does **factor {i}** (e.g. rates: {i}%) affect [markets] & trade?\n### Context"
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            full = MermaidGenerator(output_dir)
+            lod = MermaidGenerator(output_dir, max_depth=4, max_label=60)
+
+            def write(generator: MermaidGenerator) -> int:
+                return generator.generate(data, "bench")["metadata"]["mermaid_bytes"]
+
+            gc.collect()
+            tracemalloc.start()
+            full_bytes = write(full)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            report[size] = {
+                "full_s": round(_timed(lambda: write(full), repeats), 4),
+                "full_kb": round(full_bytes / 1024, 1),
+                "full_peak_kb": round(peak / 1024, 1),
+                "lod_s": round(_timed(lambda: write(lod), repeats), 4),
+                "lod_kb": round(write(lod) / 1024, 1)
+            }
+    return report
+
+
+def bench_viewer(nodes: int = 10000, fan_out: int = 3, repeats: int = 3) -> Dict[str, Any]:
+    """
+    Measure the HTML viewer against embedding the whole analysis in one page.
+
+    The viewer page loads the tree index on open and one shard per selected node, the
+    monolithic size is the Mermaid diagram the previous page embedded.
+
+    :param nodes: Number of nodes
+    :param fan_out: Children per node
+    :param repeats: Timed runs, the best one is reported
+    :return: Generation time, index and shard sizes, and the monolithic diagram size
+    """
+
+    data = build_analysis_tree(nodes, fan_out).to_visualization()
+    with tempfile.TemporaryDirectory() as output_dir:
+        viewer = HtmlViewer(output_dir)
+        generate_s = _timed(lambda: viewer.generate(data, "bench"), repeats)
+        result = viewer.generate(data, "bench")
+        shard_dir = os.path.join(viewer.viewer_dir, "nodes")
+        shard_bytes = [os.path.getsize(os.path.join(shard_dir, name)) for name in os.listdir(shard_dir)]
+        monolithic = MermaidGenerator(output_dir).generate(data, "bench")["metadata"]["mermaid_bytes"]
+
+    return {
+        "nodes": nodes,
+        "generate_s": round(generate_s, 4),
+        "index_kb": round(result["index_bytes"] / 1024, 1),
+        "shards": result["shards"],
+        "max_shard_kb": round(max(shard_bytes) / 1024, 1),
+        "monolithic_kb": round(monolithic / 1024, 1)
+    }
+
+
+def bench_svg(nodes: int = None, fan_out: int = 3, repeats: int = 3, batch: int = 200) -> Dict[str, Any]:
+    """
+    Measure the tree layout and SVG rendering at 100, 1,000 and 10,000 nodes, and the
+    throughput of a batch of 100-node diagrams as rendered by `deot export-svg`.
+
+    :param nodes: Single tree size instead of the default sizes
+    :param fan_out: Children per node
+    :param repeats: Timed runs, the best one is reported
+    :param batch: Diagrams rendered in the batch measurement
+    :return: Layout time, render time and SVG size per size, and diagrams per second
+    """
+
+    layout = TreeLayout()
+    report = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        generator = MermaidGenerator(output_dir)
+        for size in ([nodes] if nodes else [100, 1000, 10000]):
+            data = build_analysis_tree(size, fan_out).to_visualization()
+            result = generator.generate_svg(data, "bench")
+            report[size] = {
+                "layout_s": round(_timed(lambda: layout.layout(layout.build(data)), repeats), 4),
+                "render_s": round(_timed(lambda: generator.generate_svg(data, "bench"), repeats), 4),
+                "svg_kb": round(result["svg_bytes"] / 1024, 1)
+            }
+
+        data = build_analysis_tree(100, fan_out).to_visualization()
+        started = time.perf_counter()
+        for i in range(batch):
+            generator.generate_svg(data, f"batch_{i}")
+        report["batch_diagrams_per_s"] = round(batch / (time.perf_counter() - started), 1)
+    return report
+
+
+SUITES = {
+    "tree": bench_tree,
+    "visualization": bench_visualization,
+    "mermaid": bench_mermaid,
+    "viewer": bench_viewer,
+    "svg": bench_svg
+}
+
+
+def run_micro_command(args) -> int:
+    """
+    Run micro benchmarks for parsed command line arguments.
+
+    :param args: Parsed arguments with suite, nodes and output
+    :return: Exit code
+    """
+
+    suites = [args.suite] if args.suite else list(SUITES)
+    report = {}
+    for suite in suites:
+        result = SUITES[suite](nodes=args.nodes) if args.nodes else SUITES[suite]()
+        report[suite] = result
+        print(f"[{suite}]")
+        for key, value in result.items():
+            if isinstance(value, dict):
+                print(f"  {key}")
+                for name, number in value.items():
+                    print(f"    {name:<26}{number}")
+            else:
+                print(f"  {key:<28}{value}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to: {args.output}")
+
+    return 0
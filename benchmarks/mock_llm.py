@@ -0,0 +1,272 @@
+import re
+import json
+import time
+import random
+import threading
+from typing import Dict, Any, Iterator, List, Optional
+from utils.llm_loader import LLMLoader
+
+# Default mock behaviour, every key can be overridden per benchmark configuration
+DEFAULT_MOCK_SETTINGS = {
+    "latency_ms": 200.0,
+    "model_latency_ms": {},
+    "model_malformed_ratio": {},
+    "jitter_ms": 50.0,
+    "failure_rate": 0.0,
+    "seed": 42,
+    "tasks_per_node": 2,
+    "breadth_ratio": 0.5,
+    "complete_ratio": 0.1,
+    "response_words": 120,
+    "repeat_ratio": 0.3,
+    "duplicate_ratio": 0.0
+}
+
+AGENTS = ["reasoning", "info_search", "history_analyzer", "news_search", "event_extractor"]
+
+
+class MockLLMError(Exception):
+    """Transient provider failure raised by the mock LLM."""
+
+    status_code = 503
+
+
+class MockLLMState:
+    """Shared random state and call counter of all mock handlers in a run."""
+
+    def __init__(self, settings: Dict[str, Any]):
+        """
+        Initialize the mock state.
+
+        :param settings: Mock settings merged over DEFAULT_MOCK_SETTINGS
+        """
+
+        self.settings = {**DEFAULT_MOCK_SETTINGS, **(settings or {})}
+        self.random = random.Random(self.settings["seed"])
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.wait_time = 0.0
+        self.sequence = 0
+        self.sentences: List[str] = []
+        self.queries: List[str] = []
+
+    def next_id(self) -> int:
+        """Get a unique number used to keep generated queries distinct."""
+
+        with self.lock:
+            self.sequence += 1
+            return self.sequence
+
+    def draw(self) -> float:
+        """Draw a uniform random number from the shared seeded generator."""
+
+        with self.lock:
+            return self.random.random()
+
+    def sentence(self) -> str:
+        """Get a sentence, reusing an earlier one with probability repeat_ratio."""
+
+        with self.lock:
+            if self.sentences and self.random.random() < self.settings["repeat_ratio"]:
+                return self.random.choice(self.sentences)
+
+            sentence = " ".join(f"term{self.random.randrange(2000)}" for _ in range(6)) + "."
+            self.sentences.append(sentence)
+            return sentence
+
+    def query(self, kind: str) -> str:
+        """Get a sub-query, repeating an earlier one with probability duplicate_ratio."""
+
+        with self.lock:
+            if self.queries and self.random.random() < self.settings["duplicate_ratio"]:
+                return self.random.choice(self.queries)
+
+            self.sequence += 1
+            query = f"Benchmark {kind} {self.sequence}"
+            self.queries.append(query)
+            return query
+
+    def wait(self, model_name: Optional[str] = None) -> None:
+        """
+        Sleep for one simulated request latency and maybe raise a failure.
+
+        :param model_name: Imitated model, model_latency_ms may override its base latency
+        """
+
+        base = (self.settings["model_latency_ms"] or {}).get(model_name, self.settings["latency_ms"])
+        latency = base + (self.draw() * 2 - 1) * self.settings["jitter_ms"]
+        latency = max(latency, 0.0) / 1000
+        time.sleep(latency)
+
+        failed = self.draw() < self.settings["failure_rate"]
+        with self.lock:
+            self.calls += 1
+            self.wait_time += latency
+            self.failures += failed
+
+        if failed:
+            raise MockLLMError("Mock LLM transient failure (503)")
+
+
+class MockLLMHandler:
+    """
+    MockLLMHandler imitates OpenAIHandler/PerplexityHandler without network access.
+    Responses are chosen by the first line of the system prompt and follow the formats
+    the prompters, engines and agents parse.
+    """
+
+    def __init__(self, state: MockLLMState, model_name: str = "mock", temperature: float = 0, max_tokens: Optional[int] = None):
+        """
+        Initialize the MockLLMHandler.
+
+        :param state: Shared mock state
+        :param model_name: The name of the model being imitated
+        :param temperature: Temperature, ignored
+        :param max_tokens: Optional limit of completion tokens, responses are cut at about 4 characters per token
+        """
+
+        self.state = state
+        self.model = model_name
+        self.max_tokens = max_tokens
+        self.last_usage = None
+
+    def chat(self, system_prompt: str, user_prompt: str) -> str:
+        """
+        Get a canned response after the simulated latency.
+
+        :param system_prompt: The system prompt content
+        :param user_prompt: The user prompt content
+        :return: The mock response
+        """
+
+        self.state.wait(self.model)
+        if self.state.draw() < (self.state.settings["model_malformed_ratio"] or {}).get(self.model, 0.0):
+            response = "I am not certain how to answer this in the requested format."
+        else:
+            response = self._respond(system_prompt.strip().split("\n")[0].lower(), user_prompt)
+        if self.max_tokens:
+            response = response[:self.max_tokens * 4]
+
+        # Cheap estimate so the benchmark never needs tokenizer downloads
+        self.last_usage = {
+            "prompt_tokens": (len(system_prompt) + len(user_prompt)) // 4,
+            "completion_tokens": len(response) // 4
+        }
+
+        return response
+
+    def chat_stream(self, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        """
+        Stream a canned response word by word.
+
+        :param system_prompt: The system prompt content
+        :param user_prompt: The user prompt content
+        :return: Iterator over response text chunks
+        """
+
+        for word in self.chat(system_prompt, user_prompt).split(" "):
+            yield word + " "
+
+    def _respond(self, first_line: str, user_prompt: str) -> str:
+        """Build the response for a prompt identified by its first system line."""
+
+        settings = self.state.settings
+
+        if "input optimization agent" in first_line:
+            query = user_prompt.strip().split("\n")[-1].split(":", 1)[-1].strip()
+            return json.dumps({
+                "optimized_query": query,
+                "original_query": query,
+                "modifications": []
+            })
+
+        if "task decomposition agent" in first_line:
+            return json.dumps(self._tasks())
+
+        if "root planning agent" in first_line:
+            query = user_prompt.strip().split("\n")[-1].split(":", 1)[-1].strip()
+            return json.dumps({
+                "optimized_query": query,
+                "original_query": query,
+                "modifications": [],
+                "tasks": self._tasks()
+            })
+
+        if "plan validator" in first_line:
+            return "The plan satisfies completeness and non-redundancy."
+
+        if "several sibling" in first_line:
+            return "\n\n".join(
+                f"[Sibling {number}]\n" + self._respond("analysis control system", "").split("\nAnalysis Focus")[0] +
+                "\nReasoning: benchmark reasoning"
+                for number in re.findall(r"\[Sibling (\d+)\]", user_prompt)
+            )
+
+        if "analysis control system" in first_line:
+            draw = self.state.draw()
+            if draw < settings["complete_ratio"]:
+                decision = "COMPLETE"
+            elif draw < settings["complete_ratio"] + (1 - settings["complete_ratio"]) * settings["breadth_ratio"]:
+                decision = "BREADTH"
+            else:
+                decision = "DEPTH"
+            response = f"Decision: {decision}\nAnalysis Focus: benchmark focus\nQuestions:\n- What follows?"
+
+            # Fused controller prompts also ask for the expansion of the decision
+            if "prepare that step" in user_prompt and decision != "COMPLETE":
+                response += "\n\n" + (
+                    self._aspects(user_prompt) if decision == "BREADTH"
+                    else self._respond("follow-up questions", user_prompt)
+                )
+            return response
+
+        if "critical dimensions" in first_line:
+            return self._aspects(user_prompt)
+
+        if "follow-up questions" in first_line:
+            return f"Question: {self.state.query('follow-up question')}?"
+
+        if "fact verification" in first_line:
+            return "[SUMMARY VALIDATION]\nSTATUS: VALID\nISSUES:\nEVIDENCE:\n- Benchmark evidence\n[END SUMMARY VALIDATION]"
+
+        return " ".join(self.state.sentence() for _ in range(max(settings["response_words"] // 6, 1)))
+
+    def _tasks(self) -> List[Dict[str, Any]]:
+        """Build a task plan rotating over the available agents."""
+
+        return [
+            {
+                "id": f"task{i + 1}",
+                "name": AGENTS[i % len(AGENTS)],
+                "input": f"benchmark input {self.state.next_id()}, 3",
+                "dep": []
+            }
+            for i in range(self.state.settings["tasks_per_node"])
+        ]
+
+    def _aspects(self, user_prompt: str) -> str:
+        """Build breadth aspects, as many as the prompt asks for."""
+
+        match = re.search(r"exactly (\d+)", user_prompt)
+        count = int(match.group(1)) if match else 3
+        return "\n\n".join(
+            f"Aspect: Dimension {i + 1}\nReasoning: Benchmark reasoning\nQuery: {self.state.query('aspect query')}"
+            for i in range(count)
+        )
+
+
+def install_mock_llm(settings: Optional[Dict[str, Any]] = None) -> MockLLMState:
+    """
+    Route every LLMLoader call to mock handlers.
+
+    :param settings: Mock settings merged over DEFAULT_MOCK_SETTINGS
+    :return: The shared mock state, exposing call, failure and wait counters
+    """
+
+    state = MockLLMState(settings)
+    LLMLoader().set_handler_factory(
+        lambda platform, **kwargs: MockLLMHandler(state, **kwargs)
+    )
+
+    return state
@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import tempfile
+from typing import Dict, Any, List, Optional
+from benchmarks.runner import load_benchmark_config
+from utils.logger import setup_logger
+from utils.model_router import ModelRouter
+
+logger = setup_logger("RoutingBenchmark")
+
+
+def load_queries(path: str) -> List[str]:
+    """
+    Load a recorded query set.
+
+    :param path: Text file with one query per line, lines starting with '#' are ignored
+    :return: List of queries
+    """
+
+    with open(path, 'r', encoding='utf-8') as f:
+        queries = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+    if not queries:
+        raise ValueError(f"No queries found in {path}")
+
+    return queries
+
+
+def run_queries(
+        queries: List[str],
+        router: ModelRouter,
+        executor_kwargs: Dict[str, Any],
+        mock_settings: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Analyze every query with one model routing and collect the LLM call records.
+
+    :param queries: Queries to analyze
+    :param router: Model routing applied to the calls
+    :param executor_kwargs: Additional Executor arguments such as max_layer and max_nodes
+    :param mock_settings: Mock LLM settings, None calls the providers
+    :return: Dictionary with the call records and the wall time of all analyses
+    """
+
+    from benchmarks.mock_llm import install_mock_llm
+    from executors.executor import Executor
+    from utils.llm_loader import LLMLoader
+    from utils.rate_limiter import RateLimiter
+    from utils.usage_tracker import UsageTracker
+
+    records = []
+    wall_time = 0.0
+
+    for query in queries:
+        # A freshly seeded mock per query gives both routings the same analysis trees
+        if mock_settings is not None:
+            install_mock_llm(mock_settings)
+            LLMLoader().rate_limiter = RateLimiter({"enabled": False})
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            executor = Executor(output_dir=output_dir, model_routing=router, **executor_kwargs)
+
+            started = time.perf_counter()
+            result = executor.process_query(query, analysis_dir=output_dir)
+            wall_time += time.perf_counter() - started
+
+        if "error" in result:
+            raise RuntimeError(f"Analysis of '{query}' failed: {result['error']}")
+
+        records.extend(UsageTracker().get_records(result["analysis_id"]))
+
+    return {"records": records, "wall_time": round(wall_time, 3)}
+
+
+def summarize_by_stage(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Aggregate call records per stage.
+
+    :param records: Call records from the usage tracker
+    :return: Mapping of stage to calls, models, mean latency, tokens and cost
+    """
+
+    stages = {}
+    for entry in records:
+        stage = stages.setdefault(entry["stage"], {
+            "calls": 0, "models": [], "latency": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0
+        })
+        stage["calls"] += 1
+        if entry["model"] not in stage["models"]:
+            stage["models"].append(entry["model"])
+        stage["latency"] += entry["latency"]
+        stage["prompt_tokens"] += entry["prompt_tokens"]
+        stage["completion_tokens"] += entry["completion_tokens"]
+        stage["cost"] += entry["cost"]
+
+    for stage in stages.values():
+        stage["mean_latency"] = round(stage["latency"] / stage["calls"], 3)
+        stage["latency"] = round(stage["latency"], 3)
+        stage["cost"] = round(stage["cost"], 6)
+
+    return stages
+
+
+def compare_routing(
+        queries: List[str],
+        candidate: ModelRouter,
+        baseline: ModelRouter,
+        executor_kwargs: Optional[Dict[str, Any]] = None,
+        mock_settings: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Run the query set with a baseline and a candidate model routing.
+
+    :param queries: Recorded query set
+    :param candidate: Model routing to evaluate
+    :param baseline: Model routing to compare against
+    :param executor_kwargs: Additional Executor arguments such as max_layer and max_nodes
+    :param mock_settings: Mock LLM settings, None calls the providers
+    :return: Report with per-stage usage of both routings
+    """
+
+    report = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "queries": queries}
+
+    for name, router in (("baseline", baseline), ("candidate", candidate)):
+        logger.info(f"[ROUTING] Running {len(queries)} queries with the {name} routing")
+        run = run_queries(queries, router, executor_kwargs or {}, mock_settings)
+        stages = summarize_by_stage(run["records"])
+        report[name] = {
+            "routes": router.describe(),
+            "wall_time": run["wall_time"],
+            "calls": sum(stage["calls"] for stage in stages.values()),
+            "cost": round(sum(stage["cost"] for stage in stages.values()), 6),
+            "stages": stages
+        }
+
+    return report
+
+
+def format_routing_report(report: Dict[str, Any]) -> str:
+    """
+    Format a routing comparison as a text table.
+
+    :param report: Report from compare_routing
+    :return: The formatted table
+    """
+
+    baseline, candidate = report["baseline"], report["candidate"]
+    header = (f"{'Stage':<20}{'Baseline model':<36}{'Candidate model':<36}{'Calls':>11}"
+              f"{'Latency(s)':>15}{'Cost($)':>19}")
+    lines = [header, "-" * len(header)]
+
+    empty = {"calls": 0, "models": ["-"], "mean_latency": 0.0, "cost": 0.0}
+    for stage in sorted(set(baseline["stages"]) | set(candidate["stages"])):
+        b = baseline["stages"].get(stage, empty)
+        c = candidate["stages"].get(stage, empty)
+        lines.append(
+            f"{stage:<20}{','.join(b['models']):<36}{','.join(c['models']):<36}"
+            f"{b['calls']:>5}/{c['calls']:<5}{b['mean_latency']:>7.2f}/{c['mean_latency']:<7.2f}"
+            f"{b['cost']:>9.4f}/{c['cost']:<9.4f}"
+        )
+
+    lines.append("-" * len(header))
+    lines.append(f"{len(report['queries'])} queries, baseline/candidate: wall time {baseline['wall_time']:.1f}s/{candidate['wall_time']:.1f}s, "
+                 f"{baseline['calls']}/{candidate['calls']} calls, cost ${baseline['cost']:.4f}/${candidate['cost']:.4f}")
+    return "\n".join(lines)
+
+
+def run_routing_command(args) -> int:
+    """
+    Compare model routings for parsed command line arguments.
+
+    :param args: Parsed arguments with routing, baseline_routing, queries, max_layer, max_nodes, mock, config and output
+    :return: Exit code
+    """
+
+    config = load_benchmark_config(args.config)
+    routing_config = config.get("routing", {}) or {}
+
+    queries = load_queries(args.queries or routing_config.get("queries", "benchmarks/routing_queries.txt"))
+    candidate = ModelRouter.from_config(args.routing or "config/model_routing.yaml")
+    # The comparison applies the candidate routes even when routing is switched off for analyses
+    candidate.enabled = True
+    baseline = ModelRouter.from_config(args.baseline_routing) if args.baseline_routing else ModelRouter({"enabled": False})
+
+    report = compare_routing(
+        queries,
+        candidate=candidate,
+        baseline=baseline,
+        executor_kwargs={
+            "max_layer": args.max_layer or routing_config.get("max_layer", 2),
+            "max_nodes": args.max_nodes or routing_config.get("max_nodes", 6)
+        },
+        mock_settings={**config.get("mock", {}), **routing_config.get("mock", {})} if args.mock else None
+    )
+    report["mock"] = bool(args.mock)
+
+    print(format_routing_report(report))
+
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to: {args.output}")
+
+    return 0
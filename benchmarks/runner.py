@@ -0,0 +1,346 @@
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import itertools
+import tempfile
+import subprocess
+import yaml
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from utils.logger import setup_logger
+
+logger = setup_logger("Benchmark")
+
+# Metrics compared against the baseline, all of them are better when lower
+COMPARED_METRICS = ["wall_time_s", "time_to_first_agent_call_s", "cpu_time_s", "peak_rss_mb", "llm_calls_per_node", "total_tokens"]
+
+SWEEP_KEYS = ["max_layer", "max_nodes", "fan_out", "concurrency", "synthesis_mode", "fused_expansion", "fused_planning", "novelty_threshold", "dedupe_threshold", "cascade", "batch_decisions"]
+
+
+def load_benchmark_config(config_path: Optional[str] = None, quick: bool = False) -> Dict[str, Any]:
+    """
+    Load the benchmark configuration.
+
+    :param config_path: Optional path to the benchmark YAML file
+    :param quick: Whether to apply the smaller 'quick' overrides
+    :return: Benchmark configuration
+    """
+
+    config_path = config_path or os.getenv("BENCHMARK_CONFIG", "config/benchmark.yaml")
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f) or {}
+
+    if quick:
+        overrides = config.get("quick", {}) or {}
+        config["mock"] = {**config.get("mock", {}), **overrides.get("mock", {})}
+        config["sweep"] = {**config.get("sweep", {}), **overrides.get("sweep", {})}
+
+    return config
+
+
+def expand_sweep(sweep: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Expand the sweep into the list of parameter combinations.
+
+    :param sweep: Mapping of parameter name to the values to sweep
+    :return: List of parameter dictionaries, each with a stable name
+    """
+
+    defaults = {
+        "max_layer": [3],
+        "max_nodes": [15],
+        "fan_out": [3],
+        "concurrency": [4],
+        "synthesis_mode": ["auto"],
+        "fused_expansion": [False],
+        "fused_planning": [False],
+        "novelty_threshold": [0],
+        "dedupe_threshold": [0],
+        "cascade": [False],
+        "batch_decisions": [False]
+    }
+    values = [sweep.get(key) or defaults[key] for key in SWEEP_KEYS]
+
+    runs = []
+    for combination in itertools.product(*values):
+        params = dict(zip(SWEEP_KEYS, combination))
+        params["name"] = "layer{max_layer}_nodes{max_nodes}_fan{fan_out}_conc{concurrency}_{synthesis_mode}".format(**params)
+        if params["fused_expansion"]:
+            params["name"] += "_fused"
+        if params["fused_planning"]:
+            params["name"] += "_fusedplan"
+        if params["novelty_threshold"]:
+            params["name"] += "_novelty{novelty_threshold}".format(**params)
+        if params["dedupe_threshold"]:
+            params["name"] += "_dedupe{dedupe_threshold}".format(**params)
+        if params["cascade"]:
+            params["name"] += "_cascade"
+        if params["batch_decisions"]:
+            params["name"] += "_batched"
+        runs.append(params)
+
+    return runs
+
+
+def run_single(params: Dict[str, Any], mock_settings: Dict[str, Any], query: str) -> Dict[str, Any]:
+    """
+    Run one analysis in the current process against the mock LLM and measure it.
+
+    :param params: Swept parameters of this run
+    :param mock_settings: Mock LLM settings
+    :param query: Query to analyze
+    :return: Measured metrics
+    """
+
+    from benchmarks.mock_llm import install_mock_llm
+    from executors.executor import Executor
+    from utils.llm_loader import LLMLoader
+    from utils.rate_limiter import RateLimiter
+
+    mock_state = install_mock_llm(mock_settings)
+
+    # No provider limits offline, but keep retries so mock failures exercise the retry path
+    LLMLoader().rate_limiter = RateLimiter({"enabled": False, "max_retries": 3, "retry_base_delay": 0.05})
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        executor = Executor(
+            max_layer=params["max_layer"],
+            max_nodes=params["max_nodes"],
+            output_dir=output_dir,
+            synthesis_mode=params["synthesis_mode"],
+            synthesis_workers=params["concurrency"],
+            max_aspects=params["fan_out"],
+            fused_expansion=params["fused_expansion"],
+            fused_planning=params["fused_planning"],
+            novelty_threshold=params["novelty_threshold"],
+            dedupe_threshold=params["dedupe_threshold"],
+            cascade=params["cascade"],
+            batch_decisions=params["batch_decisions"]
+        )
+
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        result = executor.process_query(query, analysis_dir=output_dir)
+        wall_time = time.perf_counter() - wall_start
+        cpu_time = time.process_time() - cpu_start
+
+    if "error" in result:
+        raise RuntimeError(f"Benchmark analysis failed: {result['error']}")
+
+    stats = result.get("stats", {})
+    totals = stats.get("llm_usage", {}).get("totals", {})
+    total_nodes = result.get("analysis_metrics", {}).get("total_nodes", 0)
+
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+    return {
+        "wall_time_s": round(wall_time, 3),
+        "time_to_first_agent_call_s": stats.get("time_to_first_agent_call", 0),
+        "cpu_time_s": round(cpu_time, 3),
+        "llm_wait_s": round(mock_state.wait_time, 3),
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "total_nodes": total_nodes,
+        "llm_calls": totals.get("calls", mock_state.calls),
+        "llm_calls_per_node": round(totals.get("calls", 0) / total_nodes, 2) if total_nodes else 0,
+        "llm_failures": mock_state.failures,
+        "aspects_generated": stats.get("aspects", {}).get("generated", 0),
+        "aspects_expanded": stats.get("aspects", {}).get("expanded", 0),
+        "novelty_skipped_calls": stats.get("novelty", {}).get("skipped_controller_calls", 0),
+        "duplicate_nodes": stats.get("dedupe", {}).get("duplicates", 0),
+        "cascade_escalations": sum(stage["escalations"] for stage in stats.get("cascade", {}).values()),
+        "cascade_latency_saved_s": round(sum(stage["latency_saved"] or 0 for stage in stats.get("cascade", {}).values()), 3),
+        "batched_decisions": stats.get("controller", {}).get("batch", {}).get("batched_decisions", 0),
+        "prompt_tokens": totals.get("prompt_tokens", 0),
+        "completion_tokens": totals.get("completion_tokens", 0),
+        "total_tokens": totals.get("prompt_tokens", 0) + totals.get("completion_tokens", 0)
+    }
+
+
+def run_in_subprocess(params: Dict[str, Any], mock_settings: Dict[str, Any], query: str) -> Dict[str, Any]:
+    """
+    Run one configuration in a fresh interpreter so peak RSS is measured per configuration.
+
+    :param params: Swept parameters of this run
+    :param mock_settings: Mock LLM settings
+    :param query: Query to analyze
+    :return: Measured metrics
+    """
+
+    payload = json.dumps({"params": params, "mock": mock_settings, "query": query})
+    env = {**os.environ, "LOG_LEVEL": os.getenv("BENCHMARK_LOG_LEVEL", "ERROR")}
+
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.runner", "--run-single", payload],
+        capture_output=True,
+        text=True,
+        env=env
+    )
+
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark run {params['name']} failed:\n{completed.stderr[-2000:]}")
+
+    return json.loads(completed.stdout.strip().split("\n")[-1])
+
+
+def run_benchmark(config: Dict[str, Any], repeats: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Run the full sweep.
+
+    :param config: Benchmark configuration
+    :param repeats: Optional number of repeats overriding the configuration
+    :return: Benchmark report with one entry per configuration
+    """
+
+    repeats = repeats or int(config.get("repeats", 1))
+    mock_settings = config.get("mock", {}) or {}
+    query = config.get("query", "What are the economic impacts of rising interest rates?")
+
+    results = []
+    for params in expand_sweep(config.get("sweep", {}) or {}):
+        logger.info(f"[BENCH] Running {params['name']} ({repeats}x)")
+        samples = [run_in_subprocess(params, mock_settings, query) for _ in range(repeats)]
+
+        # Report the median sample of every metric to dampen jitter
+        metrics = {
+            key: sorted(sample[key] for sample in samples)[len(samples) // 2]
+            for key in samples[0]
+        }
+        results.append({"name": params["name"], "params": params, "metrics": metrics, "samples": len(samples)})
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "mock": mock_settings,
+        "results": results
+    }
+
+
+def compare_results(
+        current: Dict[str, Any],
+        baseline: Dict[str, Any],
+        threshold: float = 0.15
+) -> List[Dict[str, Any]]:
+    """
+    Compare a benchmark report against a stored baseline.
+
+    :param current: Current benchmark report
+    :param baseline: Baseline benchmark report
+    :param threshold: Relative increase reported as a regression
+    :return: List of comparisons, each flagged with 'regression'
+    """
+
+    baseline_results = {result["name"]: result["metrics"] for result in baseline.get("results", [])}
+    comparisons = []
+
+    for result in current.get("results", []):
+        previous = baseline_results.get(result["name"])
+        if previous is None:
+            continue
+
+        for metric in COMPARED_METRICS:
+            old, new = previous.get(metric), result["metrics"].get(metric)
+            if not old or new is None:
+                continue
+
+            change = (new - old) / old
+            comparisons.append({
+                "name": result["name"],
+                "metric": metric,
+                "baseline": old,
+                "current": new,
+                "change": round(change, 4),
+                "regression": change > threshold
+            })
+
+    return comparisons
+
+
+def format_report(report: Dict[str, Any], comparisons: Optional[List[Dict[str, Any]]] = None) -> str:
+    """
+    Format a benchmark report as a text table.
+
+    :param report: Benchmark report
+    :param comparisons: Optional baseline comparisons
+    :return: The formatted table
+    """
+
+    header = f"{'Configuration':<40}{'Wall(s)':>9}{'CPU(s)':>8}{'RSS(MB)':>9}{'Nodes':>7}{'Calls/node':>12}{'Tokens':>9}"
+    lines = [header, "-" * len(header)]
+
+    for result in report.get("results", []):
+        m = result["metrics"]
+        lines.append(
+            f"{result['name']:<40}{m['wall_time_s']:>9.2f}{m['cpu_time_s']:>8.2f}{m['peak_rss_mb']:>9.1f}"
+            f"{m['total_nodes']:>7}{m['llm_calls_per_node']:>12.2f}{m['total_tokens']:>9}"
+        )
+
+    if comparisons is not None:
+        regressions = [c for c in comparisons if c["regression"]]
+        lines.append("")
+        lines.append(f"Compared {len(comparisons)} metrics against the baseline: {len(regressions)} regression(s)")
+        for c in regressions:
+            lines.append(f"  REGRESSION {c['name']} {c['metric']}: {c['baseline']} -> {c['current']} ({c['change']:+.1%})")
+
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point, also used for the per-configuration subprocesses."""
+
+    parser = argparse.ArgumentParser(description="DEoT offline benchmark")
+    parser.add_argument('--config', help='Benchmark configuration file')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--baseline', help='Baseline JSON report to compare against')
+    parser.add_argument('--threshold', type=float, help='Relative increase reported as a regression')
+    parser.add_argument('--repeats', type=int, help='Runs per configuration')
+    parser.add_argument('--quick', action='store_true', help='Run the small quick sweep')
+    parser.add_argument('--run-single', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_single:
+        payload = json.loads(args.run_single)
+        print(json.dumps(run_single(payload["params"], payload["mock"], payload["query"])))
+        return 0
+
+    return run_command(args)
+
+
+def run_command(args) -> int:
+    """
+    Run the benchmark for parsed command line arguments.
+
+    :param args: Parsed arguments with config, output, baseline, threshold, repeats and quick
+    :return: Exit code, 1 when regressions against the baseline were found
+    """
+
+    config = load_benchmark_config(args.config, quick=args.quick)
+    report = run_benchmark(config, repeats=args.repeats)
+
+    comparisons = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        threshold = args.threshold if args.threshold is not None else float(config.get("regression_threshold", 0.15))
+        comparisons = compare_results(report, baseline, threshold)
+        report["comparison"] = {"baseline": args.baseline, "threshold": threshold, "results": comparisons}
+
+    print(format_report(report, comparisons))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to: {args.output}")
+
+    if comparisons and any(c["regression"] for c in comparisons):
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
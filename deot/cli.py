@@ -12,7 +12,7 @@ import sys
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 
-from analyzers.dual_engine_analyzer import DualEngineAnalyzer
+from analyzers.analysis_history import AnalysisHistory
 from utils.logger import setup_logger
 
 # Setup logging
@@ -23,6 +23,8 @@ def analyze_command(args):
     logger.info(f"Starting analysis for query: {args.query}")
     
     try:
+        from analyzers.dual_engine_analyzer import DualEngineAnalyzer
+
         # Initialize the analyzer
         analyzer = DualEngineAnalyzer(
             max_layer=args.max_layer,
@@ -31,14 +33,45 @@ def analyze_command(args):
             model_name=args.model,
             temperature=args.temperature,
             output_dir=args.output_dir,
-            enable_validation=args.enable_validation
+            enable_validation=args.enable_validation,
+            synthesis_mode=args.synthesis,
+            synthesis_fan_in=args.fan_in,
+            synthesis_workers=args.synthesis_workers,
+            fused_expansion=args.fused_expansion or None,
+            fused_planning=args.fused_planning or None,
+            novelty_threshold=args.novelty_threshold,
+            dedupe_threshold=args.dedupe_threshold,
+            node_memo=args.node_memo or None,
+            controller_model=args.controller_model,
+            controller_confidence=args.controller_confidence,
+            log_decisions=args.log_decisions or None,
+            model_routing=args.model_routing,
+            cascade=args.cascade or None,
+            batch_decisions=args.batch_decisions or None,
+            diagram_depth=args.diagram_depth,
+            label_length=args.label_length,
+            page_layers=args.page_layers,
+            svg_export=args.svg or None,
+            output_layout=args.output_layout
         )
         
+        # Print the final response as it is generated unless streaming is disabled
+        stream_state = {"started": False}
+
+        def print_token(token: str):
+            if not stream_state["started"]:
+                stream_state["started"] = True
+                print("\nAnalysis response:")
+                print("-" * 80)
+            print(token, end="", flush=True)
+
         # Execute analysis
         result = analyzer.analyze(
             query=args.query,
             use_cache=False,  # Cache functionality has been removed
-            generate_visualization=True
+            generate_visualization=True,
+            stream_callback=None if args.no_stream else print_token,
+            trace=args.trace
         )
         
         # Get analysis ID
@@ -46,12 +79,18 @@ def analyze_command(args):
         output_dir = result.get("output_directory", "")
         
         # Output results
-        print(f"\nAnalysis completed (ID: {analysis_id})")
-        print(f"Results saved to: {output_dir}")
-        print("\nAnalysis response:")
-        print("-" * 80)
-        print(result.get("response", "No response generated"))
-        print("-" * 80)
+        if stream_state["started"]:
+            print()
+            print("-" * 80)
+            print(f"\nAnalysis completed (ID: {analysis_id})")
+            print(f"Results saved to: {output_dir}")
+        else:
+            print(f"\nAnalysis completed (ID: {analysis_id})")
+            print(f"Results saved to: {output_dir}")
+            print("\nAnalysis response:")
+            print("-" * 80)
+            print(result.get("response", "No response generated"))
+            print("-" * 80)
         
         # Add validation status to output if validation is enabled
         if args.enable_validation:
@@ -67,7 +106,14 @@ def analyze_command(args):
         if result.get("visualization", {}).get("mermaid_file"):
             mermaid_file = result["visualization"]["mermaid_file"]
             print(f"\nVisualization chart generated: {mermaid_file}")
+            if result["visualization"].get("viewer_file"):
+                print(f"Interactive viewer generated: {result['visualization']['viewer_file']}")
+            if result["visualization"].get("svg_file"):
+                print(f"SVG diagram generated: {result['visualization']['svg_file']}")
             print(f"Use the following command to view the chart: deot open {analysis_id}")
+
+        if result.get("trace_file"):
+            print(f"\nTrace written to: {result['trace_file']} (open it in https://ui.perfetto.dev)")
         
         return 0
     except Exception as e:
@@ -78,18 +124,23 @@ def analyze_command(args):
 def list_command(args):
     """List historical analyses"""
     try:
-        # Initialize the analyzer
-        analyzer = DualEngineAnalyzer(output_dir=args.output_dir)
+        # Read the history from the catalog, without setting up the analyzer
+        analysis_history = AnalysisHistory(args.output_dir, os.getenv("OUTPUT_LAYOUT", "flat"))
         
-        # Get analysis history
-        history = analyzer.get_analysis_history(limit=args.limit)
+        # Get one page of the analysis history
+        filters = dict(search=args.search, since=args.since, until=args.until, model=args.model)
+        offset = (max(args.page, 1) - 1) * args.limit
+        history = analysis_history.get_analysis_history(
+            limit=args.limit, offset=offset, sort=args.sort, ascending=args.asc, **filters
+        )
         
         if not history:
             print("No analysis records found")
             return 0
             
         # Display history
-        print(f"\nFound {len(history)} analysis records:")
+        total = analysis_history.count_analyses(**filters)
+        print(f"\nFound {total} analysis records, showing {offset + 1}-{offset + len(history)}:")
         print("-" * 80)
         print(f"{'ID':<25} | {'Date':<20} | {'Query':<50}")
         print("-" * 80)
@@ -112,6 +163,8 @@ def list_command(args):
             print(f"{item.get('analysis_id', ''):<25} | {formatted_time:<20} | {query:<50}")
             
         print("-" * 80)
+        if offset + len(history) < total:
+            print(f"Use 'deot list --page {max(args.page, 1) + 1}' for the next page")
         print("Use 'deot view <analysis_id>' to view a specific analysis")
         print("Use 'deot open <analysis_id>' to open the chart")
         
@@ -121,9 +174,88 @@ def list_command(args):
         print(f"Error: {str(e)}")
         return 1
 
+def search_command(args):
+    """Search the text of past analyses"""
+    try:
+        analysis_history = AnalysisHistory(args.output_dir, os.getenv("OUTPUT_LAYOUT", "flat"))
+        # Highlight matches in a terminal, mark them with brackets when piped
+        marker = ("\033[1m", "\033[0m") if sys.stdout.isatty() else ("[", "]")
+        started = datetime.now()
+        results = analysis_history.search_analyses(args.terms, limit=args.limit, since=args.since, until=args.until, marker=marker)
+        elapsed = (datetime.now() - started).total_seconds() * 1000
+
+        if not results:
+            print(f"No analyses match: {args.terms}")
+            return 0
+
+        print(f"\n{len(results)} best matches for: {args.terms} ({elapsed:.0f} ms)")
+        print("-" * 80)
+        for item in results:
+            try:
+                formatted_time = datetime.fromisoformat(item["created_at"]).strftime("%Y-%m-%d %H:%M")
+            except (TypeError, ValueError):
+                formatted_time = item.get("created_at") or ""
+            query = item["query"] if len(item["query"]) <= 47 else item["query"][:47] + "..."
+            print(f"{item['analysis_id']:<25} | {formatted_time:<16} | {query}")
+            print(f"    {' '.join(item['snippet'].split())}")
+        print("-" * 80)
+        print("Use 'deot view <analysis_id>' to view a specific analysis")
+        return 0
+    except Exception as e:
+        logger.error(f"Error searching analyses: {str(e)}", exc_info=True)
+        print(f"Error: {str(e)}")
+        return 1
+
+def reindex_command(args):
+    """Rebuild the analysis catalog from the result files"""
+    try:
+        analysis_history = AnalysisHistory(args.output_dir, os.getenv("OUTPUT_LAYOUT", "flat"))
+        started = datetime.now()
+        count = analysis_history.reindex()
+        print(f"Indexed {count} analyses in {(datetime.now() - started).total_seconds():.2f}s: {analysis_history.catalog.path}")
+        return 0
+    except Exception as e:
+        logger.error(f"Error rebuilding the catalog: {str(e)}", exc_info=True)
+        print(f"Error: {str(e)}")
+        return 1
+
+def migrate_layout_command(args):
+    """Move the saved analyses into another output layout"""
+    try:
+        from analyzers.dual_engine_analyzer import DualEngineAnalyzer
+        analyzer = DualEngineAnalyzer(output_dir=args.output_dir)
+        started = datetime.now()
+        counts = analyzer.migrate_layout(args.to, dry_run=args.dry_run)
+        action = "Would move" if args.dry_run else "Moved"
+        print(f"{action} {counts['moved']} analyses to the '{args.to}' layout in {(datetime.now() - started).total_seconds():.2f}s")
+        print(f"Updated paths: {counts['updated']}, already in place: {counts['unchanged']}, conflicts: {counts['conflicts']}")
+        if not args.dry_run and os.getenv("OUTPUT_LAYOUT", "flat") != args.to:
+            print(f"Set OUTPUT_LAYOUT={args.to} so new analyses use the same layout")
+        return 0 if not counts["conflicts"] else 1
+    except Exception as e:
+        logger.error(f"Error migrating the output layout: {str(e)}", exc_info=True)
+        print(f"Error: {str(e)}")
+        return 1
+
+def print_usage_table(usage):
+    """Print the per-stage LLM usage breakdown of an analysis"""
+    header = f"{'Stage':<22}{'Calls':>7}{'Prompt':>10}{'Completion':>12}{'Latency(s)':>12}{'Retries':>9}{'Cost($)':>10}"
+    print("LLM usage by stage:")
+    print(header)
+
+    rows = sorted(usage.get("by_stage", {}).items(), key=lambda item: item[1]["cost"], reverse=True)
+    for stage, totals in rows + [("TOTAL", usage.get("totals", {}))]:
+        if stage == "TOTAL":
+            print("-" * len(header))
+        print(f"{stage:<22}{totals.get('calls', 0):>7}{totals.get('prompt_tokens', 0):>10}"
+              f"{totals.get('completion_tokens', 0):>12}{totals.get('latency', 0):>12.2f}"
+              f"{totals.get('retries', 0):>9}{totals.get('cost', 0):>10.4f}")
+
 def view_command(args):
     """View a specific analysis"""
     try:
+        from analyzers.dual_engine_analyzer import DualEngineAnalyzer
+
         # Initialize the analyzer
         analyzer = DualEngineAnalyzer(output_dir=args.output_dir)
         
@@ -139,9 +271,15 @@ def view_command(args):
         print("-" * 80)
         print(f"Query: {analysis.get('query', 'No query')}")
         print(f"Time: {analysis.get('timestamp', 'Unknown')}")
-        print(f"Stats: Node count: {analysis.get('stats', {}).get('node_count', 0)}, "
-              f"Max depth: {analysis.get('stats', {}).get('max_depth', 0)}")
+        stats = analysis.get('stats', {})
+        print(f"Stats: Node count: {stats.get('total_nodes', stats.get('node_count', 0))}, "
+              f"Max depth: {stats.get('max_depth', 0)}")
         print("-" * 80)
+
+        if stats.get("llm_usage"):
+            print_usage_table(stats["llm_usage"])
+            print("-" * 80)
+
         print("Analysis response:")
         print(analysis.get("response", "No response"))
         print("-" * 80)
@@ -150,6 +288,8 @@ def view_command(args):
         if analysis.get("visualization", {}).get("mermaid_file"):
             mermaid_file = analysis["visualization"]["mermaid_file"]
             print(f"\nVisualization chart: {mermaid_file}")
+            if analysis["visualization"].get("viewer_file"):
+                print(f"Interactive viewer: {analysis['visualization']['viewer_file']}")
             print(f"Use the following command to open the chart: deot open {args.analysis_id}")
             
         return 0
@@ -161,6 +301,8 @@ def view_command(args):
 def open_command(args):
     """Open analysis chart"""
     try:
+        from analyzers.dual_engine_analyzer import DualEngineAnalyzer
+
         # Initialize the analyzer
         analyzer = DualEngineAnalyzer(output_dir=args.output_dir)
         
@@ -176,6 +318,14 @@ def open_command(args):
             print(f"This analysis has no chart")
             return 1
             
+        # Prefer the lazy viewer, analyses saved before it existed only have the chart
+        viewer_file = analysis["visualization"].get("viewer_file")
+        if viewer_file and os.path.exists(viewer_file) and not args.mermaid:
+            from visualization.html_viewer import HtmlViewer
+            if not HtmlViewer().open_viewer(viewer_file):
+                print(f"Could not open viewer. You can manually open the file: {viewer_file}")
+            return 0
+
         # Get chart file path
         mermaid_file = analysis["visualization"]["mermaid_file"]
         if not os.path.exists(mermaid_file):
@@ -196,6 +346,111 @@ def open_command(args):
         print(f"Error: {str(e)}")
         return 1
 
+def bench_command(args):
+    """Run the offline benchmark suite"""
+    try:
+        from benchmarks.runner import run_command
+        return run_command(args)
+    except Exception as e:
+        logger.error(f"Error running benchmark: {str(e)}", exc_info=True)
+        print(f"Error: {str(e)}")
+        return 1
+
+def compare_routing_command(args):
+    """Compare the per-stage latency and cost of two model routings"""
+    try:
+        from benchmarks.routing import run_routing_command
+        return run_routing_command(args)
+    except Exception as e:
+        logger.error(f"Error comparing model routings: {str(e)}", exc_info=True)
+        print(f"Error: {str(e)}")
+        return 1
+
+def export_svg_command(args):
+    """Render the trees of saved analyses to SVG files"""
+    try:
+        from visualization.html_viewer import HtmlViewer
+        from visualization.mermaid_generator import MermaidGenerator
+        from analyzers.dual_engine_analyzer import DualEngineAnalyzer
+
+        analyzer = DualEngineAnalyzer(output_dir=args.output_dir)
+        if args.analysis_ids:
+            directories = [
+                (analysis_id, analyzer.find_analysis_directory(analysis_id) or os.path.join(args.output_dir, analysis_id))
+                for analysis_id in args.analysis_ids
+            ]
+        elif args.all:
+            directories = [(item["analysis_id"], item["directory"]) for item in analyzer.get_analysis_history(limit=sys.maxsize)]
+        else:
+            print("Give analysis IDs or --all")
+            return 1
+
+        started = datetime.now()
+        rendered = 0
+        failed = 0
+        for analysis_id, analysis_dir in directories:
+            viewer_dir = os.path.join(analysis_dir, HtmlViewer.VIEWER_DIR)
+            if not os.path.exists(os.path.join(viewer_dir, "index.js")):
+                print(f"{analysis_id}: no viewer index, run the analysis again to render it")
+                failed += 1
+                continue
+
+            target_dir = args.svg_dir or analysis_dir
+            generator = MermaidGenerator(output_dir=target_dir, max_depth=args.diagram_depth, max_label=args.label_length)
+            result = generator.generate_svg(HtmlViewer.read_index(viewer_dir), analysis_id)
+            if result.get("svg_file"):
+                rendered += 1
+                print(f"{analysis_id}: {result['svg_file']} ({result['svg_bytes'] / 1024:.1f} KB)")
+            else:
+                failed += 1
+                print(f"{analysis_id}: {result.get('error')}")
+
+        elapsed = (datetime.now() - started).total_seconds()
+        print(f"\nRendered {rendered} SVG diagrams in {elapsed:.2f}s, {failed} failed")
+        return 0 if not failed else 1
+    except Exception as e:
+        logger.error(f"Error exporting SVG: {str(e)}", exc_info=True)
+        print(f"Error: {str(e)}")
+        return 1
+
+def micro_bench_command(args):
+    """Run the micro benchmarks of the analysis data structures"""
+    try:
+        from benchmarks.micro import run_micro_command
+        return run_micro_command(args)
+    except Exception as e:
+        logger.error(f"Error running micro benchmark: {str(e)}", exc_info=True)
+        print(f"Error: {str(e)}")
+        return 1
+
+def train_controller_command(args):
+    """Train the local engine controller model on logged decisions"""
+    try:
+        from engines.decision_model import train_decision_model
+
+        log_path = args.log or os.path.join(args.output_dir, "controller_decisions.jsonl")
+        model_path = args.output or os.path.join(args.output_dir, "controller_model.json")
+        report = train_decision_model(log_path, model_path, test_fraction=args.test_fraction, confidence=args.confidence)
+
+        print(f"Trained on {report['train_samples']} decisions, evaluated on {report['test_samples']} held-out decisions")
+        print(f"Class counts: {report['class_counts']}")
+        print(f"Accuracy: {report['accuracy']:.1%} (majority class baseline: {report['majority_baseline']:.1%})")
+        if report['fast_path_accuracy'] is not None:
+            print(f"At confidence >= {report['confidence']}: {report['fast_path_coverage']:.1%} of decisions answered locally, "
+                  f"{report['fast_path_accuracy']:.1%} accurate")
+        else:
+            print(f"At confidence >= {report['confidence']}: no decision is confident enough for the fast path")
+        speed = f"Prediction: {report['predict_us']:.1f} µs per decision"
+        if report['llm_decision_ms'] is not None:
+            speed += f" (logged LLM decisions: {report['llm_decision_ms']:.0f} ms)"
+        print(speed)
+        print(f"\nModel written to: {model_path}")
+        return 0
+    except Exception as e:
+        logger.error(f"Error training controller model: {str(e)}", exc_info=True)
+        print(f"Error: {str(e)}")
+        return 1
+
 def main():
     """Main function"""
     # Create main parser
@@ -232,12 +487,79 @@ def main():
                                help=f'Temperature setting (default: {default_temperature} from env)')
     parser_analyze.add_argument('--enable-validation', action='store_true', 
                                help='Enable validation mode')
+    parser_analyze.add_argument('--no-stream', action='store_true',
+                               help='Print the final response only after it is complete')
+    parser_analyze.add_argument('--trace', action='store_true',
+                               help='Write a Chrome Trace Event file (trace.json) of the analysis stages')
+    parser_analyze.add_argument('--synthesis', choices=['auto', 'single', 'tree'], default=os.getenv("SYNTHESIS_MODE", "auto"),
+                               help='Final response synthesis: one prompt, hierarchical tree reduction, or chosen by tree size')
+    parser_analyze.add_argument('--fan-in', type=int, default=int(os.getenv("SYNTHESIS_FAN_IN", "4")),
+                               help='Maximum syntheses merged by one call in tree synthesis')
+    parser_analyze.add_argument('--synthesis-workers', type=int, default=int(os.getenv("SYNTHESIS_WORKERS", "4")),
+                               help='Maximum parallel synthesis calls in tree synthesis')
+    parser_analyze.add_argument('--fused-expansion', action='store_true',
+                               help='Let one LLM call return the engine decision together with the aspects or follow-up question')
+    parser_analyze.add_argument('--fused-planning', action='store_true',
+                               help='Optimize the query and plan the root tasks in one LLM call')
+    parser_analyze.add_argument('--novelty-threshold', type=float, default=None,
+                               help='Complete a branch without a controller call when its summary novelty is below this value (0-1)')
+    parser_analyze.add_argument('--dedupe-threshold', type=float, default=None,
+                               help='Link sub-queries at least this similar (0-1) to an already analyzed query instead of analyzing them again')
+    parser_analyze.add_argument('--node-memo', action='store_true',
+                               help='Reuse nodes generated for the same sub-query by recent analyses')
+    parser_analyze.add_argument('--controller-model', default=None,
+                               help='Trained controller model (see train-controller) answering confident engine decisions locally')
+    parser_analyze.add_argument('--controller-confidence', type=float, default=None,
+                               help='Minimum model probability for a local engine decision (default: 0.9)')
+    parser_analyze.add_argument('--log-decisions', action='store_true',
+                               help='Log the features and LLM engine decisions to controller_decisions.jsonl for training')
+    parser_analyze.add_argument('--model-routing', default=None,
+                               help='Stage model routing file (default: config/model_routing.yaml)')
+    parser_analyze.add_argument('--cascade', action='store_true',
+                               help='Try the small model of each cascaded stage first and escalate responses that fail its checks')
+    parser_analyze.add_argument('--batch-decisions', action='store_true',
+                               help='Decide the children of a breadth node with one batched engine controller call')
+    parser_analyze.add_argument('--diagram-depth', type=int, default=None,
+                               help='Deepest layer drawn in the diagram, deeper subtrees are collapsed (default: all layers)')
+    parser_analyze.add_argument('--label-length', type=int, default=None,
+                               help='Truncate diagram labels to this many characters (default: full labels)')
+    parser_analyze.add_argument('--page-layers', type=int, default=None,
+                               help='Split the diagram into files of this many layers (default: one file)')
+    parser_analyze.add_argument('--svg', action='store_true',
+                               help='Also render the analysis tree to an SVG file')
+    parser_analyze.add_argument('--output-layout', choices=['flat', 'date'], default=None,
+                               help='Place the analysis in output/<id> (flat) or output/YYYY/MM/DD/<id> (date)')
     parser_analyze.set_defaults(func=analyze_command)
     
     # list command
     parser_list = subparsers.add_parser('list', help='List historical analyses')
     parser_list.add_argument('--limit', type=int, default=10, help='Maximum display count')
+    parser_list.add_argument('--page', type=int, default=1, help='Page of --limit records to show')
+    parser_list.add_argument('--search', help='Only analyses whose query contains this text')
+    parser_list.add_argument('--since', help='Only analyses from this date or ISO time on (e.g. 2024-06-01)')
+    parser_list.add_argument('--until', help='Only analyses up to this date or ISO time')
+    parser_list.add_argument('--model', help='Only analyses that used this model')
+    parser_list.add_argument('--sort', choices=['date', 'nodes', 'tokens', 'cost', 'query'], default='date', help='Sort key (default: date)')
+    parser_list.add_argument('--asc', action='store_true', help='Oldest or smallest first')
     parser_list.set_defaults(func=list_command)
+
+    # search command
+    parser_search = subparsers.add_parser('search', help='Search the queries, summaries and responses of past analyses')
+    parser_search.add_argument('terms', help='Words or "quoted phrases" that must all occur, word* matches a prefix')
+    parser_search.add_argument('--since', help='Only analyses from this date or ISO time on (e.g. 2024-06-01)')
+    parser_search.add_argument('--until', help='Only analyses up to this date or ISO time')
+    parser_search.add_argument('--limit', type=int, default=10, help='Maximum number of results')
+    parser_search.set_defaults(func=search_command)
+
+    # reindex command
+    parser_reindex = subparsers.add_parser('reindex', help='Rebuild the analysis catalog from the result files')
+    parser_reindex.set_defaults(func=reindex_command)
+
+    # migrate-layout command
+    parser_migrate = subparsers.add_parser('migrate-layout', help='Move the saved analyses into another output layout, rerun to resume')
+    parser_migrate.add_argument('--to', choices=['flat', 'date'], default='date', help='Target layout (default: date)')
+    parser_migrate.add_argument('--dry-run', action='store_true', help='Only count the analyses that would be moved')
+    parser_migrate.set_defaults(func=migrate_layout_command)
     
     # view command
     parser_view = subparsers.add_parser('view', help='View a specific analysis')
@@ -247,7 +569,55 @@ def main():
     # open command
     parser_open = subparsers.add_parser('open', help='Open analysis chart')
     parser_open.add_argument('analysis_id', help='Analysis ID')
+    parser_open.add_argument('--mermaid', action='store_true',
+                            help='Open the full Mermaid chart instead of the interactive viewer')
     parser_open.set_defaults(func=open_command)
+
+    # export-svg command
+    parser_svg = subparsers.add_parser('export-svg', help='Render the trees of saved analyses to SVG without a browser')
+    parser_svg.add_argument('analysis_ids', nargs='*', help='Analysis IDs')
+    parser_svg.add_argument('--all', action='store_true', help='Render every analysis in the output directory')
+    parser_svg.add_argument('--svg-dir', help='Write the SVG files to this directory (default: each analysis directory)')
+    parser_svg.add_argument('--diagram-depth', type=int, default=None, help='Deepest layer drawn, deeper subtrees are collapsed')
+    parser_svg.add_argument('--label-length', type=int, default=None, help='Truncate labels to this many characters')
+    parser_svg.set_defaults(func=export_svg_command)
+
+    # bench command
+    parser_bench = subparsers.add_parser('bench', help='Run the offline benchmark against a mock LLM')
+    parser_bench.add_argument('--config', help='Benchmark configuration file (default: config/benchmark.yaml)')
+    parser_bench.add_argument('--output', help='Write the JSON report to this file')
+    parser_bench.add_argument('--baseline', help='Baseline JSON report to compare against, regressions exit with code 1')
+    parser_bench.add_argument('--threshold', type=float, help='Relative increase reported as a regression')
+    parser_bench.add_argument('--repeats', type=int, help='Runs per configuration')
+    parser_bench.add_argument('--quick', action='store_true', help='Run the small quick sweep')
+    parser_bench.set_defaults(func=bench_command)
+
+    # compare-routing command
+    parser_routing = subparsers.add_parser('compare-routing', help='Compare per-stage latency and cost of two model routings on a query set')
+    parser_routing.add_argument('--routing', help='Candidate routing file (default: config/model_routing.yaml)')
+    parser_routing.add_argument('--baseline-routing', help='Baseline routing file (default: no routing, component defaults)')
+    parser_routing.add_argument('--queries', help='Query set, one query per line (default: benchmarks/routing_queries.txt)')
+    parser_routing.add_argument('--max-layer', type=int, help='Maximum analysis layers per query (default: 2)')
+    parser_routing.add_argument('--max-nodes', type=int, help='Maximum nodes per query (default: 6)')
+    parser_routing.add_argument('--mock', action='store_true', help='Run against the mock LLM of the benchmark instead of the providers')
+    parser_routing.add_argument('--config', help='Benchmark configuration file (default: config/benchmark.yaml)')
+    parser_routing.add_argument('--output', help='Write the JSON report to this file')
+    parser_routing.set_defaults(func=compare_routing_command)
+
+    # micro-bench command
+    parser_micro = subparsers.add_parser('micro-bench', help='Benchmark the analysis data structures on synthetic trees')
+    parser_micro.add_argument('--suite', choices=['tree', 'visualization', 'mermaid', 'viewer', 'svg'], help='Run only this suite (default: all)')
+    parser_micro.add_argument('--nodes', type=int, help='Nodes of the synthetic tree (default: per suite)')
+    parser_micro.add_argument('--output', help='Write the JSON report to this file')
+    parser_micro.set_defaults(func=micro_bench_command)
+
+    # train-controller command
+    parser_train = subparsers.add_parser('train-controller', help='Train the local engine controller model on logged decisions')
+    parser_train.add_argument('--log', help='Decision log (default: <output-dir>/controller_decisions.jsonl)')
+    parser_train.add_argument('--output', help='Model file (default: <output-dir>/controller_model.json)')
+    parser_train.add_argument('--test-fraction', type=float, default=0.2, help='Fraction of decisions held out for evaluation')
+    parser_train.add_argument('--confidence', type=float, default=0.9, help='Confidence threshold to evaluate for the fast path')
+    parser_train.set_defaults(func=train_controller_command)
     
     # Parse command line arguments
     args = parser.parse_args()
@@ -2,10 +2,13 @@ from engines.base import BaseEngine
 from engines.breadth_engine import BreadthEngine
 from engines.depth_engine import DepthEngine
 from engines.engine_controller import EngineController
+from engines.decision_model import DecisionModel, DecisionLogger
 
 __all__ = [
     'BaseEngine',
     'BreadthEngine',
     'DepthEngine',
-    'EngineController'
+    'EngineController',
+    'DecisionModel',
+    'DecisionLogger'
 ]
\ No newline at end of file
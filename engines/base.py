@@ -1,4 +1,4 @@
-from typing import Dict, Any 
+from typing import Dict, Any, Callable, Optional
 from abc import ABC, abstractmethod 
 from utils import setup_logger, LLMLoader, PromptCategory, PromptLoader
 
@@ -8,6 +8,10 @@ class BaseEngine(ABC):
     It provides common functionality for engine initializations and operations.
     """
 
+    # Usage accounting tags, subclasses override stage
+    component = "engine"
+    stage = None
+
     def __init__(
             self, 
             name: str = "BaseEngine",
@@ -42,6 +46,8 @@ class BaseEngine(ABC):
             category: PromptCategory,
             system_prompt_name: str,
             user_prompt_name: str,
+            stage: Optional[str] = None,
+            accept: Optional[Callable[[str], bool]] = None,
             **prompt_kwargs
     ) -> str:
         """
@@ -50,6 +56,8 @@ class BaseEngine(ABC):
         :param category: Prompt category
         :param system_prompt_name: Name of the system prompt
         :param user_prompt_name: Name of the user prompt
+        :param stage: Optional stage tag for usage accounting, defaults to the class stage
+        :param accept: Optional check of the response, lets a model cascade escalate rejected responses
         :param prompt_kwargs: Additional keyword arguments for prompt formatting 
         """
 
@@ -76,7 +84,10 @@ class BaseEngine(ABC):
                     system_prompt=system_prompt,
                     user_prompt=user_prompt,
                     model_name=self.model_name,
-                    temperature=self.temperature
+                    temperature=self.temperature,
+                    component=self.component,
+                    stage=stage or self.stage,
+                    accept=accept
                 )
 
             except Exception as e:
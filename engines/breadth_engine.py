@@ -1,6 +1,6 @@
 from typing import Dict, Any, List 
 from engines.base import BaseEngine
-from utils import PromptCategory
+from utils import PromptCategory, traced
 
 class BreadthEngine(BaseEngine):
     """
@@ -8,6 +8,8 @@ class BreadthEngine(BaseEngine):
     It identifies different aspcets that might be affected and generate queries for each aspect.
     """
 
+    stage = "breadth"
+
     def __init__(
           self, 
           name="BreadthEngine",
@@ -27,11 +29,14 @@ class BreadthEngine(BaseEngine):
         self.max_aspects = max_aspects 
         self.logger.debug(f"BreadthEngine initialized with max_aspects = {max_aspects}")
 
+    @traced()
     def process(
             self, 
             node_summary: str,
             original_query: str, 
-            max_aspects: int = None 
+            max_aspects: int = None,
+            remaining_nodes: int = None,
+            remaining_depth: int = None
     ) -> List[Dict[str, Any]]:
         """
         Analyze content for braoder impact aspects.
@@ -39,24 +44,25 @@ class BreadthEngine(BaseEngine):
         :param node_summary: Summary of the node to analyze 
         :param original_query: Original user query 
         :param max_aspects: Maximum number of aspects to analyze
+        :param remaining_nodes: Nodes still available in the analysis budget
+        :param remaining_depth: Layers still available below the node, including the aspects' layer
         :return: List of impact aspects with their details
         """
 
         try:
-            # Use provided max_aspects or fall back to instance attribute 
-            if max_aspects is None:
-                max_aspects = self.max_aspects
+            max_aspects = self.aspect_budget(max_aspects, remaining_nodes, remaining_depth)
             
             response = self.process_with_prompts(
                 category=PromptCategory.BREADTH_ANALYSIS,
                 system_prompt_name="analyze/system",
                 user_prompt_name="analyze/user",
+                accept=self._accept_aspects,
                 content=node_summary,
                 original_query=original_query,
                 max_aspects=max_aspects
             )
 
-            aspects = self._parse_aspects(response)
+            aspects = self._parse_aspects(response)[:max_aspects]
             self.logger.info(f"Identified {len(aspects)} impact aspects")
             self.logger.debug(f"Aspects: {aspects}")
 
@@ -65,6 +71,36 @@ class BreadthEngine(BaseEngine):
         except Exception as e:
             return self.handle_error("analyze", e)
         
+    def aspect_budget(
+            self,
+            max_aspects: int = None,
+            remaining_nodes: int = None,
+            remaining_depth: int = None
+    ) -> int:
+        """
+        Get the number of aspects worth requesting with the remaining analysis budget.
+
+        Children are expanded depth-first and each of them usually continues as a depth
+        chain, so an aspect is expected to use about one node per remaining layer. Asking
+        for more aspects than the budget can expand only pays for unused tokens.
+
+        :param max_aspects: Maximum number of aspects, defaults to the instance attribute
+        :param remaining_nodes: Nodes still available in the analysis budget
+        :param remaining_depth: Layers still available below the node, including the aspects' layer
+        :return: Number of aspects to request, at least 1
+        """
+
+        if max_aspects is None:
+            max_aspects = self.max_aspects
+
+        if remaining_nodes is None:
+            return max_aspects
+
+        depth = max(1, remaining_depth or 1)
+        budget = -(-max(0, remaining_nodes) // depth)
+
+        return max(1, min(max_aspects, budget))
+
     def _parse_aspects(self, response: str) -> List[Dict[str, Any]]:
         """
         Parse the response from LLM into structured impact aspects.
@@ -109,5 +145,18 @@ class BreadthEngine(BaseEngine):
         except Exception as e:
             self.logger.error(f"Failed to parse aspects: {str(e)}")
             return []
+
+    def _accept_aspects(self, response: str) -> bool:
+        """
+        Check whether a response has at least one aspect, for model cascades.
+
+        :param response: Raw response from LLM
+        :return: True if an aspect block has both an Aspect and a Query line
+        """
+
+        return any(
+            "Aspect:" in block and "Query:" in block
+            for block in response.strip().split("\n\n")
+        )
         
         
\ No newline at end of file
@@ -0,0 +1,336 @@
+import os
+import re
+import json
+import time
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from utils.logger import setup_logger
+
+logger = setup_logger("DecisionModel")
+
+DECISIONS = ["BREADTH", "DEPTH", "COMPLETE"]
+
+PARENT_DECISIONS = ["ROOT", "BREADTH", "DEPTH"]
+
+FEATURE_NAMES = [
+    "layer",
+    "layer_fraction",
+    "layers_left",
+    "summary_words_log",
+    "entities_log",
+    "entity_density",
+    "numbers_log",
+    "summary_questions",
+    "query_words_log",
+    "query_questions"
+] + [f"parent_{parent.lower()}" for parent in PARENT_DECISIONS]
+
+# Capitalized words that do not start a sentence, a cheap proxy for named entities
+_ENTITY = re.compile(r"(?<![.!?]\s)(?<!^)\b[A-Z][a-zA-Z]+")
+_NUMBER = re.compile(r"\b\d[\d,.%]*")
+
+
+def extract_features(
+        content: str,
+        further_query: Optional[str],
+        current_layer: int,
+        max_layer: int,
+        parent_decision: Optional[str] = None
+) -> List[float]:
+    """
+    Extract the controller decision features of a node.
+
+    :param content: Node summary evaluated by the controller
+    :param further_query: Query of the node
+    :param current_layer: Layer of the node
+    :param max_layer: Maximum analysis depth
+    :param parent_decision: Decision of the parent node, None for the root
+    :return: Feature values in FEATURE_NAMES order
+    """
+
+    content = content or ""
+    further_query = further_query or ""
+    words = len(content.split())
+    entities = len(_ENTITY.findall(content))
+    parent = parent_decision if parent_decision in PARENT_DECISIONS else "ROOT"
+
+    return [
+        float(current_layer),
+        current_layer / max(max_layer, 1),
+        float(max(max_layer - current_layer, 0)),
+        float(np.log1p(words)),
+        float(np.log1p(entities)),
+        entities / words if words else 0.0,
+        float(np.log1p(len(_NUMBER.findall(content)))),
+        float(content.count("?")),
+        float(np.log1p(len(further_query.split()))),
+        float(further_query.count("?"))
+    ] + [1.0 if parent == option else 0.0 for option in PARENT_DECISIONS]
+
+
+class DecisionLogger:
+    """DecisionLogger appends (features, decision) pairs of LLM controller decisions to a JSONL file."""
+
+    def __init__(self, path: str):
+        """
+        Initialize DecisionLogger.
+
+        :param path: Path of the JSONL log file
+        """
+
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def log(self, features: List[float], decision: str, latency: Optional[float] = None) -> None:
+        """
+        Append one decision.
+
+        :param features: Features from extract_features
+        :param decision: Decision made by the LLM
+        :param latency: Seconds the LLM decision took
+        """
+
+        record = {
+            "features": features,
+            "decision": decision,
+            "latency": round(latency, 4) if latency is not None else None,
+            "timestamp": datetime.now().isoformat()
+        }
+
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            logger.warning(f"[DECISION LOG] Failed to log decision: {str(e)}")
+
+
+def load_decisions(path: str) -> Tuple[np.ndarray, np.ndarray, List[float]]:
+    """
+    Load logged decisions.
+
+    :param path: Path of the JSONL log file
+    :return: Tuple of the feature matrix, the class indices and the logged LLM latencies
+    """
+
+    features, labels, latencies = [], [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            if record.get("decision") not in DECISIONS or len(record.get("features", [])) != len(FEATURE_NAMES):
+                continue
+
+            features.append(record["features"])
+            labels.append(DECISIONS.index(record["decision"]))
+            if record.get("latency") is not None:
+                latencies.append(record["latency"])
+
+    return np.array(features, dtype=float).reshape(-1, len(FEATURE_NAMES)), np.array(labels, dtype=int), latencies
+
+
+class DecisionModel:
+    """DecisionModel is a multinomial logistic regression over the controller decision features."""
+
+    def __init__(
+            self,
+            weights: Optional[np.ndarray] = None,
+            bias: Optional[np.ndarray] = None,
+            mean: Optional[np.ndarray] = None,
+            scale: Optional[np.ndarray] = None
+    ):
+        """
+        Initialize DecisionModel, untrained unless parameters are given.
+
+        :param weights: Weight matrix of shape (features, classes)
+        :param bias: Bias vector of shape (classes,)
+        :param mean: Feature means used for standardization
+        :param scale: Feature standard deviations used for standardization
+        """
+
+        n_features, n_classes = len(FEATURE_NAMES), len(DECISIONS)
+        self.weights = weights if weights is not None else np.zeros((n_features, n_classes))
+        self.bias = bias if bias is not None else np.zeros(n_classes)
+        self.mean = mean if mean is not None else np.zeros(n_features)
+        self.scale = scale if scale is not None else np.ones(n_features)
+
+    def fit(
+            self,
+            features: np.ndarray,
+            labels: np.ndarray,
+            epochs: int = 500,
+            learning_rate: float = 0.5,
+            l2: float = 1e-3
+    ) -> "DecisionModel":
+        """
+        Train the model with full-batch gradient descent on the cross-entropy loss.
+
+        :param features: Feature matrix of shape (samples, features)
+        :param labels: Class indices into DECISIONS
+        :param epochs: Number of gradient steps
+        :param learning_rate: Step size
+        :param l2: L2 regularization strength
+        :return: The trained model
+        """
+
+        self.mean = features.mean(axis=0)
+        self.scale = features.std(axis=0)
+        self.scale[self.scale == 0] = 1.0
+
+        x = (features - self.mean) / self.scale
+        targets = np.eye(len(DECISIONS))[labels]
+        samples = len(x)
+
+        for _ in range(epochs):
+            error = self._softmax(x @ self.weights + self.bias) - targets
+            self.weights -= learning_rate * (x.T @ error / samples + l2 * self.weights)
+            self.bias -= learning_rate * error.mean(axis=0)
+
+        return self
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """
+        Predict class probabilities.
+
+        :param features: Feature matrix of shape (samples, features)
+        :return: Probabilities of shape (samples, classes) in DECISIONS order
+        """
+
+        return self._softmax(((features - self.mean) / self.scale) @ self.weights + self.bias)
+
+    def predict(self, features: List[float]) -> Tuple[str, float]:
+        """
+        Predict the decision of one node.
+
+        :param features: Features from extract_features
+        :return: Tuple of the decision and its probability
+        """
+
+        probabilities = self.predict_proba(np.asarray(features, dtype=float)[None, :])[0]
+        best = int(probabilities.argmax())
+        return DECISIONS[best], float(probabilities[best])
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        """Row-wise softmax."""
+
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def save(self, path: str, report: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Save the model as JSON.
+
+        :param path: Path of the model file
+        :param report: Optional training report stored with the model
+        """
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "feature_names": FEATURE_NAMES,
+                "classes": DECISIONS,
+                "weights": self.weights.tolist(),
+                "bias": self.bias.tolist(),
+                "mean": self.mean.tolist(),
+                "scale": self.scale.tolist(),
+                "report": report or {}
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "DecisionModel":
+        """
+        Load a model saved with save().
+
+        :param path: Path of the model file
+        :return: The loaded model
+        :raises ValueError: If the model was trained on different features or classes
+        """
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if data.get("feature_names") != FEATURE_NAMES or data.get("classes") != DECISIONS:
+            raise ValueError(f"Controller model {path} was trained on different features, retrain it")
+
+        return cls(
+            weights=np.array(data["weights"]),
+            bias=np.array(data["bias"]),
+            mean=np.array(data["mean"]),
+            scale=np.array(data["scale"])
+        )
+
+
+def train_decision_model(
+        log_path: str,
+        model_path: str,
+        test_fraction: float = 0.2,
+        confidence: float = 0.9,
+        seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Train a decision model on logged decisions and evaluate it on held-out decisions.
+
+    :param log_path: Path of the JSONL decision log
+    :param model_path: Path the trained model is written to
+    :param test_fraction: Fraction of the decisions held out for evaluation
+    :param confidence: Confidence threshold evaluated for the fast path
+    :param seed: Seed of the train/test split
+    :return: Training report with accuracy, fast path coverage and prediction speed
+    :raises ValueError: If there are too few logged decisions
+    """
+
+    features, labels, latencies = load_decisions(log_path)
+    if len(labels) < 10:
+        raise ValueError(f"Need at least 10 logged decisions to train, found {len(labels)} in {log_path}")
+
+    order = np.random.RandomState(seed).permutation(len(labels))
+    test_size = max(1, int(len(labels) * test_fraction))
+    test, train = order[:test_size], order[test_size:]
+
+    model = DecisionModel().fit(features[train], labels[train])
+
+    probabilities = model.predict_proba(features[test])
+    predicted = probabilities.argmax(axis=1)
+    confident = probabilities.max(axis=1) >= confidence
+    correct = predicted == labels[test]
+
+    # Time single-node predictions, the way the controller uses the model
+    started = time.perf_counter()
+    for row in features[test]:
+        model.predict(row)
+    predict_us = (time.perf_counter() - started) / len(test) * 1e6
+
+    report = {
+        "samples": int(len(labels)),
+        "train_samples": int(len(train)),
+        "test_samples": int(len(test)),
+        "class_counts": {decision: int((labels == i).sum()) for i, decision in enumerate(DECISIONS)},
+        "accuracy": round(float(correct.mean()), 4),
+        "majority_baseline": round(float(np.bincount(labels[test], minlength=len(DECISIONS)).max() / len(test)), 4),
+        "confidence": confidence,
+        "fast_path_coverage": round(float(confident.mean()), 4),
+        "fast_path_accuracy": round(float(correct[confident].mean()), 4) if confident.any() else None,
+        "predict_us": round(predict_us, 1),
+        "llm_decision_ms": round(float(np.mean(latencies)) * 1000, 1) if latencies else None,
+        "trained_at": datetime.now().isoformat()
+    }
+
+    model.save(model_path, report)
+    logger.info(f"[TRAIN] Controller model saved to {model_path} (accuracy {report['accuracy']})")
+    return report
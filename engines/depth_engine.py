@@ -1,10 +1,15 @@
 from typing import Dict, Any 
 from engines.base import BaseEngine
-from utils import PromptCategory
+from utils import PromptCategory, traced
 
 class DepthEngine(BaseEngine):
     """DepthEngine generates a single follow-up question to analyze the deeper implicationsor dimensions of a topic or event."""
 
+    stage = "depth"
+
+    # Fallback used when the response has no question
+    DEFAULT_QUESTION = "What are the primary factors influencing this situation?"
+
     def __init__(
             self,
             name="DepthEngine",
@@ -16,6 +21,7 @@ class DepthEngine(BaseEngine):
         super().__init__(name, platform, model_name, temperature)
         self.logger.debug("DepthEngine initialized successfully")
 
+    @traced()
     def process(
             self,
             content: str,
@@ -34,6 +40,7 @@ class DepthEngine(BaseEngine):
                 category=PromptCategory.DEPTH_ANALYSIS,
                 system_prompt_name="generate/system",
                 user_prompt_name="generate/user",
+                accept=self._accept_question,
                 content=content,
                 original_query=original_query
             )
@@ -68,7 +75,7 @@ class DepthEngine(BaseEngine):
             if 'question' not in question_data:
                 self.logger.warning("Response is missing required question field")
                 return {
-                    "question": "What are the primary factors influencing this situation?"
+                    "question": self.DEFAULT_QUESTION
                 }
             
             return question_data
@@ -76,9 +83,22 @@ class DepthEngine(BaseEngine):
         except Exception as e:
             self.logger.error(f"Failed to parse the follow-up question: {str(e)}")
             return {
-                "question": "What are the primary factors influencing this situation?"
+                "question": self.DEFAULT_QUESTION
             }
 
+    def _accept_question(self, response: str) -> bool:
+        """
+        Check whether a response has its own follow-up question, for model cascades.
+
+        :param response: Raw response from LLM
+        :return: False when parsing would fall back to the default question
+        """
+
+        return any(
+            line.startswith('Question:') and line.split(':', 1)[1].strip()
+            for line in response.strip().split('\n')
+        )
+
 
 
 
@@ -1,11 +1,21 @@
-from typing import Dict, Any, Optional 
+from typing import Dict, Any, List, Optional 
+import re
 import time 
 from engines.base import BaseEngine
-from utils import PromptCategory
+from engines.decision_model import DecisionLogger, DecisionModel, extract_features
+from utils import PromptCategory, traced
 
 class EngineController(BaseEngine):
     """Controls the evaluation of content to determine the next analysis step."""
 
+    stage = "controller"
+
+    # A decision line naming one of the engines or completion
+    DECISION_LINE = re.compile(r"^\s*Decision:\s*(BREADTH|DEPTH|COMPLETE)\s*$", re.MULTILINE)
+
+    # Header of one sibling's block in a batched response
+    SIBLING_HEADER = re.compile(r"^\s*\[Sibling (\d+)\]\s*$", re.MULTILINE)
+
     # Default values for fallback responses
     DEFAULT_DECISION = "BREADTH"
     DEFAULT_RESPONSE = {
@@ -23,7 +33,12 @@ class EngineController(BaseEngine):
             temperature=0,
             max_layer: int = 3,
             max_retries: int = 3,
-            retry_delay: float = 1.0
+            retry_delay: float = 1.0,
+            breadth_engine: Optional[BaseEngine] = None,
+            depth_engine: Optional[BaseEngine] = None,
+            decision_model: Optional[DecisionModel] = None,
+            model_confidence: float = 0.9,
+            decision_logger: Optional[DecisionLogger] = None
     ):
         """
         Initialize the EngineController.
@@ -35,13 +50,24 @@ class EngineController(BaseEngine):
         :param max_layer: Maximum analysis depth
         :param max_retries: Maximum number of retry attempts
         :param retry_delay: Delay between retries in seconds
+        :param breadth_engine: BreadthEngine whose parser reads aspects in fused mode
+        :param depth_engine: DepthEngine whose parser reads the follow-up question in fused mode
+        :param decision_model: Local model answering decisions it is confident about without an LLM call
+        :param model_confidence: Minimum model probability for a local decision
+        :param decision_logger: Logger recording the features and decision of every LLM decision
         """
 
         super().__init__(name, platform, model_name, temperature)
 
         self.max_layer = max_layer 
         self.max_retries = max_retries
-        self.retry_delaye = retry_delay 
+        self.retry_delay = retry_delay
+        self.breadth_engine = breadth_engine
+        self.depth_engine = depth_engine
+        self.decision_model = decision_model
+        self.model_confidence = model_confidence
+        self.decision_logger = decision_logger
+        self.reset_stats()
 
         self.logger.debug(
             f"[INIT] EngineController initialized with "
@@ -49,12 +75,20 @@ class EngineController(BaseEngine):
             f"retry_delay={retry_delay}"
         )
 
+    def reset_stats(self) -> None:
+        """Reset the decision counters, called at the start of every analysis."""
+
+        self.decision_counts = {"model": 0, "llm": 0}
+        self.batch_counts = {"batches": 0, "batched_decisions": 0, "fallbacks": 0}
+
+    @traced()
     def process(
             self, 
             content: str,
             original_query: str,
             further_query: Optional[str] = None,
-            current_layer: int = 1
+            current_layer: int = 1,
+            parent_decision: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Process the given content and determine the next analysis step.
@@ -63,6 +97,7 @@ class EngineController(BaseEngine):
         :param original_query; The orginal user query
         :param further_query: Any additional query for deeper analysis
         :param current_layer: the current depth of the analysis layer
+        :param parent_decision: Decision of the parent node, None for the root
         :return: A dictionary containing the decision, questions and layer information
         """
 
@@ -80,19 +115,263 @@ class EngineController(BaseEngine):
                     "analysis_focus": None
                 }
             
+            features = extract_features(content, further_query, current_layer, self.max_layer, parent_decision)
+            decision = self._fast_decision(features, current_layer)
+            if decision:
+                return decision
+
             # Evaluation logic with retry mechanism 
-            return self._evaluate_with_retry(content, original_query, further_query, current_layer)
+            return self._evaluate_with_retry(content, original_query, further_query, current_layer, features)
         
         except Exception as e:
             self.logger.error(f"Failed to process layer {current_layer}: {str(e)}")
             return self.handle_error("controller_process", e)
         
+    @traced()
+    def process_fused(
+            self,
+            content: str,
+            original_query: str,
+            further_query: Optional[str] = None,
+            current_layer: int = 1,
+            max_aspects: int = 3,
+            parent_decision: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Determine the next analysis step and generate its expansion in one LLM call.
+
+        The decision has the same structure as process(). A BREADTH decision also carries
+        'aspects' and a DEPTH decision carries 'follow_up', parsed like BreadthEngine and
+        DepthEngine results. When the expansion is missing from the response the key is
+        left out, so the caller can fall back to the engine. When the fused call fails
+        entirely, the two-call path is used through process().
+
+        :param content: The content to be evaluated
+        :param original_query: The original user query
+        :param further_query: Any additional query for deeper analysis
+        :param current_layer: The current depth of the analysis layer
+        :param max_aspects: Number of aspects requested for a BREADTH decision
+        :param parent_decision: Decision of the parent node, None for the root
+        :return: A dictionary containing the decision, questions, layer information and expansion
+        """
+
+        if current_layer >= self.max_layer or self.breadth_engine is None or self.depth_engine is None:
+            return self.process(content, original_query, further_query, current_layer, parent_decision)
+
+        # A local decision leaves the expansion to the engines
+        features = extract_features(content, further_query, current_layer, self.max_layer, parent_decision)
+        decision = self._fast_decision(features, current_layer)
+        if decision:
+            return decision
+
+        try:
+            started = time.perf_counter()
+            self.logger.info(f"Processing layer {current_layer}/{self.max_layer} (fused)...")
+
+            response = self.process_with_prompts(
+                category=PromptCategory.ENGINE_CONTROLLER,
+                system_prompt_name="evaluate_fused/system",
+                user_prompt_name="evaluate_fused/user",
+                stage="controller_fused",
+                accept=self._accept_fused,
+                original_query=original_query,
+                further_query=further_query or "None",
+                current_layer=current_layer,
+                max_layer=self.max_layer,
+                max_aspects=max_aspects,
+                content=content
+            )
+
+            self.logger.debug(f"Response: {response}")
+
+            # process_with_prompts reports failures as an error dictionary
+            if not isinstance(response, str):
+                raise RuntimeError(response.get("error", "LLM call failed"))
+
+            decision = self._parse_decision(response, current_layer)
+            if decision.get("decision") not in {"BREADTH", "DEPTH", "COMPLETE"}:
+                raise ValueError(f"Invalid decision: {decision.get('decision')}")
+
+            if decision["decision"] == "BREADTH":
+                aspects = self.breadth_engine._parse_aspects(response)
+                if aspects:
+                    decision["aspects"] = aspects[:max_aspects]
+            elif decision["decision"] == "DEPTH" and "Question:" in response:
+                decision["follow_up"] = self.depth_engine._parse_question(response)
+
+            self._log_decision(features, decision["decision"], time.perf_counter() - started)
+
+            self.logger.info(f"Layer {current_layer}: {decision['decision']} (fused)")
+            return decision
+
+        except Exception as e:
+            self.logger.warning(f"Fused evaluation failed, falling back to separate calls: {str(e)}")
+            return self._evaluate_with_retry(content, original_query, further_query, current_layer, features)
+
+    @traced()
+    def process_batch(
+            self,
+            items: List[Dict[str, Any]],
+            original_query: str,
+            current_layer: int = 1,
+            parent_decision: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Determine the next analysis step of sibling nodes with one LLM call.
+
+        Siblings share the original query, the layer and the system prompt, so one
+        structured request replaces one call per sibling. Local model decisions are taken
+        first. Siblings whose block of the batched response is missing or invalid, or all
+        of them when the call fails, are evaluated with individual calls.
+
+        :param items: Sibling nodes as dictionaries with 'content' and 'further_query'
+        :param original_query: The original user query
+        :param current_layer: The layer of the siblings
+        :param parent_decision: Decision of the siblings' parent node
+        :return: Decisions in the order of the items, structured like process() results
+        """
+
+        if current_layer >= self.max_layer or len(items) < 2:
+            return [
+                self.process(item["content"], original_query, item.get("further_query"), current_layer, parent_decision)
+                for item in items
+            ]
+
+        features = [
+            extract_features(item["content"], item.get("further_query"), current_layer, self.max_layer, parent_decision)
+            for item in items
+        ]
+        decisions = [self._fast_decision(item_features, current_layer) for item_features in features]
+        pending = [i for i, decision in enumerate(decisions) if decision is None]
+
+        if len(pending) < 2:
+            for i in pending:
+                decisions[i] = self._evaluate_with_retry(
+                    items[i]["content"], original_query, items[i].get("further_query"), current_layer, features[i]
+                )
+            return decisions
+
+        started = time.perf_counter()
+        self.logger.info(f"Processing layer {current_layer}/{self.max_layer} ({len(pending)} siblings batched)...")
+
+        response = self.process_with_prompts(
+            category=PromptCategory.ENGINE_CONTROLLER,
+            system_prompt_name="evaluate_batch/system",
+            user_prompt_name="evaluate_batch/user",
+            stage="controller_batch",
+            accept=lambda text: all(self._parse_batch(text, len(pending))),
+            original_query=original_query,
+            current_layer=current_layer,
+            max_layer=self.max_layer,
+            count=len(pending),
+            siblings=self._format_siblings([items[i] for i in pending])
+        )
+        self.batch_counts["batches"] += 1
+
+        # process_with_prompts reports failures as an error dictionary
+        if isinstance(response, str):
+            blocks = self._parse_batch(response, len(pending))
+        else:
+            self.logger.warning(f"Batched evaluation failed, falling back to separate calls: {response.get('error')}")
+            blocks = [None] * len(pending)
+
+        latency = (time.perf_counter() - started) / len(pending)
+        for i, block in zip(pending, blocks):
+            if block is None:
+                self.batch_counts["fallbacks"] += 1
+                decisions[i] = self._evaluate_with_retry(
+                    items[i]["content"], original_query, items[i].get("further_query"), current_layer, features[i]
+                )
+                continue
+
+            decisions[i] = self._parse_decision(block, current_layer)
+            self.batch_counts["batched_decisions"] += 1
+            self._log_decision(features[i], decisions[i]["decision"], latency)
+            self.logger.info(f"Layer {current_layer}: {decisions[i]['decision']} (batched)")
+
+        return decisions
+
+    def _format_siblings(self, items: List[Dict[str, Any]]) -> str:
+        """
+        Format sibling nodes for the batched evaluation prompt.
+
+        :param items: Sibling nodes with 'content' and 'further_query'
+        :return: Numbered sibling sections
+        """
+
+        return "\n\n".join(
+            f"[Sibling {number}]\nFurther Query: {item.get('further_query') or 'None'}\nContent to evaluate:\n{item['content']}"
+            for number, item in enumerate(items, 1)
+        )
+
+    def _parse_batch(self, response: str, count: int) -> List[Optional[str]]:
+        """
+        Split a batched response into the blocks of the siblings.
+
+        :param response: Raw batched response from the LLM
+        :param count: Number of siblings in the request
+        :return: Block of each sibling in request order, None where it is missing or has no valid decision
+        """
+
+        blocks = {}
+        headers = list(self.SIBLING_HEADER.finditer(response))
+        for header, following in zip(headers, headers[1:] + [None]):
+            end = following.start() if following is not None else len(response)
+            blocks.setdefault(int(header.group(1)), response[header.end():end])
+
+        return [
+            blocks.get(number) if self.DECISION_LINE.search(blocks.get(number, "")) else None
+            for number in range(1, count + 1)
+        ]
+
+    def _fast_decision(self, features: List[float], current_layer: int) -> Optional[Dict[str, Any]]:
+        """
+        Answer a decision with the local model when it is confident enough.
+
+        :param features: Features of the node
+        :param current_layer: Current analysis layer
+        :return: The decision, or None if the LLM has to decide
+        """
+
+        if self.decision_model is None:
+            return None
+
+        decision, confidence = self.decision_model.predict(features)
+        if confidence < self.model_confidence:
+            self.logger.debug(f"Model decision {decision} ({confidence:.2f}) below confidence {self.model_confidence}, asking the LLM")
+            return None
+
+        self.decision_counts["model"] += 1
+        self.logger.info(f"Layer {current_layer}: {decision} (model, {confidence:.2f})")
+        return {
+            "decision": decision,
+            "questions": [],
+            "layer": current_layer,
+            "analysis_focus": None,
+            "source": "model",
+            "confidence": round(confidence, 4)
+        }
+
+    def _log_decision(self, features: Optional[List[float]], decision: str, latency: float) -> None:
+        """
+        Count an LLM decision and log it as training data.
+
+        :param features: Features of the node, None if they were not extracted
+        :param decision: Decision made by the LLM
+        :param latency: Seconds the decision took
+        """
+
+        self.decision_counts["llm"] += 1
+        if self.decision_logger is not None and features is not None:
+            self.decision_logger.log(features, decision, latency)
+
     def _evaluate_with_retry(
             self,
             content: str, 
             original_query: str,
             further_query: Optional[str],
-            current_layer: int 
+            current_layer: int,
+            features: Optional[List[float]] = None
     ) -> Dict[str, Any]:
         """
         Evaluate content with retry mechanism.
@@ -101,9 +380,11 @@ class EngineController(BaseEngine):
         :param orignal_query: Original user query
         :param further_query: Additional query for deeper analysis
         :param current_layer: Current analysis layer
+        :param features: Features of the node, logged with the decision
         :return: Evaluation decision
         """
 
+        started = time.perf_counter()
         for attempt in range(self.max_retries):
             try:
                 self.logger.debug(f"Evaluation attempt {attempt + 1}/{self.max_retries}")
@@ -112,6 +393,7 @@ class EngineController(BaseEngine):
                     category=PromptCategory.ENGINE_CONTROLLER,
                     system_prompt_name="evaluate/system",
                     user_prompt_name="evaluate/user",
+                    accept=self._accept_decision,
                     original_query=original_query,
                     further_query=further_query or "None",
                     current_layer=current_layer,
@@ -126,6 +408,7 @@ class EngineController(BaseEngine):
                     raise ValueError(f"Invalid decision: {decision.get('decision')}")
                 
                 self.logger.info(f"Layer {current_layer}: {decision['decision']}")
+                self._log_decision(features, decision["decision"], time.perf_counter() - started)
                 return decision 
             
             except Exception as e:
@@ -146,54 +429,78 @@ class EngineController(BaseEngine):
                         "layer": current_layer
                     }
                 
+    def _accept_decision(self, response: str) -> bool:
+        """
+        Check whether a response has a valid decision line, for model cascades.
+
+        :param response: Raw response from LLM
+        :return: True if a Decision line names BREADTH, DEPTH or COMPLETE
+        """
+
+        return self.DECISION_LINE.search(response) is not None
+
+    def _accept_fused(self, response: str) -> bool:
+        """
+        Check whether a fused response has a valid decision and its expansion, for model cascades.
+
+        :param response: Raw response from LLM
+        :return: True if the decision is COMPLETE or comes with its aspects or follow-up question
+        """
+
+        match = self.DECISION_LINE.search(response)
+        if match is None:
+            return False
+
+        if match.group(1) == "BREADTH":
+            return self.breadth_engine._accept_aspects(response)
+        if match.group(1) == "DEPTH":
+            return self.depth_engine._accept_question(response)
+        return True
+
     def _parse_decision(self, response: str, current_layer: int) -> Dict[str, Any]:
         """
         Parse the LLM response into a structured decision dictionary.
 
         :param response: The raw response string from the LLM
-        :param current_layer: The current layer number for fallback
+        :param current_layer: The current layer number
         :return: A dictionary containing the decision, reasoning, questions, and layer information
+        :raises ValueError: If the response is not text or has no valid Decision line
         """
 
-        try:
-            lines = [line.strip() for line in response.split('\n') if line.strip()]
-            decision = {
-                'layer': current_layer,
-                'questions': [],
-                'analysis_focus': None 
-            }
-
-            current_section = None 
-            questions = []
-
-            for line in lines:
-                if line.startswith('Decision:'):
-                    decision['decision'] = line.split(':', 1)[1].strip()
-                    current_section = 'decision'
-                elif line.startswith('Questions:'):
-                    current_section = 'questions'
-                elif line.startswith('Analysis Focus:'):
-                    decision['analysis_focus'] = line.split(':', 1)[1].strip()
-                    current_section = 'focus'
-                elif current_section == 'questions' and line.startswith('- '):
-                    questions.append(line[2:].strip())
-
-            decision['questions'] = questions
-
-            # Validate required fields 
-            required_fields = {'decision', 'layer', 'questions', 'analysis_focus'}
-            if not all(field in decision for field in required_fields):
-                missing = required_fields - set(decision.keys())
-                raise ValueError(f"Missing fields: {missing}")
-
-            self.logger.info(f"Decision: {decision}")
-            return decision
-        
-        except Exception as e:
-            self.logger.error(f"Failed to parse decision: {str(e)}")
-            self.logger.error(f"Response: {response}")
-            return {
-                **self.DEFAULT_RESPONSE,
-                "layer": current_layer
-            }
+        # Failed calls arrive as error dictionaries, they must not become default decisions
+        if not isinstance(response, str):
+            raise ValueError(f"No response to parse: {response.get('error') if isinstance(response, dict) else response}")
+
+        match = self.DECISION_LINE.search(response)
+        if match is None:
+            self.logger.error(f"Failed to parse decision, response: {response}")
+            raise ValueError("Response has no valid Decision line")
+
+        decision = {
+            'decision': match.group(1),
+            'layer': current_layer,
+            'questions': [],
+            'analysis_focus': None 
+        }
+
+        current_section = None 
+        questions = []
+
+        for line in (line.strip() for line in response.split('\n')):
+            if not line:
+                continue
+            if line.startswith('Decision:'):
+                current_section = 'decision'
+            elif line.startswith('Questions:'):
+                current_section = 'questions'
+            elif line.startswith('Analysis Focus:'):
+                decision['analysis_focus'] = line.split(':', 1)[1].strip()
+                current_section = 'focus'
+            elif current_section == 'questions' and line.startswith('- '):
+                questions.append(line[2:].strip())
+
+        decision['questions'] = questions
+
+        self.logger.info(f"Decision: {decision}")
+        return decision
 
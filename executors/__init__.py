@@ -2,13 +2,18 @@ from executors.summary_manager import SummaryManager
 from executors.node_generator import NodeGenerator
 from executors.response_handler import ResponseHandler
 from executors.validation_service import ValidationService
+from executors.node_memo import NodeMemoStore
+from executors.analysis_tree import AnalysisNode, AnalysisTree
 
 
 __all__ = [
     'SummaryManager',
     'NodeGenerator',
     'ResponseHandler',
-    'ValidationService'
+    'ValidationService',
+    'NodeMemoStore',
+    'AnalysisNode',
+    'AnalysisTree'
 ]
 
 
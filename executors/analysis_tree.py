@@ -0,0 +1,234 @@
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterator
+from visualization.graph import VisualizationGraph
+
+
+class AnalysisNode:
+    """
+    AnalysisNode holds the state of one node of the analysis tree.
+
+    Nodes use __slots__ and point to their parent and children, so a tree of thousands
+    of nodes keeps one compact object per node. The summary string is shared with the
+    generator output instead of being copied into nested dictionaries, and the
+    dictionary form is only built by to_dict() when the tree is serialized.
+    """
+
+    __slots__ = (
+        "node_id", "type", "layer", "query", "parent", "children", "node_summary",
+        "focus", "questions", "duplicate_of", "timestamp",
+        "original_query", "optimized_query_data", "tasks"
+    )
+
+    def __init__(
+            self,
+            node_id: str,
+            node_type: str,
+            layer: int,
+            query: str,
+            timestamp: Optional[str] = None,
+            original_query: Optional[str] = None,
+            optimized_query_data: Optional[Dict[str, Any]] = None,
+            tasks: Optional[List[Dict[str, Any]]] = None
+    ):
+        """
+        Initialize AnalysisNode.
+
+        :param node_id: Node identifier
+        :param node_type: Default node type until the engine decision is made
+        :param layer: Layer of the node, 1 for the root
+        :param query: Query the node analyzes
+        :param timestamp: Creation time in ISO format, now if None
+        :param original_query: Original user query, root node only
+        :param optimized_query_data: Query optimization result, root node only
+        :param tasks: Root task plan, root node only
+        """
+
+        self.node_id = node_id
+        self.type = node_type
+        self.layer = layer
+        self.query = query
+        self.parent = None
+        self.children = []
+        self.node_summary = ""
+        self.focus = None
+        self.questions = None
+        self.duplicate_of = None
+        self.timestamp = timestamp or datetime.now().isoformat()
+        self.original_query = original_query
+        self.optimized_query_data = optimized_query_data
+        self.tasks = tasks
+
+    @property
+    def parent_id(self) -> Optional[str]:
+        """Identifier of the parent node, None for the root."""
+        return self.parent.node_id if self.parent is not None else None
+
+    @property
+    def decided(self) -> bool:
+        """Whether the engine decision of the node has been made."""
+        return self.questions is not None
+
+    def decide(self, decision_type: str, focus: Optional[str] = None, questions: Optional[List[str]] = None) -> None:
+        """
+        Store the engine decision of the node, which also becomes its type.
+
+        :param decision_type: Decision type (BREADTH, DEPTH, COMPLETE or DUPLICATE)
+        :param focus: Analysis focus of the decision
+        :param questions: Questions of the decision
+        """
+
+        self.type = decision_type
+        self.focus = focus
+        self.questions = questions or []
+
+    def engine_decision(self) -> Optional[Dict[str, Any]]:
+        """
+        Get the engine decision in its dictionary form.
+
+        :return: Dictionary with type, focus and questions, None before the decision
+        """
+
+        if not self.decided:
+            return None
+        return {"type": self.type, "focus": self.focus, "questions": list(self.questions)}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serialize the node and its subtree to nested dictionaries.
+
+        :return: Node dictionary with its children under 'child_nodes'
+        """
+
+        data = {"node_id": self.node_id, "type": self.type, "layer": self.layer, "query": self.query}
+        if self.parent is None:
+            data["original_query"] = self.original_query
+            data["optimized_query_data"] = self.optimized_query_data
+            data["tasks"] = self.tasks
+        else:
+            data["parent_id"] = self.parent.node_id
+        data["node_summary"] = self.node_summary
+        if self.decided:
+            data["engine_decision"] = self.engine_decision()
+        if self.duplicate_of:
+            data["duplicate_of"] = self.duplicate_of
+        data["child_nodes"] = [child.to_dict() for child in self.children]
+        data["timestamp"] = self.timestamp
+        return data
+
+    def to_visualization(self) -> Dict[str, Any]:
+        """
+        Get the flat visualization entry of the node, without its children.
+
+        :return: Node dictionary as used in the visualization data
+        """
+
+        entry = {
+            "node_id": self.node_id,
+            "type": self.type,
+            "layer": self.layer,
+            "query": self.query,
+            "node_summary": self.node_summary,
+            "engine_decision": self.engine_decision() or {}
+        }
+        if self.type == "ROOT":
+            entry["original_query"] = self.original_query or ""
+        if self.duplicate_of:
+            entry["duplicate_of"] = self.duplicate_of
+        return entry
+
+    def __repr__(self) -> str:
+        return f"AnalysisNode({self.node_id!r}, {self.type}, layer={self.layer}, children={len(self.children)})"
+
+
+class AnalysisTree:
+    """
+    AnalysisTree indexes the nodes of one analysis by id and tracks the tree depth as
+    nodes are added, so lookups and the maximum depth do not walk the tree.
+    """
+
+    def __init__(self):
+        """Initialize an empty AnalysisTree."""
+
+        self.root = None
+        self.max_depth = 0
+        self._index = {}
+
+    def add(self, node: AnalysisNode, parent: Optional[AnalysisNode] = None) -> AnalysisNode:
+        """
+        Add a node to the tree.
+
+        :param node: Node to add
+        :param parent: Parent node already in the tree, None for the root
+        :return: The added node
+        :raises ValueError: If the id is already used, the parent is unknown or a second root is added
+        """
+
+        if node.node_id in self._index:
+            raise ValueError(f"Node {node.node_id} is already in the tree")
+
+        if parent is None:
+            if self.root is not None:
+                raise ValueError(f"Tree already has the root {self.root.node_id}")
+            self.root = node
+        else:
+            if self._index.get(parent.node_id) is not parent:
+                raise ValueError(f"Parent {parent.node_id} of {node.node_id} is not in the tree")
+            node.parent = parent
+            parent.children.append(node)
+
+        self._index[node.node_id] = node
+        self.max_depth = max(self.max_depth, node.layer)
+        return node
+
+    def get(self, node_id: str) -> Optional[AnalysisNode]:
+        """
+        Get a node by its id.
+
+        :param node_id: Node identifier
+        :return: The node, None if it is not in the tree
+        """
+
+        return self._index.get(node_id)
+
+    def reset(self) -> None:
+        """Remove all nodes."""
+
+        self.root = None
+        self.max_depth = 0
+        self._index = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serialize the tree to nested dictionaries.
+
+        :return: Root node dictionary, empty when the tree has no root
+        """
+
+        return self.root.to_dict() if self.root is not None else {}
+
+    def to_visualization(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Serialize the tree to the node and edge lists of the visualization data.
+
+        :return: Dictionary with 'nodes' and 'edges' in pre-order
+        """
+
+        graph = VisualizationGraph()
+        for node in self:
+            graph.add_node(node.to_visualization(), node.parent_id)
+        return graph.to_dict()
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __iter__(self) -> Iterator[AnalysisNode]:
+        """Iterate the nodes in depth-first pre-order."""
+
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
@@ -1,17 +1,29 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Tuple, Union
 from datetime import datetime
 import os
+import copy
 import json
+import time
 from utils.logger import setup_logger
 from prompters.input_prompter import InputPrompter
 from prompters.task_prompter import TaskPrompter
+from prompters.root_planner import RootPlanner
 from executors.node_generator import NodeGenerator
 from executors.summary_manager import SummaryManager
 from executors.response_handler import ResponseHandler
 from executors.validation_service import ValidationService
+from executors.node_memo import NodeMemoStore
+from executors.analysis_tree import AnalysisNode, AnalysisTree
+from visualization.graph import VisualizationGraph
+from utils.llm_loader import LLMLoader
+from utils.model_router import ModelRouter
+from utils.usage_tracker import UsageTracker
+from utils.tracer import Tracer, traced
+from utils.text_similarity import NoveltyDetector, QueryIndex
 from engines.engine_controller import EngineController
 from engines.breadth_engine import BreadthEngine
 from engines.depth_engine import DepthEngine
+from engines.decision_model import DecisionLogger, DecisionModel
 
 
 class ResourceManager:
@@ -38,7 +50,31 @@ class ResourceManager:
 class Executor:
     """Coordinates the dual-engine thinking analysis workflow."""
 
-    def __init__(self, max_layer: int = 3, max_nodes: int = 15, platform="openai", model_name="gpt-4o", temperature=0.3, output_dir="output", enable_validation: bool = False):
+    def __init__(
+            self,
+            max_layer: int = 3,
+            max_nodes: int = 15,
+            platform="openai",
+            model_name="gpt-4o",
+            temperature=0.3,
+            output_dir="output",
+            enable_validation: bool = False,
+            synthesis_mode: str = "auto",
+            synthesis_fan_in: int = 4,
+            synthesis_workers: int = 4,
+            max_aspects: int = 3,
+            fused_expansion: bool = False,
+            fused_planning: bool = False,
+            novelty_threshold: float = 0.0,
+            dedupe_threshold: float = 0.0,
+            node_memo: bool = False,
+            controller_model: Optional[str] = None,
+            controller_confidence: float = 0.9,
+            log_decisions: bool = False,
+            model_routing: Optional[Union[str, ModelRouter]] = None,
+            cascade: bool = False,
+            batch_decisions: bool = False
+    ):
         """
         Initialize Executor and its dependencies.
         
@@ -49,6 +85,21 @@ class Executor:
         :param temperature: Temperature setting for LLM generation
         :param output_dir: Directory for storing analysis outputs
         :param enable_validation: Whether to enable validation mode
+        :param synthesis_mode: Final response synthesis mode ('single', 'tree' or 'auto')
+        :param synthesis_fan_in: Maximum syntheses merged by one intermediate call in tree mode
+        :param synthesis_workers: Maximum parallel intermediate syntheses in tree mode
+        :param max_aspects: Maximum aspects (children) generated for each breadth node
+        :param fused_expansion: Whether the controller decision and the breadth/depth expansion share one LLM call
+        :param fused_planning: Whether query optimization and root task decomposition share one LLM call
+        :param novelty_threshold: Novelty below which a node is completed without a controller call, 0 disables it
+        :param dedupe_threshold: Query similarity at which a child links to an existing node instead of being generated, 0 disables it
+        :param node_memo: Whether nodes are reused from and stored for other analyses in the output directory
+        :param controller_model: Path of a trained controller model answering confident decisions locally
+        :param controller_confidence: Minimum model probability for a local controller decision
+        :param log_decisions: Whether LLM controller decisions are logged as training data in the output directory
+        :param model_routing: Path of a stage model routing YAML file or a ModelRouter, None uses config/model_routing.yaml
+        :param cascade: Whether stages with a cascade try the small model first and escalate rejected responses
+        :param batch_decisions: Whether the children of a breadth node are decided with one batched controller call
         """
         self.logger = setup_logger("Executor")
         self.logger.debug("Initializing Executor...")
@@ -57,16 +108,49 @@ class Executor:
         self.output_dir = output_dir
         os.makedirs(self.output_dir, exist_ok=True)
         self.logger.debug(f"Output directory: {self.output_dir}")
+
+        # Stage routes applied by LLMLoader to the LLM calls of this executor's analyses
+        if isinstance(model_routing, ModelRouter):
+            self.model_router = copy.copy(model_routing)
+        elif model_routing:
+            if not os.path.exists(model_routing):
+                raise FileNotFoundError(f"Model routing file not found: {model_routing}")
+            self.model_router = ModelRouter.from_config(model_routing)
+        else:
+            self.model_router = ModelRouter.from_config()
+        self.model_router.cascade = cascade
+        if self.model_router.describe():
+            self.logger.info(f"Model routing enabled for stages: {', '.join(self.model_router.describe())}")
+        if cascade:
+            self.logger.info(f"Model cascade enabled for stages: {', '.join(self.model_router.describe_cascades())}")
         
         # Initialize components
         self.input_prompter = InputPrompter()
         self.task_prompter = TaskPrompter()
+        self.fused_planning = fused_planning
+        self.root_planner = RootPlanner() if fused_planning else None
         self.node_generator = NodeGenerator()
         self.summary_manager = SummaryManager()
-        self.engine_controller = EngineController(max_layer=max_layer)
-        self.breadth_engine = BreadthEngine()
+        self.usage_tracker = UsageTracker()
+        self.tracer = Tracer()
+        self.breadth_engine = BreadthEngine(max_aspects=max_aspects)
         self.depth_engine = DepthEngine()
-        self.response_handler = ResponseHandler(platform=platform, model_name=model_name, temperature=temperature)
+        self.engine_controller = EngineController(
+            max_layer=max_layer,
+            breadth_engine=self.breadth_engine,
+            depth_engine=self.depth_engine,
+            decision_model=DecisionModel.load(controller_model) if controller_model else None,
+            model_confidence=controller_confidence,
+            decision_logger=DecisionLogger(os.path.join(output_dir, "controller_decisions.jsonl")) if log_decisions else None
+        )
+        self.response_handler = ResponseHandler(
+            platform=platform,
+            model_name=model_name,
+            temperature=temperature,
+            synthesis_mode=synthesis_mode,
+            fan_in=synthesis_fan_in,
+            max_workers=synthesis_workers
+        )
         
         # Initialize validation service if enabled
         self.enable_validation = enable_validation
@@ -74,25 +158,92 @@ class Executor:
         if enable_validation:
             self.logger.info("Validation mode enabled")
         
+        # Expansions returned by fused controller calls, consumed when the node is expanded
+        self.fused_expansion = fused_expansion
+        self._pending_expansions = {}
+        self.expansion_stats = self._reset_expansion_stats()
+        if fused_expansion:
+            self.logger.info("Fused controller expansion enabled")
+        
         # Initialize resource manager
         self.resource_manager = ResourceManager(max_nodes=max_nodes, max_layer=max_layer)
+
+        # Sibling decisions batched into one controller call, unless fused mode expands each child itself
+        self.batch_decisions = batch_decisions and not fused_expansion
+        if batch_decisions and fused_expansion:
+            self.logger.warning("Batched decisions are not used with fused expansion, children are decided one by one")
+        elif batch_decisions:
+            self.logger.info("Batched sibling decisions enabled")
+
+        # Aspects returned for breadth nodes and the ones that became nodes within the budget
+        self.aspect_stats = {"generated": 0, "expanded": 0}
+
+        # Node summaries that mostly restate earlier ones end their branch
+        self.novelty_threshold = novelty_threshold
+        self.novelty_detector = NoveltyDetector()
+        self.novelty_stats = self._reset_novelty_stats()
+        if novelty_threshold > 0:
+            self.logger.info(f"Novelty early stopping enabled with threshold {novelty_threshold}")
+
+        # Expanded queries of the analysis, near-duplicates link to the node already generated
+        self.dedupe_threshold = dedupe_threshold
+        self.query_index = QueryIndex(threshold=dedupe_threshold) if dedupe_threshold > 0 else None
+        self.duplicate_count = 0
+        if dedupe_threshold > 0:
+            self.logger.info(f"Duplicate query suppression enabled with threshold {dedupe_threshold}")
+
+        # Nodes memoized across analyses, shared through the output directory
+        self.node_memo = node_memo
+        if node_memo:
+            self.node_generator.memo_store = NodeMemoStore(
+                path=os.path.join(self.output_dir, "node_memo.sqlite"),
+                news_window=os.getenv("NODE_MEMO_NEWS_WINDOW", "day"),
+                default_window=os.getenv("NODE_MEMO_WINDOW", "week")
+            )
+            self.logger.info("Cross-analysis node memoization enabled")
         
         # Initialize visualization data
+        self.visualization = VisualizationGraph()
         self.visualization_data = self._reset_visualization()
+
+        # Nodes of the current analysis, serialized to dictionaries only for the result
+        self.tree = AnalysisTree()
         
         self.logger.debug("All components initialized successfully")
 
-    def process_query(self, query: str, analysis_dir: Optional[str] = None) -> Dict[str, Any]:
+    @traced()
+    def process_query(
+            self,
+            query: str,
+            analysis_dir: Optional[str] = None,
+            stream_callback: Optional[Callable[[str], None]] = None,
+            analysis_id: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Process user query and generate complete analysis.
         
         :param query: Original user query
         :param analysis_dir: Specific directory for this analysis, if None one will be created
+        :param stream_callback: Optional callback receiving final response chunks as they are generated
+        :param analysis_id: Identifier of the analysis, e.g. the name of its directory, if None one is created
         :return: Dictionary containing analysis results and visualization data
         """
+        # Route the calls of this analysis with this executor's router, other executors keep theirs
+        with LLMLoader().routing(self.model_router):
+            return self._process_query(query, analysis_dir, stream_callback, analysis_id)
+
+    def _process_query(
+            self,
+            query: str,
+            analysis_dir: Optional[str],
+            stream_callback: Optional[Callable[[str], None]],
+            analysis_id: Optional[str]
+    ) -> Dict[str, Any]:
+        """Run one analysis, see process_query."""
+        started_at = time.perf_counter()
         try:
             # Create unique analysis ID
-            analysis_id = f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            analysis_id = analysis_id or f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             self.logger.info("Processing analysis")
             self.logger.debug(f"Processing analysis {analysis_id}")
             self.logger.info(f"Original query: {query}")
@@ -106,14 +257,37 @@ class Executor:
             # Reset state for new analysis
             self.resource_manager.reset()
             self._reset_visualization()
+            self.tree.reset()
+            self._pending_expansions = {}
+            self.expansion_stats = self._reset_expansion_stats()
+            self.aspect_stats = {"generated": 0, "expanded": 0}
+            self.novelty_detector.reset()
+            self.novelty_stats = self._reset_novelty_stats()
+            self.duplicate_count = 0
+            if self.query_index is not None:
+                self.query_index.reset()
             self.summary_manager.start_new_analysis(analysis_id)
+            self.usage_tracker.start_analysis(analysis_id)
+            self.node_generator.reset_stats()
+            self.engine_controller.reset_stats()
+            if self.node_memo:
+                self.node_generator.memo_store.discard()
             self.logger.debug("[RESET] Analysis state reset complete")
 
-            # 1. Optimize query
-            optimization_result = self.input_prompter.process(query)
+            # 1-2. Optimize the query and plan the root tasks in one call when fused planning is enabled
+            root_plan = self.root_planner.process(query) if self.fused_planning else None
+            if root_plan:
+                root_planning = "fused"
+                tasks = root_plan.pop("tasks")
+                optimization_result = root_plan
+            else:
+                root_planning = "fallback" if self.fused_planning else "serial"
+
+                # 1. Optimize query
+                optimization_result = self.input_prompter.process(query)
 
-            # 2. Break down tasks using Task Prompter
-            tasks = self.task_prompter.process(optimization_result.get("optimized_query", query))
+                # 2. Break down tasks using Task Prompter
+                tasks = self.task_prompter.process(optimization_result.get("optimized_query", query))
 
             # 3. Generate and process initial node
             initial_node_id = f"{analysis_id}_root"
@@ -125,45 +299,44 @@ class Executor:
             modifications = optimization_result.get("modifications", [])
 
             # Create initial node with tasks
-            initial_node = {
-                "node_id": initial_node_id,
-                "type": "ROOT",
-                "layer": 1,
-                "query": optimized_query,
-                "original_query": original_query,
-                "optimized_query_data": optimization_result,
-                "tasks": tasks,
-                "child_nodes": [],
-                "timestamp": datetime.now().isoformat()
-            }
+            initial_node = self.tree.add(AnalysisNode(
+                node_id=initial_node_id,
+                node_type="ROOT",
+                layer=1,
+                query=optimized_query,
+                original_query=original_query,
+                optimized_query_data=optimization_result,
+                tasks=tasks
+            ))
 
-            # 4. Process tasks and generate node summary
-            node_data = self.node_generator.generate_node({
-                'query': optimized_query,
-                'node_id': initial_node_id,
-                'layer': 1,
-                'tasks': tasks,
-                'context': {},
-                'type': 'ROOT'
-            })
+            with self.usage_tracker.scope(node_id=initial_node_id), self.tracer.span("node", "node", node_id=initial_node_id):
+                # 4. Process tasks and generate node summary
+                node_data = self.node_generator.generate_node({
+                    'query': optimized_query,
+                    'node_id': initial_node_id,
+                    'layer': 1,
+                    'tasks': tasks,
+                    'context': {},
+                    'type': 'ROOT'
+                })
             
-            initial_node["node_summary"] = node_data.get('node_summary', '')
+                # Store the root summary so it reaches the final response, the root is not validated
+                self.node_generator.store_node_summary(node_data)
+                initial_node.node_summary = node_data.get('node_summary', '')
+                self._index_query(optimized_query, initial_node)
             
-            # 5. Get engine controller decision
-            decision = self.engine_controller.process(
-                content=node_data.get('node_summary', ''),
-                original_query=original_query,
-                further_query=optimized_query,
-                current_layer=1
-            )
+                # 5. Get engine controller decision
+                decision = self._decide(
+                    node_id=initial_node_id,
+                    content=node_data.get('node_summary', ''),
+                    original_query=original_query,
+                    further_query=optimized_query,
+                    current_layer=1
+                )
             
             # Update node with decision
-            initial_node["type"] = decision.get("decision", "ROOT")
-            initial_node["engine_decision"] = {
-                "type": decision.get("decision", "ROOT"),
-                "focus": decision.get("analysis_focus"),
-                "questions": decision.get("questions", [])
-            }
+            initial_node.decide(decision.get("decision", "ROOT"), decision.get("analysis_focus"), decision.get("questions", []))
+            self._add_to_visualization(initial_node)
 
             # Count root node
             self.resource_manager.increment_nodes()
@@ -172,24 +345,75 @@ class Executor:
             # 6. Process analysis tree
             self.logger.debug("[ANALYSIS] Starting analysis tree processing")
             self._process_node_children(initial_node, original_query, 1)
-            self._add_to_visualization(initial_node)
+            self.visualization_data = self.visualization.to_dict()
             
             # Log analysis completion
-            self.logger.info(f"[ANALYSIS] Analysis completed with {self.resource_manager.current_nodes} nodes at max depth {self._get_max_depth(initial_node)}")
+            self.logger.info(f"[ANALYSIS] Analysis completed with {self.resource_manager.current_nodes} nodes at max depth {self.tree.max_depth}")
 
             # Get analysis statistics
             summaries = self.summary_manager.get_summaries(analysis_id)
             stats = self.summary_manager.get_analysis_stats(analysis_id)
             self.logger.debug(f"[STATS] Analysis statistics completed")
 
+            # Latency before the first agent could start, dominated by root planning round trips
+            stats["root_planning"] = root_planning
+            if self.node_generator.first_agent_call_at is not None:
+                stats["time_to_first_agent_call"] = round(self.node_generator.first_agent_call_at - started_at, 3)
+                self.logger.info(f"[STATS] Time to first agent call: {stats['time_to_first_agent_call']}s ({root_planning} root planning)")
+
             # Generate final response
             self.logger.info("Generating final response")
             final_response = self.response_handler.generate_response(
                 original_query=original_query,
                 summaries=summaries,
-                stats=stats
+                stats=stats,
+                stream_callback=stream_callback,
+                tree=initial_node
             )
             self.logger.info(f"Response generated")
+
+            # Expansion counters of the enabled optimizations
+            if self.fused_expansion:
+                stats["fused_expansion"] = dict(self.expansion_stats)
+            stats["aspects"] = dict(self.aspect_stats)
+            self.logger.info(f"[STATS] Aspects generated: {self.aspect_stats['generated']}, expanded: {self.aspect_stats['expanded']}")
+            if self.novelty_threshold > 0:
+                stats["novelty"] = self._novelty_summary()
+                self.logger.info(f"[STATS] Novelty stopping skipped {self.novelty_stats['skipped_controller_calls']} controller calls")
+            if self.query_index is not None:
+                stats["dedupe"] = {
+                    "threshold": self.dedupe_threshold,
+                    "indexed_queries": len(self.query_index),
+                    "duplicates": self.duplicate_count
+                }
+                self.logger.info(f"[STATS] Linked {self.duplicate_count} duplicate queries to existing nodes")
+
+            # The analysis completed, so its validated nodes can be reused by later analyses
+            if self.node_memo:
+                stats["node_memo"] = {
+                    "hits": self.node_generator.memo_hits,
+                    "stored": self.node_generator.memo_store.flush(analysis_id)
+                }
+                self.logger.info(f"[STATS] Node memo hits: {stats['node_memo']['hits']}, stored: {stats['node_memo']['stored']}")
+
+            stats["controller"] = dict(self.engine_controller.decision_counts)
+            if self.engine_controller.decision_model is not None:
+                stats["controller"]["confidence"] = self.engine_controller.model_confidence
+            if self.batch_decisions:
+                stats["controller"]["batch"] = dict(self.engine_controller.batch_counts)
+            self.logger.info(f"[STATS] Controller decisions: {stats['controller']['llm']} by LLM, {stats['controller']['model']} by model")
+
+            # Attach LLM usage after the final response so it is included
+            stats["llm_usage"] = self.usage_tracker.summarize(analysis_id)
+            if self.model_router.describe():
+                stats["model_routing"] = self.model_router.describe()
+            if self.model_router.cascade:
+                stats["cascade"] = self.usage_tracker.summarize_cascade(analysis_id)
+                escalations = sum(stage["escalations"] for stage in stats["cascade"].values())
+                requests = sum(stage["requests"] for stage in stats["cascade"].values())
+                self.logger.info(f"[STATS] Cascade escalated {escalations} of {requests} requests")
+            totals = stats["llm_usage"]["totals"]
+            self.logger.info(f"[USAGE] {totals['calls']} LLM calls, {totals['prompt_tokens'] + totals['completion_tokens']} tokens, ${totals['cost']:.4f}")
             
             # Prepare results
             result = {
@@ -204,7 +428,7 @@ class Executor:
                 "timestamp": datetime.now().isoformat(),
                 "analysis_metrics": {
                     "total_nodes": self.resource_manager.current_nodes,
-                    "max_depth": self._get_max_depth(initial_node),
+                    "max_depth": self.tree.max_depth,
                     "max_nodes": self.resource_manager.max_nodes,
                     "max_layer": self.resource_manager.max_layer
                 }
@@ -235,6 +459,14 @@ class Executor:
         if not self.enable_validation or not self.validation_service:
             # If validation is disabled, store summary and return node data
             node_data['validation_status'] = 'VALID'  # When validation is disabled, mark as VALID
+            node_data['validation_skipped'] = True
+            self.node_generator.store_node_summary(node_data)
+            return node_data
+
+        if node_data.get('memo_hit') and node_data.get('memo_validation_status') == 'VALID':
+            # The memoized node passed validation when it was stored
+            self.logger.info(f"[VALIDATE] Reusing validation of memoized node: {node_data.get('node_id', 'unknown')}")
+            node_data['validation_status'] = 'VALID'
             self.node_generator.store_node_summary(node_data)
             return node_data
 
@@ -266,13 +498,14 @@ class Executor:
                         node_type = node_data.get('type', 'BREADTH')
                         context = node_data.get('context', {})
                         
-                        # Regenerate node with the same parameters
+                        # Regenerate node with the same parameters, a memoized node would fail again
                         regenerated_data = self.node_generator.generate_node({
                             'query': query,
                             'node_id': node_id,
                             'layer': layer,
                             'context': context,
-                            'type': node_type
+                            'type': node_type,
+                            'use_memo': False
                         })
                         
                         # Update node_data with regenerated content
@@ -292,7 +525,212 @@ class Executor:
 
         return None
 
-    def _process_node_children(self, node: Dict[str, Any], original_query: str, current_layer: int):
+    def _decide(
+            self,
+            node_id: str,
+            content: str,
+            original_query: str,
+            further_query: str,
+            current_layer: int,
+            parent_decision: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get the engine controller decision for a node.
+
+        In fused mode the expansion returned with the decision is kept for the node, so
+        expanding it does not need another breadth or depth call.
+
+        :param node_id: Node identifier
+        :param content: Node summary to evaluate
+        :param original_query: Original user query
+        :param further_query: Query of the node
+        :param current_layer: Layer of the node
+        :param parent_decision: Decision of the parent node, None for the root
+        :return: Engine controller decision
+        """
+        decision = self._novelty_decision(node_id, content, current_layer)
+        if decision:
+            return decision
+
+        if not self.fused_expansion:
+            return self.engine_controller.process(
+                content=content,
+                original_query=original_query,
+                further_query=further_query,
+                current_layer=current_layer,
+                parent_decision=parent_decision
+            )
+
+        # The node itself is counted after its decision, so it is still part of the budget
+        remaining_nodes, remaining_depth = self._remaining_budget(current_layer)
+        decision = self.engine_controller.process_fused(
+            content=content,
+            original_query=original_query,
+            further_query=further_query,
+            current_layer=current_layer,
+            max_aspects=self.breadth_engine.aspect_budget(
+                remaining_nodes=remaining_nodes - 1,
+                remaining_depth=remaining_depth
+            ),
+            parent_decision=parent_decision
+        )
+        self.expansion_stats["fused_decisions"] += 1
+
+        expansion = decision.pop("aspects", None) or decision.pop("follow_up", None)
+        if expansion:
+            self._pending_expansions[node_id] = expansion
+            self.expansion_stats["fused_expansions"] += 1
+        elif decision.get("decision") in {"BREADTH", "DEPTH"}:
+            self.logger.debug(f"[FUSED] No expansion in fused response for {node_id}, the engine will be called")
+            self.expansion_stats["engine_fallbacks"] += 1
+
+        return decision
+
+    def _decide_batch(
+            self,
+            children: List[AnalysisNode],
+            original_query: str,
+            current_layer: int,
+            parent_decision: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the engine controller decisions for sibling nodes with one batched call.
+
+        :param children: Generated sibling nodes
+        :param original_query: Original user query
+        :param current_layer: Layer of the siblings
+        :param parent_decision: Decision of the parent node
+        :return: Engine controller decisions in the order of the children
+        """
+        decisions = [
+            self._novelty_decision(child.node_id, child.node_summary, current_layer)
+            for child in children
+        ]
+        pending = [i for i, decision in enumerate(decisions) if decision is None]
+
+        if pending:
+            batched = self.engine_controller.process_batch(
+                items=[
+                    {"content": children[i].node_summary, "further_query": children[i].query}
+                    for i in pending
+                ],
+                original_query=original_query,
+                current_layer=current_layer,
+                parent_decision=parent_decision
+            )
+            for i, decision in zip(pending, batched):
+                decisions[i] = decision
+
+        return decisions
+
+    def _novelty_decision(self, node_id: str, content: str, current_layer: int) -> Optional[Dict[str, Any]]:
+        """
+        Complete a node without a controller call when its summary adds too little.
+
+        :param node_id: Node identifier
+        :param content: Node summary to score
+        :param current_layer: Layer of the node
+        :return: COMPLETE decision, or None when the controller has to decide
+        """
+        if self.novelty_threshold <= 0:
+            return None
+
+        novelty = self.novelty_detector.score(content)
+        self.novelty_detector.add(content)
+        self.novelty_stats["scores"].append(novelty)
+
+        if novelty >= self.novelty_threshold:
+            return None
+
+        self.logger.info(f"[NOVELTY] Node {node_id} novelty {novelty:.2f} below {self.novelty_threshold}, completing branch")
+        self.novelty_stats["skipped_controller_calls"] += 1
+        return {
+            "decision": "COMPLETE",
+            "questions": [],
+            "layer": current_layer,
+            "analysis_focus": None,
+            "novelty": novelty
+        }
+
+    def _index_query(self, query: str, node: AnalysisNode) -> None:
+        """
+        Index the query of a generated node for duplicate suppression.
+
+        :param query: Query the node was generated for
+        :param node: Generated node
+        """
+        if self.query_index is not None:
+            self.query_index.add(query, node)
+
+    def _link_duplicate(self, parent: AnalysisNode, child_node: AnalysisNode) -> bool:
+        """
+        Link a child whose query duplicates an already generated node to that node.
+
+        The duplicate reuses the existing node's summary, is not expanded and does not
+        count against the node budget.
+
+        :param parent: Parent node receiving the child
+        :param child_node: Child node about to be generated
+        :return: True if the child was linked as a duplicate and must not be generated
+        """
+        if self.query_index is None:
+            return False
+
+        original = self.query_index.find(child_node.query)
+        if original is None:
+            return False
+
+        self.logger.info(f"[DEDUPE] Query of {child_node.node_id} duplicates {original.node_id}, linking instead of generating")
+        child_node.decide("DUPLICATE")
+        child_node.duplicate_of = original.node_id
+        child_node.node_summary = original.node_summary
+        self.tree.add(child_node, parent=parent)
+        self._add_to_visualization(child_node)
+        self.duplicate_count += 1
+        return True
+
+    def _remaining_budget(self, layer: int) -> Tuple[int, int]:
+        """
+        Get the budget left for the children of a node.
+
+        :param layer: Layer of the node
+        :return: Tuple of the remaining node count and the layers left below the node
+        """
+        remaining_nodes = self.resource_manager.max_nodes - self.resource_manager.current_nodes
+        remaining_depth = self.resource_manager.max_layer - layer
+        return remaining_nodes, remaining_depth
+
+    def _reset_novelty_stats(self) -> Dict[str, Any]:
+        """Reset the novelty early stopping counters."""
+        return {
+            "scores": [],
+            "skipped_controller_calls": 0
+        }
+
+    def _novelty_summary(self) -> Dict[str, Any]:
+        """
+        Summarize the novelty scores of the current analysis.
+
+        :return: Threshold, scored node count, skipped controller calls and score range
+        """
+        scores = self.novelty_stats["scores"]
+        return {
+            "threshold": self.novelty_threshold,
+            "scored_nodes": len(scores),
+            "skipped_controller_calls": self.novelty_stats["skipped_controller_calls"],
+            "min_score": round(min(scores), 3) if scores else None,
+            "mean_score": round(sum(scores) / len(scores), 3) if scores else None
+        }
+
+    def _reset_expansion_stats(self) -> Dict[str, int]:
+        """Reset the fused expansion counters."""
+        return {
+            "fused_decisions": 0,
+            "fused_expansions": 0,
+            "engine_fallbacks": 0
+        }
+
+    def _process_node_children(self, node: AnalysisNode, original_query: str, current_layer: int):
         """
         Process child nodes based on the parent node's decision.
         
@@ -309,20 +747,22 @@ class Executor:
             self.logger.debug(f"[LIMIT] Reached node limit ({self.resource_manager.current_nodes}/{self.resource_manager.max_nodes}), stopping generation")
             return
 
-        node_type = node["engine_decision"]["type"]
+        node_type = node.type
         
         if node_type == "COMPLETE":
-            self.logger.debug(f"[COMPLETE] Analysis complete for node {node['node_id']}")
+            self.logger.debug(f"[COMPLETE] Analysis complete for node {node.node_id}")
             return
         
-        if node_type == "BREADTH":
-            self.logger.debug(f"[BREADTH] Processing breadth analysis for node {node['node_id']}")
-            self._process_breadth_node(node, original_query, current_layer)
-        elif node_type == "DEPTH":
-            self.logger.debug(f"[DEPTH] Processing depth analysis for node {node['node_id']}")
-            self._process_depth_node(node, original_query, current_layer)
+        # Expansion calls are accounted to the parent, each child opens its own scope
+        with self.usage_tracker.scope(node_id=node.node_id):
+            if node_type == "BREADTH":
+                self.logger.debug(f"[BREADTH] Processing breadth analysis for node {node.node_id}")
+                self._process_breadth_node(node, original_query, current_layer)
+            elif node_type == "DEPTH":
+                self.logger.debug(f"[DEPTH] Processing depth analysis for node {node.node_id}")
+                self._process_depth_node(node, original_query, current_layer)
 
-    def _process_breadth_node(self, node: Dict[str, Any], original_query: str, current_layer: int):
+    def _process_breadth_node(self, node: AnalysisNode, original_query: str, current_layer: int):
         """
         Process breadth analysis node.
         
@@ -330,12 +770,22 @@ class Executor:
         :param original_query: Original user query
         :param current_layer: Current depth layer
         """
-        aspects = self.breadth_engine.process(
-            node_summary=node.get('node_summary', ''),
-            original_query=original_query
-        )
+        aspects = self._pending_expansions.pop(node.node_id, None)
+        if aspects is None:
+            remaining_nodes, remaining_depth = self._remaining_budget(current_layer)
+            aspects = self.breadth_engine.process(
+                node_summary=node.node_summary,
+                original_query=original_query,
+                remaining_nodes=remaining_nodes,
+                remaining_depth=remaining_depth
+            )
         
         self.logger.info(f"[BREADTH] Generated {len(aspects)} aspects for analysis")
+        self.aspect_stats["generated"] += len(aspects)
+
+        if self.batch_decisions:
+            self._process_breadth_children_batched(node, aspects, original_query, current_layer)
+            return
         
         for i, aspect in enumerate(aspects, 1):
             # Check if we can add a new node
@@ -343,70 +793,132 @@ class Executor:
                 self.logger.debug(f"[LIMIT] Reached node limit ({self.resource_manager.current_nodes}/{self.resource_manager.max_nodes}), stopping generation")
                 return
                 
-            child_node_id = f"{node['node_id']}_breadth_{i}"
+            child_node_id = f"{node.node_id}_breadth_{i}"
             self.logger.debug(f"[BREADTH] Processing aspect {i}: {aspect.get('query', '')}")
             
             # Generate child node
-            child_node = {
-                "node_id": child_node_id,
-                "type": "DEPTH",  # Child nodes of breadth nodes default to depth nodes
-                "layer": current_layer + 1,
-                "query": aspect.get('query', ''),
-                "parent_id": node['node_id'],
-                "child_nodes": [],
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            # 1. Task Decomposition
-            tasks = self.task_prompter.process(aspect.get('query', ''))
+            child_node = AnalysisNode(
+                node_id=child_node_id,
+                node_type="DEPTH",  # Child nodes of breadth nodes default to depth nodes
+                layer=current_layer + 1,
+                query=aspect.get('query', '')
+            )
+
+            if self._link_duplicate(node, child_node):
+                continue
             
-            # 2. Generate node summary
-            node_data = self.node_generator.generate_node({
-                'query': aspect.get('query', ''),
-                'node_id': child_node_id,
-                'layer': current_layer + 1,
-                'tasks': tasks,
-                'context': {},
-                'type': "DEPTH"
-            })
+            with self.usage_tracker.scope(node_id=child_node_id), self.tracer.span("node", "node", node_id=child_node_id):
+                # 1-2. Decompose tasks and generate node summary
+                node_data = self.node_generator.generate_node({
+                    'query': aspect.get('query', ''),
+                    'node_id': child_node_id,
+                    'layer': current_layer + 1,
+                    'context': {},
+                    'type': "DEPTH"
+                })
             
-            # 3. Validate node if validation is enabled
-            if self.enable_validation:
+                # 3. Validate node if validation is enabled and store its summary
                 validated_data = self._validate_node(node_data)
                 if not validated_data:
                     self.logger.warning(f"[VALIDATE] Skipping invalid node: {child_node_id}")
                     continue
                 node_data = validated_data
             
-            child_node["node_summary"] = node_data.get('node_summary', '')
+                child_node.node_summary = node_data.get('node_summary', '')
+                self.tree.add(child_node, parent=node)
+                self._index_query(aspect.get('query', ''), child_node)
             
-            # 4. Get engine decision
-            decision = self.engine_controller.process(
-                content=node_data.get('node_summary', ''),
-                original_query=original_query,
-                further_query=aspect.get('query', ''),
-                current_layer=current_layer + 1
-            )
+                # 4. Get engine decision
+                decision = self._decide(
+                    node_id=child_node_id,
+                    content=node_data.get('node_summary', ''),
+                    original_query=original_query,
+                    further_query=aspect.get('query', ''),
+                    current_layer=current_layer + 1,
+                    parent_decision=node.type
+                )
             
             # Update node type and decision information
-            child_node["type"] = decision.get("decision", "DEPTH")
-            child_node["engine_decision"] = {
-                "type": decision.get("decision", "DEPTH"),
-                "focus": decision.get("analysis_focus"),
-                "questions": decision.get("questions", [])
-            }
+            child_node.decide(decision.get("decision", "DEPTH"), decision.get("analysis_focus"), decision.get("questions", []))
+            self._add_to_visualization(child_node)
             
             # Increment node count
             self.resource_manager.increment_nodes()
+            self.aspect_stats["expanded"] += 1
             self.logger.debug(f"[NODES] Node created: {child_node_id}. Node count: {self.resource_manager.current_nodes}/{self.resource_manager.max_nodes}")
             
             # Process the child's children nodes
             self._process_node_children(child_node, original_query, current_layer + 1)
-            
-            # Add to parent node
-            node["child_nodes"].append(child_node)
 
-    def _process_depth_node(self, node: Dict[str, Any], original_query: str, current_layer: int):
+    def _process_breadth_children_batched(
+            self,
+            node: AnalysisNode,
+            aspects: List[Dict[str, Any]],
+            original_query: str,
+            current_layer: int
+    ):
+        """
+        Generate all children of a breadth node, then decide them with one batched call.
+
+        Unlike the one-by-one path, every sibling is generated and counted against the
+        node budget before any of their subtrees is expanded.
+
+        :param node: Breadth node to process
+        :param aspects: Aspects of the node
+        :param original_query: Original user query
+        :param current_layer: Current depth layer
+        """
+        children = []
+        for i, aspect in enumerate(aspects, 1):
+            if not self.resource_manager.can_add_node(current_layer + 1):
+                self.logger.debug(f"[LIMIT] Reached node limit ({self.resource_manager.current_nodes}/{self.resource_manager.max_nodes}), stopping generation")
+                break
+
+            child_node_id = f"{node.node_id}_breadth_{i}"
+            self.logger.debug(f"[BREADTH] Processing aspect {i}: {aspect.get('query', '')}")
+
+            child_node = AnalysisNode(
+                node_id=child_node_id,
+                node_type="DEPTH",  # Child nodes of breadth nodes default to depth nodes
+                layer=current_layer + 1,
+                query=aspect.get('query', '')
+            )
+
+            if self._link_duplicate(node, child_node):
+                continue
+
+            with self.usage_tracker.scope(node_id=child_node_id), self.tracer.span("node", "node", node_id=child_node_id):
+                node_data = self.node_generator.generate_node({
+                    'query': aspect.get('query', ''),
+                    'node_id': child_node_id,
+                    'layer': current_layer + 1,
+                    'context': {},
+                    'type': "DEPTH"
+                })
+
+                validated_data = self._validate_node(node_data)
+                if not validated_data:
+                    self.logger.warning(f"[VALIDATE] Skipping invalid node: {child_node_id}")
+                    continue
+
+                child_node.node_summary = validated_data.get('node_summary', '')
+                self.tree.add(child_node, parent=node)
+                self._index_query(aspect.get('query', ''), child_node)
+
+            self.resource_manager.increment_nodes()
+            self.aspect_stats["expanded"] += 1
+            self.logger.debug(f"[NODES] Node created: {child_node_id}. Node count: {self.resource_manager.current_nodes}/{self.resource_manager.max_nodes}")
+            children.append(child_node)
+
+        decisions = self._decide_batch(children, original_query, current_layer + 1, node.type)
+
+        for child_node, decision in zip(children, decisions):
+            child_node.decide(decision.get("decision", "DEPTH"), decision.get("analysis_focus"), decision.get("questions", []))
+            self._add_to_visualization(child_node)
+
+            self._process_node_children(child_node, original_query, current_layer + 1)
+
+    def _process_depth_node(self, node: AnalysisNode, original_query: str, current_layer: int):
         """
         Process depth analysis node.
         
@@ -419,66 +931,64 @@ class Executor:
             self.logger.debug(f"[LIMIT] Reached node limit ({self.resource_manager.current_nodes}/{self.resource_manager.max_nodes}), stopping generation")
             return
             
-        follow_up = self.depth_engine.process(
-            content=node.get('node_summary', ''),
-            original_query=original_query
-        )
+        follow_up = self._pending_expansions.pop(node.node_id, None)
+        if follow_up is None:
+            follow_up = self.depth_engine.process(
+                content=node.node_summary,
+                original_query=original_query
+            )
         
         if follow_up and isinstance(follow_up, dict) and 'question' in follow_up:
             follow_up_query = follow_up.get('question', '')
             self.logger.info(f"Generated follow-up question: {follow_up_query}")
             
-            child_node_id = f"{node['node_id']}_depth_1"
+            child_node_id = f"{node.node_id}_depth_1"
             
             # Generate child node
-            child_node = {
-                "node_id": child_node_id,
-                "type": "BREADTH",  # Child nodes of depth nodes default to breadth nodes
-                "layer": current_layer + 1,
-                "query": follow_up_query,
-                "parent_id": node['node_id'],
-                "child_nodes": [],
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            # 1. Task Decomposition
-            tasks = self.task_prompter.process(follow_up_query)
+            child_node = AnalysisNode(
+                node_id=child_node_id,
+                node_type="BREADTH",  # Child nodes of depth nodes default to breadth nodes
+                layer=current_layer + 1,
+                query=follow_up_query
+            )
+
+            if self._link_duplicate(node, child_node):
+                return
             
-            # 2. Generate node summary
-            node_data = self.node_generator.generate_node({
-                'query': follow_up_query,
-                'node_id': child_node_id,
-                'layer': current_layer + 1,
-                'tasks': tasks,
-                'context': {},
-                'type': "BREADTH"
-            })
+            with self.usage_tracker.scope(node_id=child_node_id), self.tracer.span("node", "node", node_id=child_node_id):
+                # 1-2. Decompose tasks and generate node summary
+                node_data = self.node_generator.generate_node({
+                    'query': follow_up_query,
+                    'node_id': child_node_id,
+                    'layer': current_layer + 1,
+                    'context': {},
+                    'type': "BREADTH"
+                })
             
-            # 3. Validate node if validation is enabled
-            if self.enable_validation:
+                # 3. Validate node if validation is enabled and store its summary
                 validated_data = self._validate_node(node_data)
                 if not validated_data:
                     self.logger.warning(f"[VALIDATE] Skipping invalid node: {child_node_id}")
                     return
                 node_data = validated_data
             
-            child_node["node_summary"] = node_data.get('node_summary', '')
+                child_node.node_summary = node_data.get('node_summary', '')
+                self.tree.add(child_node, parent=node)
+                self._index_query(follow_up_query, child_node)
             
-            # 4. Get engine decision
-            decision = self.engine_controller.process(
-                content=node_data.get('node_summary', ''),
-                original_query=original_query,
-                further_query=follow_up_query,
-                current_layer=current_layer + 1
-            )
+                # 4. Get engine decision
+                decision = self._decide(
+                    node_id=child_node_id,
+                    content=node_data.get('node_summary', ''),
+                    original_query=original_query,
+                    further_query=follow_up_query,
+                    current_layer=current_layer + 1,
+                    parent_decision=node.type
+                )
             
             # Update node type and decision information
-            child_node["type"] = decision.get("decision", "BREADTH")
-            child_node["engine_decision"] = {
-                "type": decision.get("decision", "BREADTH"),
-                "focus": decision.get("analysis_focus"),
-                "questions": decision.get("questions", [])
-            }
+            child_node.decide(decision.get("decision", "BREADTH"), decision.get("analysis_focus"), decision.get("questions", []))
+            self._add_to_visualization(child_node)
             
             # Increment node count
             self.resource_manager.increment_nodes()
@@ -486,66 +996,14 @@ class Executor:
             
             # Process the child's children nodes
             self._process_node_children(child_node, original_query, current_layer + 1)
-            
-            # Add to parent node
-            node["child_nodes"].append(child_node)
 
-    def _add_to_visualization(self, node: Dict[str, Any]) -> None:
-        """
-        Add node to visualization data.
-        
-        :param node: Node data dictionary
+    def _add_to_visualization(self, node: AnalysisNode) -> None:
         """
-        try:
-            if not node:
-                return
-                
-            # Create a copy of the node to avoid modifying the original
-            visualization_node = {
-                "node_id": node.get("node_id", ""),
-                "type": node.get("type", ""),
-                "layer": node.get("layer", 0),
-                "query": node.get("query", ""),
-                "node_summary": node.get("node_summary", ""),
-                "engine_decision": node.get("engine_decision", {})
-            }
-            
-            # Special handling for original query if this is a root node
-            if node.get("type") == "ROOT":
-                visualization_node["original_query"] = node.get("original_query", "")
-            
-            # Check if the node already exists
-            existing_nodes = [n for n in self.visualization_data["nodes"] 
-                             if n.get("node_id") == visualization_node["node_id"]]
-            
-            if existing_nodes:
-                # Update existing node
-                index = self.visualization_data["nodes"].index(existing_nodes[0])
-                self.visualization_data["nodes"][index] = visualization_node
-                self.logger.debug(f"Updated existing node {visualization_node['node_id']}")
-            else:
-                # Add new node
-                self.visualization_data["nodes"].append(visualization_node)
-                self.logger.debug(f"Added new node {visualization_node['node_id']}")
-
-            # Add parent edge
-            if "parent_id" in node:
-                edge = {
-                    "source": node["parent_id"],
-                    "target": node["node_id"],
-                    "type": node.get("type", "unknown")
-                }
-                
-                if edge not in self.visualization_data["edges"]:
-                    self.visualization_data["edges"].append(edge)
-                    self.logger.debug(f"Added parent edge: {edge}")
-
-            # Recursively process child nodes
-            for child in node.get("child_nodes", []):
-                self._add_to_visualization(child)
+        Add a node with its decision to the visualization graph, or update its entry.
 
-        except Exception as e:
-            self.logger.error(f"[VISUALIZATION ERROR] Failed to update visualization: {str(e)}", exc_info=True)
+        :param node: Analysis tree node
+        """
+        self.visualization.add_node(node.to_visualization(), node.parent_id)
 
     def _reset_visualization(self) -> Dict[str, List]:
         """
@@ -553,19 +1011,17 @@ class Executor:
         
         :return: Initialized visualization data dictionary
         """
-        self.visualization_data = {
-            "nodes": [],
-            "edges": []
-        }
+        self.visualization.reset()
+        self.visualization_data = self.visualization.to_dict()
         return self.visualization_data
 
     def get_visualization_data(self) -> Dict[str, List]:
         """
-        Get current visualization data.
+        Get current visualization data, including the nodes of an analysis in progress.
         
         :return: Visualization data dictionary
         """
-        return self.visualization_data
+        return self.visualization.to_dict()
 
     def get_node_summaries(self, analysis_id: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -586,15 +1042,7 @@ class Executor:
             "current_nodes": self.resource_manager.current_nodes,
             "max_nodes": self.resource_manager.max_nodes,
             "max_layer": self.resource_manager.max_layer,
-            "visualization_nodes": len(self.visualization_data["nodes"]),
-            "visualization_edges": len(self.visualization_data["edges"]),
+            "visualization_nodes": len(self.visualization),
+            "visualization_edges": self.visualization.edge_count,
             "timestamp": datetime.now().isoformat()
         }
-
-    def _get_max_depth(self, node: Dict[str, Any]) -> int:
-        """Get the maximum depth of the analysis tree."""
-        if not node.get("child_nodes"):
-            return node.get("layer", 1)
-        return max(self._get_max_depth(child) for child in node.get("child_nodes", []))
-
-
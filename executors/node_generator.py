@@ -1,6 +1,7 @@
 from typing import Dict, Any, List 
 from datetime import datetime
-from utils import setup_logger
+import time
+from utils import setup_logger, traced, Tracer
 from prompters import TaskPrompter
 from executors import SummaryManager
 from agents import (
@@ -33,8 +34,20 @@ class NodeGenerator:
         self.task_prompter = TaskPrompter()
         self.summary_manager = SummaryManager()
 
+        # Optional NodeMemoStore reusing nodes of earlier analyses, set by the Executor
+        self.memo_store = None
+        self.reset_stats()
+
         self.logger.debug("[INIT] NodeGeneratory initialized successfully.")
+
+    def reset_stats(self) -> None:
+        """Reset the per-analysis counters, called at the start of every analysis."""
+
+        # perf_counter value of the first agent call since the last reset
+        self.first_agent_call_at = None
+        self.memo_hits = 0
     
+    @traced()
     def generate_node(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Generate a node from input data.
@@ -53,8 +66,27 @@ class NodeGenerator:
 
             self.logger.debug(f"Generating node {node_id} at layer {layer}")
 
-            # Step 1: Task Decomposition 
-            tasks = self._decompose_tasks(query)
+            # Reuse a fresh node generated for the same query by an earlier analysis
+            if self.memo_store is not None and input_data.get('use_memo', True):
+                memoized = self.memo_store.lookup(query)
+                if memoized is not None:
+                    self.memo_hits += 1
+                    self.logger.info(f"[MEMO] Reusing node for '{query}' from {memoized.get('memo_source')}")
+                    return {
+                        **memoized,
+                        'node_id': node_id,
+                        'layer': layer,
+                        'query': query,
+                        'timestamp': datetime.now().isoformat(),
+                        'context': context,
+                        'type': node_type,
+                        'memo_hit': True
+                    }
+
+            # Step 1: Task Decomposition, unless the caller already planned the tasks
+            tasks = input_data.get('tasks')
+            if not isinstance(tasks, list) or not tasks:
+                tasks = self._decompose_tasks(query)
 
             # Step 2: Task execution
             execution_results = self._execute_tasks(tasks, query)
@@ -166,9 +198,13 @@ class NodeGenerator:
             self.logger.warning(f"Unknown agent type: {agent_name}")
             return f"Error: Unknown agent type '{agent_name}'"
         
+        if self.first_agent_call_at is None:
+            self.first_agent_call_at = time.perf_counter()
+
         AgentClass, process_func = self.AGENT_MAPPING[agent_name]
         agent = AgentClass()
-        return process_func(agent, task_input)
+        with Tracer().span(f"agent.{agent_name}", "agent", task_input=task_input):
+            return process_func(agent, task_input)
     
 
     @staticmethod
@@ -320,6 +356,10 @@ COMPREHENSIVE ANALYSIS:
             )
             self.logger.debug(f"Stored summary for node {node_data['node_id']} with validation status: {validation_status}")
 
+            # Validated nodes become memo entries once the analysis completes
+            if self.memo_store is not None and validation_status == 'VALID' and not node_data.get('memo_hit'):
+                self.memo_store.stage(node_data)
+
         except Exception as e:
             self.logger.error(f"Failed to store summary: {str(e)}", exc_info=True)
             
@@ -0,0 +1,204 @@
+import os
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional
+from utils import setup_logger
+from utils.text_similarity import query_terms
+
+# strftime formats of the date buckets, a memo entry is reused within the same bucket
+BUCKET_FORMATS = {
+    "day": "%Y-%m-%d",
+    "week": "%G-W%V",
+    "month": "%Y-%m"
+}
+
+
+class NodeMemoStore:
+    """
+    NodeMemoStore persists generated nodes across analyses in SQLite.
+
+    Entries are keyed by (normalized query, date bucket). Nodes whose tasks searched the
+    news use the shorter news window, all other nodes the default window. Nodes of an
+    analysis are staged while it runs and only written once it completes, together
+    with their validation status so validated entries are not validated again.
+    """
+
+    def __init__(self, path: str, news_window: str = "day", default_window: str = "week"):
+        """
+        Initialize NodeMemoStore.
+
+        :param path: Path of the SQLite database file
+        :param news_window: Date bucket of nodes that used news_search ('day', 'week' or 'month')
+        :param default_window: Date bucket of all other nodes ('day', 'week' or 'month')
+        """
+
+        self.logger = setup_logger("NodeMemoStore")
+
+        for window in (news_window, default_window):
+            if window not in BUCKET_FORMATS:
+                raise ValueError(f"Unknown memo window '{window}', expected one of {list(BUCKET_FORMATS)}")
+
+        self.path = path
+        self.news_window = news_window
+        self.default_window = default_window
+        self._pending: List[Dict[str, Any]] = []
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS node_memo (
+                    query_key TEXT NOT NULL,
+                    bucket TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    has_news INTEGER NOT NULL,
+                    node_data TEXT NOT NULL,
+                    analysis_id TEXT,
+                    created_at TEXT NOT NULL,
+                    validation_status TEXT,
+                    PRIMARY KEY (query_key, bucket)
+                )
+            """)
+            # Stores created before validation statuses were kept get the column, their entries are validated again
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(node_memo)")}
+            if "validation_status" not in columns:
+                conn.execute("ALTER TABLE node_memo ADD COLUMN validation_status TEXT")
+
+        self.logger.debug(f"[INIT] NodeMemoStore initialized at {path} (news window: {news_window}, default window: {default_window})")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a short-lived connection that commits on success, so any thread can use the store."""
+
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _bucket(self, has_news: bool, now: Optional[datetime] = None) -> str:
+        """
+        Get the date bucket for a node.
+
+        :param has_news: Whether the node's tasks included news_search
+        :param now: Time to bucket, defaults to the current time
+        :return: Date bucket string
+        """
+
+        window = self.news_window if has_news else self.default_window
+        return f"{window}:{(now or datetime.now()).strftime(BUCKET_FORMATS[window])}"
+
+    @staticmethod
+    def _has_news(tasks: Any) -> bool:
+        """Check whether a task plan includes a news_search task."""
+
+        return any(
+            isinstance(task, dict) and str(task.get('name', '')).lower() == 'news_search'
+            for task in tasks or []
+        )
+
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Find a fresh memoized node for a query.
+
+        The tasks of the new node are not known yet, so both the news bucket and the
+        default bucket of today are checked; each entry only lives in the bucket that
+        matches its own tasks.
+
+        :param query: Query of the node about to be generated
+        :return: Memoized node data with its stored 'memo_validation_status', or None if there is no fresh entry
+        """
+
+        query_key = query_terms(query)
+        if not query_key:
+            return None
+
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    """
+                    SELECT node_data, analysis_id, validation_status FROM node_memo
+                    WHERE query_key = ? AND (
+                        (has_news = 1 AND bucket = ?) OR (has_news = 0 AND bucket = ?)
+                    )
+                    ORDER BY created_at DESC LIMIT 1
+                    """,
+                    (query_key, self._bucket(True), self._bucket(False))
+                ).fetchone()
+        except sqlite3.Error as e:
+            self.logger.warning(f"[MEMO] Lookup failed, generating the node: {str(e)}")
+            return None
+
+        if row is None:
+            return None
+
+        node_data = json.loads(row[0])
+        node_data.pop('validation_status', None)
+        node_data.pop('validation_skipped', None)
+        node_data['memo_source'] = row[1]
+        node_data['memo_validation_status'] = row[2]
+        return node_data
+
+    def stage(self, node_data: Dict[str, Any]) -> None:
+        """
+        Stage a validated node to be stored when the analysis completes.
+
+        Nodes stored while validation was disabled are kept as UNVALIDATED.
+
+        :param node_data: Node data produced by NodeGenerator
+        """
+
+        if node_data.get('query') and node_data.get('node_summary') and not node_data.get('error'):
+            self._pending.append(node_data)
+
+    def discard(self) -> None:
+        """Drop the nodes staged by an analysis that did not complete."""
+
+        self._pending = []
+
+    def flush(self, analysis_id: str) -> int:
+        """
+        Store the staged nodes of a completed analysis.
+
+        :param analysis_id: Identifier of the completed analysis
+        :return: Number of nodes stored
+        """
+
+        pending, self._pending = self._pending, []
+        now = datetime.now()
+        rows = []
+
+        for node_data in pending:
+            query_key = query_terms(node_data['query'])
+            if not query_key:
+                continue
+
+            has_news = self._has_news(node_data.get('tasks'))
+            rows.append((
+                query_key,
+                self._bucket(has_news, now),
+                node_data['query'],
+                int(has_news),
+                json.dumps(node_data, ensure_ascii=False, default=str),
+                analysis_id,
+                now.isoformat(),
+                'UNVALIDATED' if node_data.get('validation_skipped') else node_data.get('validation_status')
+            ))
+
+        if not rows:
+            return 0
+
+        try:
+            with self._connect() as conn:
+                conn.executemany("INSERT OR REPLACE INTO node_memo VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            self.logger.error(f"[MEMO] Failed to store {len(rows)} nodes: {str(e)}")
+            return 0
+
+        self.logger.debug(f"[MEMO] Stored {len(rows)} nodes from analysis {analysis_id}")
+        return len(rows)
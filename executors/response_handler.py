@@ -1,13 +1,47 @@
-from typing import Dict, Any 
-from datetime import datetime 
+from typing import Dict, Any, List, Optional, Callable, Tuple
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 import json
-from utils import setup_logger, LLMLoader, PromptCategory, PromptLoader
+import re
+from utils import setup_logger, LLMLoader, PromptCategory, PromptLoader, TokenCounter, traced
+from executors.analysis_tree import AnalysisNode
 
 class ResponseHandler:
     """Handler for generating the final response by integrating analysis results from multiple nodes."""
 
-    def __init__(self, platform="openai", model_name="gpt-4o", temperature=0):
-        """Initialize the response handler."""
+    # Words ignored when scoring summary relevance against the query
+    STOPWORDS = {
+        'the', 'and', 'for', 'with', 'that', 'this', 'from', 'are', 'was', 'were', 'what', 'which',
+        'how', 'why', 'when', 'who', 'will', 'would', 'could', 'should', 'its', 'their', 'into',
+        'about', 'have', 'has', 'had', 'been', 'being', 'does', 'did', 'can', 'any', 'all', 'our'
+    }
+
+    def __init__(
+            self,
+            platform="openai",
+            model_name="gpt-4o",
+            temperature=0,
+            max_response_tokens: int = 4096,
+            min_summary_tokens: int = 64,
+            synthesis_mode: str = "auto",
+            fan_in: int = 4,
+            max_workers: int = 4,
+            tree_threshold: int = 30
+    ):
+        """
+        Initialize the response handler.
+
+        :param platform: LLM platform to use
+        :param model_name: Name of the model to use
+        :param temperature: Temperature setting
+        :param max_response_tokens: Tokens of the context window reserved for the response
+        :param min_summary_tokens: Smallest truncated summary worth including
+        :param synthesis_mode: 'single' (one prompt), 'tree' (hierarchical map-reduce) or 'auto'
+        :param fan_in: Maximum number of syntheses merged by one intermediate call
+        :param max_workers: Maximum number of intermediate syntheses generated in parallel
+        :param tree_threshold: Node count above which 'auto' mode switches to tree synthesis
+        """
 
         self.logger = setup_logger("ResponseHandler")
         self.logger.debug("Initializing ResponseHandler")
@@ -17,22 +51,45 @@ class ResponseHandler:
         self.model_name = model_name
         self.temperature = temperature
 
+        # Initialize token budgeting
+        self.token_counter = TokenCounter(model_name)
+        self.max_response_tokens = max_response_tokens
+        self.min_summary_tokens = min_summary_tokens
+
+        # Initialize synthesis settings
+        if synthesis_mode not in {"single", "tree", "auto"}:
+            raise ValueError(f"Unsupported synthesis mode: {synthesis_mode}")
+        self.synthesis_mode = synthesis_mode
+        self.fan_in = max(2, fan_in)
+        self.max_workers = max(1, max_workers)
+        self.tree_threshold = tree_threshold
+
         # Initialize prompt loader
         self.prompt_loader = PromptLoader()
         self.logger.debug("ResponseHandler initialized successfully")
 
+    @traced()
     def generate_response(
             self,
             original_query: str,
             summaries: Dict[str, Any],
-            stats: Dict[str, Any]
+            stats: Dict[str, Any],
+            stream_callback: Optional[Callable[[str], None]] = None,
+            tree: Optional[AnalysisNode] = None
     ) -> str:
         """
         Generate the final comprehensive response.
 
+        Node summaries are packed into the model's context window before sending, so the
+        request fits on the first attempt. Dropped and truncated nodes are recorded in
+        stats['context_packing']. When a tree is given and tree synthesis is selected,
+        subtrees are first reduced into intermediate syntheses, level by level.
+
         :param original_query: The original user query
         :param summaries: Summary collection from SummaryManager
         :param stats: Analysis statistics
+        :param stream_callback: Optional callback receiving response chunks as they are generated
+        :param tree: Optional root node of the analysis tree built by Executor
         :return: The generated comprehensive response text
         """
 
@@ -43,94 +100,457 @@ class ResponseHandler:
 
             # Sort summaries by layer
             node_summaries = sorted(node_summaries, key=lambda x: (x.get("layer", 0), x.get("timestamp", "")))
-            
-            # Try with decreasing number of nodes in case of token limit errors
-            max_retries = 5
-            nodes_to_use = len(node_summaries)
-            
-            for retry in range(max_retries):
-                try:
-                    # Use a subset of nodes if we've had to retry
-                    current_nodes = node_summaries[:nodes_to_use]
-                    self.logger.debug(f"[RESPONSE] Attempt {retry+1}: Using {len(current_nodes)} of {len(node_summaries)} nodes")
-                    
-                    # Format node summaries for LLM use
-                    formatted_summaries = []
-                    
-                    for summary in current_nodes:
-                        node_id = summary.get("node_id", "unknown")
-                        layer = summary.get("layer", 0)
-                        node_type = summary.get("node_type", "Unknown")
-                        content = summary.get("content", "").strip()
-                        
-                        if content:
-                            # Add node identifier and summary content
-                            formatted_summary = (
-                                f"--- Node {node_id} (Layer {layer}, Type: {node_type}) ---\n"
-                                f"{content}\n"
-                            )
-                            formatted_summaries.append(formatted_summary)
-                            self.logger.debug(f"[RESPONSE] Added node summary {node_id}")
-                        else:
-                            self.logger.warning(f"[RESPONSE] Node {node_id} has no summary content")
-                    
-                    combined_summaries = "\n".join(formatted_summaries)
-                    
-                    # Get prompts using PromptLoader
-                    system_prompt = self.prompt_loader.get_prompt(
-                        category=PromptCategory.RESPONSE,
-                        prompt_name="final_response/system"
-                    )
-                    
-                    user_prompt = self.prompt_loader.get_prompt(
-                        category=PromptCategory.RESPONSE,
-                        prompt_name="final_response/user",
-                        original_query=original_query,
-                        node_summaries=combined_summaries,
-                        total_nodes=stats.get("total_nodes", 0),
-                        max_depth=stats.get("max_depth", 0),
-                        breadth_analyses=stats.get("breadth_analyses", 0),
-                        depth_analyses=stats.get("depth_analyses", 0)
-                    )
 
-                    # Generate response using LLMLoader 
-                    self.logger.info("Generating final response")
-                    self.logger.debug(f"System Prompt: {system_prompt}")
-                    self.logger.debug(f"User Prompt: {user_prompt}")
-
-                    response = self.llm_loader.chat(
-                        platform=self.platform,
-                        system_prompt=system_prompt,
-                        user_prompt=user_prompt,
-                        model_name=self.model_name,
-                        temperature=self.temperature
-                    )
+            if tree is not None and tree.children and self._use_tree_synthesis(original_query, node_summaries):
+                node_summaries = self._reduce_tree(original_query, tree, node_summaries, stats)
+            else:
+                stats["synthesis"] = {"mode": "single"}
 
-                    self.logger.debug(f"Response: {response}")
-
-                    return response 
-                
-                except Exception as e:
-                    error_msg = str(e).lower()
-                    # Check if this is a token limit error
-                    if "context_length_exceeded" in error_msg:
-                        self.logger.warning(f"[TOKEN ERROR] Context length exceeded with {nodes_to_use} nodes: {str(e)}")
-                        
-                        # Reduce the number of nodes for the next attempt
-                        nodes_to_use = max(1, nodes_to_use - 1)
-                        
-                        if retry == max_retries - 1:
-                            # Last attempt failed
-                            self.logger.error("[RETRY EXHAUSTED] Could not generate response within token limits")
-                            return "I apologize, but your query resulted in a very comprehensive analysis that exceeds my processing limits. Please try a more specific query or break your question into smaller parts."
-                    else:
-                        # Not a token limit error, reraise
-                        raise
-
-            # Should not reach here, but just in case
-            return "Unable to generate a response due to technical limitations. Please try a different query."
+            return self._generate_final(original_query, node_summaries, stats, stream_callback)
 
         except Exception as e:
+            if "context_length_exceeded" in str(e).lower():
+                self.logger.error(f"[TOKEN ERROR] Packed prompt still exceeded the context window: {str(e)}")
+                return "I apologize, but your query resulted in a very comprehensive analysis that exceeds my processing limits. Please try a more specific query or break your question into smaller parts."
+
             self.logger.error(f"[GENERATE ERROR] Failed to generate response: {str(e)}", exc_info=True)
             return f"An error occurred during analysis. Please try your query again. Error details: {str(e)}"
 
+    def _generate_final(
+            self,
+            original_query: str,
+            node_summaries: List[Dict[str, Any]],
+            stats: Dict[str, Any],
+            stream_callback: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """
+        Generate the final response from one packed prompt.
+
+        :param original_query: The original user query
+        :param node_summaries: Summaries (or intermediate syntheses) to include
+        :param stats: Analysis statistics
+        :param stream_callback: Optional callback receiving response chunks as they are generated
+        :return: The generated comprehensive response text
+        """
+
+        # Get prompts using PromptLoader
+        system_prompt = self.prompt_loader.get_prompt(
+            category=PromptCategory.RESPONSE,
+            prompt_name="final_response/system"
+        )
+        prompt_kwargs = self._final_prompt_kwargs(original_query, stats)
+
+        budget = self._summary_budget(system_prompt, prompt_kwargs)
+        combined_summaries, packing = self._pack_summaries(original_query, node_summaries, budget)
+        stats["context_packing"] = packing
+
+        if packing["dropped_nodes"] or packing["truncated_nodes"]:
+            self.logger.warning(
+                f"[PACKING] Fitted summaries into {budget} tokens: "
+                f"{len(packing['truncated_nodes'])} truncated, {len(packing['dropped_nodes'])} dropped"
+            )
+
+        user_prompt = self.prompt_loader.get_prompt(
+            category=PromptCategory.RESPONSE,
+            prompt_name="final_response/user",
+            node_summaries=combined_summaries,
+            **prompt_kwargs
+        )
+
+        # Generate response using LLMLoader
+        self.logger.info("Generating final response")
+        self.logger.debug(f"System Prompt: {system_prompt}")
+        self.logger.debug(f"User Prompt: {user_prompt}")
+
+        if stream_callback:
+            response = self._stream_response(system_prompt, user_prompt, stream_callback)
+        else:
+            response = self.llm_loader.chat(
+                platform=self.platform,
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                model_name=self.model_name,
+                temperature=self.temperature,
+                component="response",
+                stage="response"
+            )
+
+        self.logger.debug(f"Response: {response}")
+
+        return response
+
+    def _final_prompt_kwargs(self, original_query: str, stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the formatting arguments of the final response prompt, except the summaries."""
+
+        return {
+            "original_query": original_query,
+            "total_nodes": stats.get("total_nodes", 0),
+            "max_depth": stats.get("max_depth", 0),
+            "breadth_analyses": stats.get("breadth_analyses", 0),
+            "depth_analyses": stats.get("depth_analyses", 0)
+        }
+
+    def _summary_budget(self, system_prompt: str, prompt_kwargs: Dict[str, Any]) -> int:
+        """
+        Get the tokens left for node summaries in the final response prompt.
+
+        :param system_prompt: The final response system prompt
+        :param prompt_kwargs: Formatting arguments of the user prompt
+        :return: Context window minus prompts and the response reserve
+        """
+
+        prompt_overhead = self.token_counter.count(system_prompt) + self.token_counter.count(
+            self.prompt_loader.get_prompt(
+                category=PromptCategory.RESPONSE,
+                prompt_name="final_response/user",
+                node_summaries="",
+                **prompt_kwargs
+            )
+        )
+        budget = self.token_counter.context_window - self.max_response_tokens - prompt_overhead
+
+        # A 5% margin absorbs tokenizer differences between tiktoken and the provider
+        return int(budget * 0.95)
+
+    def _use_tree_synthesis(self, original_query: str, node_summaries: List[Dict[str, Any]]) -> bool:
+        """
+        Decide whether the final response should be built by tree synthesis.
+
+        :param original_query: The original user query
+        :param node_summaries: Node summaries of the analysis
+        :return: True for 'tree' mode, or in 'auto' mode when the summaries are many or do not fit whole
+        """
+
+        if self.synthesis_mode != "auto":
+            return self.synthesis_mode == "tree"
+
+        if len(node_summaries) > self.tree_threshold:
+            return True
+
+        system_prompt = self.prompt_loader.get_prompt(
+            category=PromptCategory.RESPONSE,
+            prompt_name="final_response/system"
+        )
+        budget = self._summary_budget(system_prompt, self._final_prompt_kwargs(original_query, {}))
+        _, packing = self._pack_summaries(original_query, node_summaries, budget)
+
+        return bool(packing["dropped_nodes"] or packing["truncated_nodes"])
+
+    def _reduce_tree(
+            self,
+            original_query: str,
+            tree: AnalysisNode,
+            node_summaries: List[Dict[str, Any]],
+            stats: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        Reduce the analysis tree bottom-up into syntheses of the root's subtrees.
+
+        Nodes are grouped by height (leaves have height 0). All nodes of one height are
+        synthesized in parallel from their own summary and their children's syntheses;
+        children beyond fan_in are merged in extra parallel rounds first. Leaves are used
+        as they are, so the number of sequential rounds follows the tree depth.
+
+        :param original_query: The original user query
+        :param tree: Root node of the analysis tree
+        :param node_summaries: Node summaries from SummaryManager
+        :param stats: Analysis statistics, receives stats['synthesis']
+        :return: Summaries for the final prompt: the root's own summary and one synthesis per child
+        """
+
+        contents = {summary.get("node_id"): summary.get("content", "").strip() for summary in node_summaries}
+
+        # Index the tree by height, children without a stored summary are skipped when their parent is reduced
+        nodes = {}
+        children = {}
+        heights = {}
+
+        def visit(node: AnalysisNode) -> int:
+            node_id = node.node_id
+            nodes[node_id] = node
+            children[node_id] = [child.node_id for child in node.children]
+            height = 1 + max((visit(child) for child in node.children), default=-1)
+            heights[node_id] = height
+            return height
+
+        root_height = visit(tree)
+        root_id = tree.node_id
+        syntheses = {node_id: contents.get(node_id, "") for node_id, height in heights.items() if height == 0}
+        intermediate_calls = 0
+
+        # Workers run in copies of this context, so their calls keep the usage tags and model routing of the analysis
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for height in range(1, root_height + 1):
+                level = [node_id for node_id, h in heights.items() if h == height]
+                pending = {
+                    node_id: [(child_id, syntheses[child_id]) for child_id in children[node_id] if syntheses.get(child_id)]
+                    for node_id in level
+                }
+
+                # Merge children in groups of fan_in until every node has at most fan_in inputs
+                while any(len(pieces) > self.fan_in for pieces in pending.values()):
+                    jobs = []
+                    for node_id, pieces in pending.items():
+                        if len(pieces) > self.fan_in:
+                            groups = [pieces[i:i + self.fan_in] for i in range(0, len(pieces), self.fan_in)]
+                            jobs.append((node_id, [
+                                pool.submit(contextvars.copy_context().run, self._merge_syntheses, original_query, nodes[node_id], group)
+                                for group in groups
+                            ]))
+
+                    for node_id, futures in jobs:
+                        pending[node_id] = [(f"{node_id}_group_{i}", future.result()) for i, future in enumerate(futures, 1)]
+                        intermediate_calls += len(futures)
+
+                # The root is reduced by the final response prompt instead
+                if height == root_height:
+                    break
+
+                futures = {
+                    node_id: pool.submit(
+                        contextvars.copy_context().run, self._synthesize_subtree, original_query, nodes[node_id], contents.get(node_id, ""), pieces
+                    )
+                    for node_id, pieces in pending.items()
+                }
+                for node_id, future in futures.items():
+                    syntheses[node_id] = future.result()
+                    intermediate_calls += 1
+
+        stats["synthesis"] = {
+            "mode": "tree",
+            "levels": root_height,
+            "intermediate_calls": intermediate_calls,
+            "fan_in": self.fan_in,
+            "max_workers": self.max_workers
+        }
+        self.logger.info(f"[SYNTHESIS] Reduced {len(nodes)} nodes over {root_height} levels with {intermediate_calls} intermediate calls")
+
+        reduced = [{
+            "node_id": root_id,
+            "layer": tree.layer,
+            "node_type": tree.type,
+            "content": contents.get(root_id, "")
+        }]
+        for piece_id, synthesis in pending.get(root_id, []):
+            reduced.append({
+                "node_id": piece_id,
+                "layer": tree.layer + 1,
+                "node_type": "SUBTREE SYNTHESIS",
+                "content": synthesis
+            })
+
+        return reduced
+
+    def _synthesize_subtree(
+            self,
+            original_query: str,
+            node: AnalysisNode,
+            node_summary: str,
+            pieces: List[Tuple[str, str]]
+    ) -> str:
+        """
+        Synthesize a node's findings with the syntheses of its children.
+
+        :param original_query: The original user query
+        :param node: Tree node being synthesized
+        :param node_summary: The node's own summary content
+        :param pieces: (id, synthesis) pairs of its children
+        :return: Intermediate synthesis text
+        """
+
+        if not pieces:
+            return node_summary
+
+        return self._intermediate_chat(
+            "subtree_synthesis",
+            original_query=original_query,
+            node_query=node.query,
+            node_summary=node_summary or "No findings recorded for this node.",
+            child_syntheses=self._format_pieces(pieces)
+        )
+
+    def _merge_syntheses(
+            self,
+            original_query: str,
+            node: AnalysisNode,
+            pieces: List[Tuple[str, str]]
+    ) -> str:
+        """
+        Merge a group of sibling syntheses into one.
+
+        :param original_query: The original user query
+        :param node: Parent tree node of the siblings
+        :param pieces: (id, synthesis) pairs to merge
+        :return: Merged synthesis text
+        """
+
+        return self._intermediate_chat(
+            "merge_syntheses",
+            original_query=original_query,
+            node_query=node.query,
+            child_syntheses=self._format_pieces(pieces)
+        )
+
+    def _format_pieces(self, pieces: List[Tuple[str, str]]) -> str:
+        """Format (id, synthesis) pairs for an intermediate prompt."""
+
+        return "\n".join(f"--- {piece_id} ---\n{text}\n" for piece_id, text in pieces)
+
+    def _intermediate_chat(self, prompt_name: str, **prompt_kwargs) -> str:
+        """
+        Run one intermediate synthesis call.
+
+        :param prompt_name: Name of the prompt in the response category
+        :param prompt_kwargs: Formatting arguments of the user prompt
+        :return: Synthesis text
+        """
+
+        system_prompt = self.prompt_loader.get_prompt(
+            category=PromptCategory.RESPONSE,
+            prompt_name=f"{prompt_name}/system"
+        )
+        user_prompt = self.prompt_loader.get_prompt(
+            category=PromptCategory.RESPONSE,
+            prompt_name=f"{prompt_name}/user",
+            **prompt_kwargs
+        )
+
+        return self.llm_loader.chat(
+            platform=self.platform,
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            model_name=self.model_name,
+            temperature=self.temperature,
+            component="response",
+            stage="response_synthesis"
+        )
+
+    def _pack_summaries(
+            self,
+            original_query: str,
+            node_summaries: List[Dict[str, Any]],
+            budget: int
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Fit node summaries into a token budget.
+
+        Every summary is capped at a common per-summary limit chosen so the total fits the
+        budget. If even the minimum cap does not fit, the least relevant, deepest summaries
+        are dropped first.
+
+        :param original_query: The original user query
+        :param node_summaries: Node summaries sorted by layer
+        :param budget: Tokens available for the formatted summaries
+        :return: Tuple of (combined summary text, packing statistics)
+        """
+
+        entries = []
+        for index, summary in enumerate(node_summaries):
+            node_id = summary.get("node_id", "unknown")
+            content = summary.get("content", "").strip()
+
+            if not content:
+                self.logger.warning(f"[RESPONSE] Node {node_id} has no summary content")
+                continue
+
+            header = f"--- Node {node_id} (Layer {summary.get('layer', 0)}, Type: {summary.get('node_type', 'Unknown')}) ---\n"
+            entries.append({
+                "index": index,
+                "node_id": node_id,
+                "layer": summary.get("layer", 0),
+                "header": header,
+                "content": content,
+                "header_tokens": self.token_counter.count(header) + 1,
+                "content_tokens": self.token_counter.count(content),
+                "priority": self._relevance(original_query, content) - 0.1 * (summary.get("layer", 1) - 1)
+            })
+
+        # Drop the lowest priority entries until every remaining one can get the minimum share
+        dropped = []
+        by_priority = sorted(entries, key=lambda e: e["priority"], reverse=True)
+        while by_priority and sum(
+            e["header_tokens"] + min(e["content_tokens"], self.min_summary_tokens) for e in by_priority
+        ) > budget:
+            dropped.append(by_priority.pop())
+
+        # Find the largest common content cap that keeps the total within budget
+        cap = max((e["content_tokens"] for e in by_priority), default=0)
+        if sum(e["header_tokens"] + e["content_tokens"] for e in by_priority) > budget:
+            low, high = self.min_summary_tokens, cap
+            while low < high:
+                middle = (low + high + 1) // 2
+                if sum(e["header_tokens"] + min(e["content_tokens"], middle) for e in by_priority) <= budget:
+                    low = middle
+                else:
+                    high = middle - 1
+            cap = low
+
+        formatted_summaries = []
+        truncated = []
+        for entry in sorted(by_priority, key=lambda e: e["index"]):
+            content = entry["content"]
+            if entry["content_tokens"] > cap:
+                content = self.token_counter.truncate(content, cap).rstrip() + " [...]"
+                truncated.append(entry["node_id"])
+
+            formatted_summaries.append(f"{entry['header']}{content}\n")
+            self.logger.debug(f"[RESPONSE] Added node summary {entry['node_id']}")
+
+        combined = "\n".join(formatted_summaries)
+
+        return combined, {
+            "budget_tokens": budget,
+            "used_tokens": self.token_counter.count(combined),
+            "included_nodes": len(formatted_summaries),
+            "truncated_nodes": truncated,
+            "dropped_nodes": [entry["node_id"] for entry in dropped]
+        }
+
+    def _relevance(self, query: str, content: str) -> float:
+        """
+        Score how much of the query's vocabulary a summary covers.
+
+        :param query: The original user query
+        :param content: Summary content
+        :return: Fraction of query terms present in the content, between 0 and 1
+        """
+
+        query_terms = {
+            word for word in re.findall(r"[a-z0-9]+", query.lower())
+            if len(word) > 2 and word not in self.STOPWORDS
+        }
+        if not query_terms:
+            return 0.0
+
+        content_terms = set(re.findall(r"[a-z0-9]+", content.lower()))
+        return len(query_terms & content_terms) / len(query_terms)
+
+    def _stream_response(
+            self,
+            system_prompt: str,
+            user_prompt: str,
+            stream_callback: Callable[[str], None]
+    ) -> str:
+        """
+        Stream the final response, forwarding each chunk to the callback.
+
+        :param system_prompt: The system prompt content
+        :param user_prompt: The user prompt content
+        :param stream_callback: Callback receiving response chunks
+        :return: The complete response text
+        """
+
+        chunks = []
+        for chunk in self.llm_loader.chat_stream(
+            platform=self.platform,
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            model_name=self.model_name,
+            temperature=self.temperature,
+            component="response",
+            stage="response"
+        ):
+            chunks.append(chunk)
+            stream_callback(chunk)
+
+        return "".join(chunks).strip()
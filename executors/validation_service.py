@@ -4,6 +4,7 @@ from typing import Dict, Any, Optional
 from utils.logger import setup_logger
 from utils.llm_loader import LLMLoader
 from utils.prompt_loader import PromptLoader, PromptCategory
+from utils.tracer import traced
 
 class ValidationService:
     """
@@ -11,12 +12,20 @@ class ValidationService:
     """
     init_count = 0
 
-    def __init__(self, max_retries: int = 3, retry_delay: float = 1.0):
+    def __init__(
+            self,
+            max_retries: int = 3,
+            retry_delay: float = 1.0,
+            platform: str = "perplexity",
+            model_name: str = "llama-3.1-sonar-large-128k-online"
+    ):
         """
         Initialize ValidationService.
 
         :param max_retries: Maximum number of retry attempts
         :param retry_delay: Delay between retries in seconds
+        :param platform: LLM platform used for fact-checking, a 'validation' model route takes precedence
+        :param model_name: Name of the fact-checking model
         """
         ValidationService.init_count += 1
         self.logger = setup_logger("ValidationService")
@@ -30,9 +39,12 @@ class ValidationService:
 
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.platform = platform
+        self.model_name = model_name
 
         self.logger.info("[INIT] ValidationService initialized successfully.")
 
+    @traced()
     def validate_node_content(self, content: Dict[str, Any]) -> Dict[str, Any]:
         """
         Validate the node content using LLMLoader.
@@ -90,11 +102,13 @@ class ValidationService:
                 try:
                     # Use LLMLoader for validation
                     response = self.llm_loader.chat(
-                        platform="perplexity",
+                        platform=self.platform,
                         system_prompt=system_prompt,
                         user_prompt=user_prompt,
-                        model_name="llama-3.1-sonar-large-128k-online",
-                        temperature=0
+                        model_name=self.model_name,
+                        temperature=0,
+                        component="validator",
+                        stage="validation"
                     )
                     
                     raw_response = response.strip()
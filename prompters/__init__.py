@@ -1,10 +1,12 @@
 from prompters.base import BasePrompter
 from prompters.input_prompter import InputPrompter
 from prompters.task_prompter import TaskPrompter
+from prompters.root_planner import RootPlanner
 
 __all__ = [
     'BasePrompter',
     'InputPrompter',
-    'TaskPrompter'
+    'TaskPrompter',
+    'RootPlanner'
 ]
 
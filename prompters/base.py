@@ -1,6 +1,6 @@
 import json
 from abc import ABC, abstractmethod 
-from typing import Dict, Any 
+from typing import Dict, Any, Callable, Optional
 from utils import setup_logger, LLMLoader, PromptLoader, PromptCategory
 
 class BasePrompter(ABC):
@@ -9,6 +9,10 @@ class BasePrompter(ABC):
     It provides common functionality for prompter initializations and operations.
     """
 
+    # Usage accounting tags, subclasses override stage
+    component = "prompter"
+    stage = None
+
     def __init__(
             self,
             name: str,
@@ -42,6 +46,8 @@ class BasePrompter(ABC):
             category: PromptCategory,
             system_prompt_name: str,
             user_prompt_name: str,
+            stage: Optional[str] = None,
+            accept: Optional[Callable[[str], bool]] = None,
             **prompt_kwargs
     ) -> str:
         """
@@ -50,6 +56,8 @@ class BasePrompter(ABC):
         :param category: Prompt category
         :param system_prompt_name: Name of the system prompt
         :param user_prompt_name: Name of the user prompt
+        :param stage: Optional stage tag for usage accounting, defaults to the class stage
+        :param accept: Optional check of the response, lets a model cascade escalate rejected responses
         :param prompt_kwargs: Additional keyword arguments for prompt formatting
         :return: Processing result 
         """
@@ -73,7 +81,10 @@ class BasePrompter(ABC):
                     system_prompt=system_prompt,
                     user_prompt=user_prompt,
                     model_name=self.model_name,
-                    temperature=self.temperature
+                    temperature=self.temperature,
+                    component=self.component,
+                    stage=stage or self.stage,
+                    accept=accept
                 )
 
             except Exception as e:
@@ -112,6 +123,25 @@ class BasePrompter(ABC):
         except json.JSONDecodeError:
             self.logger.error(f"[{operation.upper()} PARSING ERROR] Failed to parse JSON from LLM response.", exc_info=True)
             raise Exception(f"Failed to parse JSON from LLM response: {response}")
+
+    def json_check(self, validator: Optional[Callable[[Any], None]] = None) -> Callable[[str], bool]:
+        """
+        Build the acceptance check of a JSON response for model cascades.
+
+        :param validator: Optional validation of the parsed JSON, raising on invalid results
+        :return: Check accepting responses that parse as JSON and pass the validator
+        """
+
+        def accept(response: str) -> bool:
+            try:
+                result = json.loads(response)
+                if validator is not None:
+                    validator(result)
+                return True
+            except Exception:
+                return False
+
+        return accept
         
     def handle_error(self, operation: str, error: Exception) -> Dict[str, Any]:
         """
@@ -1,11 +1,13 @@
 import json
 from typing import Dict, Any
 from prompters.base import BasePrompter
-from utils import PromptCategory
+from utils import PromptCategory, traced
 
 class InputPrompter(BasePrompter):
     """InputPrompter handles initial prompt engineering and input optimization."""
 
+    stage = "input_optimization"
+
     def __init__(self):
         """Initialize InputPrompter."""
 
@@ -18,6 +20,7 @@ class InputPrompter(BasePrompter):
 
         self.logger.debug("InputPrompter initialized for query optimization")
 
+    @traced()
     def process(self, user_input: str) -> Dict[str, Any]:
         """
         Process and optimize the user input.
@@ -34,6 +37,7 @@ class InputPrompter(BasePrompter):
                 category=PromptCategory.BASE_PROMPTER,
                 system_prompt_name="input_optimization/system",
                 user_prompt_name="input_optimization/user",
+                accept=self.json_check(self._validate_optimization),
                 input=user_input
             )
 
@@ -0,0 +1,86 @@
+import json
+from typing import Dict, Any, Optional
+from prompters.base import BasePrompter
+from utils import PromptCategory, traced
+
+class RootPlanner(BasePrompter):
+    """
+    RootPlanner optimizes the user query and decomposes the optimized query into tasks
+    in one LLM call, replacing the serial InputPrompter and TaskPrompter steps at the root.
+    """
+
+    stage = "root_planning"
+
+    def __init__(self):
+        """Initialize RootPlanner."""
+
+        super().__init__(
+            name="RootPlanner",
+            platform="openai",
+            model_name="gpt-4o",
+            temperature=0
+        )
+
+        self.logger.debug("RootPlanner initialized for fused root planning")
+
+    @traced()
+    def process(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """
+        Optimize the user input and plan the root tasks.
+
+        :param user_input: Original user query
+        :return: Dictionary with the optimization result fields and 'tasks',
+            or None if the response is unusable and the serial path should be used
+        """
+
+        self.logger.info(f"Starting fused root planning for: {user_input}")
+
+        try:
+            response = self.process_with_prompts(
+                category=PromptCategory.PLANNER,
+                system_prompt_name="root_plan/system",
+                user_prompt_name="root_plan/user",
+                accept=self.json_check(self._validate_plan),
+                input=user_input
+            )
+
+            if not isinstance(response, str):
+                raise ValueError(response.get("error", "LLM call failed"))
+
+            plan = self.parse_json_response(response, "root_planning")
+            self._validate_plan(plan)
+
+            self.logger.info(f"Root planning completed with {len(plan['tasks'])} tasks.")
+            self.logger.debug(f"Root plan: {json.dumps(plan, indent=2)}")
+
+            return plan
+
+        except Exception as e:
+            self.logger.warning(f"Fused root planning failed, falling back to separate steps: {str(e)}")
+            return None
+
+    def _validate_plan(self, plan: Dict[str, Any]) -> None:
+        """
+        Validate the fused root plan.
+
+        :param plan: Parsed plan
+        :raises ValueError: If a required field is missing or malformed
+        """
+
+        required_keys = {"optimized_query", "original_query", "modifications", "tasks"}
+        if not isinstance(plan, dict) or not all(key in plan for key in required_keys):
+            raise ValueError("Missing required key in root plan")
+
+        if not str(plan["optimized_query"]).strip():
+            raise ValueError("Optimized query is empty")
+
+        if not isinstance(plan["modifications"], list):
+            raise ValueError("Modifications must be a list")
+
+        tasks = plan["tasks"]
+        if not isinstance(tasks, list) or not tasks:
+            raise ValueError("Tasks must be a non-empty list")
+
+        for task in tasks:
+            if not isinstance(task, dict) or not task.get("name") or "input" not in task:
+                raise ValueError(f"Malformed task: {task}")
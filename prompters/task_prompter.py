@@ -1,7 +1,7 @@
 import json 
 from typing import List, Dict, Any
 from prompters.base import BasePrompter
-from utils import PromptCategory
+from utils import PromptCategory, traced
 
 class TaskPrompter(BasePrompter):
     """
@@ -9,6 +9,8 @@ class TaskPrompter(BasePrompter):
     It breaks down user input into specific tasks and assigns them to appropriate agents.
     """
 
+    stage = "task_decomposition"
+
     def __init__(self):
         """Initialize TaskPrompter."""
 
@@ -21,6 +23,7 @@ class TaskPrompter(BasePrompter):
 
         self.logger.debug("TaskPrompter initialized for task decomposition")
 
+    @traced()
     def process(self, user_input: str) -> List[Dict[str, Any]]:
         """
         Process the user input and decompose it into tasks.
@@ -68,6 +71,7 @@ class TaskPrompter(BasePrompter):
                 category=PromptCategory.PLANNER,
                 system_prompt_name="task_decomposition/system",
                 user_prompt_name="task_decomposition/user",
+                accept=self.json_check(self._check_tasks),
                 input=user_input
             )
 
@@ -80,6 +84,22 @@ class TaskPrompter(BasePrompter):
             self.logger.error("Failed to generate task decomposition", exc_info=True)
             raise Exception(f"Error in task decomposition: {str(e)}")
         
+    @staticmethod
+    def _check_tasks(decomposition: Any) -> None:
+        """
+        Check that a parsed decomposition is a usable task list.
+
+        :param decomposition: Parsed decomposition
+        :raises ValueError: If it is not a non-empty list of named tasks with an input
+        """
+
+        if not isinstance(decomposition, list) or not decomposition:
+            raise ValueError("Decomposition must be a non-empty list")
+
+        for task in decomposition:
+            if not isinstance(task, dict) or not task.get("name") or "input" not in task:
+                raise ValueError(f"Malformed task: {task}")
+
     def _validate_plan(
             self,
             user_input: str,
@@ -100,6 +120,7 @@ class TaskPrompter(BasePrompter):
                 category=PromptCategory.PLANNER,
                 system_prompt_name="plan_validator/system",
                 user_prompt_name="plan_validator/user",
+                stage="plan_validation",
                 query=user_input,
                 task_plan=json.dumps(decomposition, indent=2)
             )
@@ -151,6 +172,7 @@ class TaskPrompter(BasePrompter):
                 category=PromptCategory.PLANNER,
                 system_prompt_name="retry/system",
                 user_prompt_name="retry/user",
+                accept=self.json_check(self._check_tasks),
                 query=user_input,
                 feedback=feedback,
                 original_response=json.dumps(original_decomposition, indent=2)
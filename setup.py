@@ -10,6 +10,7 @@ setup(
         "requests>=2.26.0",
         "mermaid-cli>=0.1.0",
         "argparse>=1.4.0",
+        "numpy>=1.22.0",
     ],
     entry_points={
         'console_scripts': [
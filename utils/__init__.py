@@ -1,11 +1,41 @@
+import importlib
+
 from utils.logger import setup_logger
-from utils.llm_loader import LLMLoader
-from utils.prompt_loader import PromptCategory, PromptLoader
+
+# Modules of the exported names, imported on first use so that importing a light
+# submodule such as utils.logger does not load the LLM clients and tokenizers
+_EXPORTS = {
+    'LLMLoader': 'utils.llm_loader',
+    'ModelRouter': 'utils.model_router',
+    'PromptLoader': 'utils.prompt_loader',
+    'PromptCategory': 'utils.prompt_loader',
+    'TokenCounter': 'utils.token_counter',
+    'UsageTracker': 'utils.usage_tracker',
+    'Tracer': 'utils.tracer',
+    'traced': 'utils.tracer',
+    'MinHasher': 'utils.text_similarity',
+    'NoveltyDetector': 'utils.text_similarity',
+    'QueryIndex': 'utils.text_similarity'
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'utils' has no attribute '{name}'")
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
+
 
 __all__ = [
     'setup_logger',
     'LLMLoader',
+    'ModelRouter',
     'PromptLoader',
-    'PromptCategory'
+    'PromptCategory',
+    'TokenCounter',
+    'UsageTracker',
+    'Tracer',
+    'traced',
+    'MinHasher',
+    'NoveltyDetector',
+    'QueryIndex'
 ]
-
@@ -1,32 +1,50 @@
 import os 
 import json 
+import time
 import requests 
-from typing import Dict, Any, Optional 
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Iterator, Callable
 from llama_index.llms.openai import OpenAI 
 from llama_index.core.llms import ChatMessage, MessageRole 
 from openai import OpenAI as PerplexityClient 
 from utils.logger import setup_logger
+from utils.rate_limiter import RateLimiter, is_transient_error
+from utils.token_counter import TokenCounter
+from utils.usage_tracker import UsageTracker
+from utils.tracer import Tracer
+from utils.model_router import ModelRouter
+
+# Model router of the analysis running in the current context, set by LLMLoader.routing()
+_active_router = contextvars.ContextVar("model_router", default=None)
 
 class OpenAIHandler:
     """OpenAIHandler handles interactions with OpenAI model."""
 
-    def __init__(self, temperature=0, model_name="gpt-4o"):
+    def __init__(self, temperature=0, model_name="gpt-4o", max_tokens=None):
         """
         Initialize the OpenAIHandler.
 
         :param temperature: Temperature
         :param model_name: The name of the model
+        :param max_tokens: Optional limit of completion tokens
         """
 
         self.logger = setup_logger("OpenAIHandler")
         self.logger.debug(f"Initializing OpenAIHandler with model {model_name}")
 
+        # Retries are handled by LLMLoader so that rate limits reach the limiter
         self.client = OpenAI(
             temperature=temperature,
-            model_name=model_name,
-            api_keys=os.getenv("OPENAI_API_KEY")
+            model=model_name,
+            max_tokens=max_tokens,
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=0
         )
 
+        self.model = model_name
+        self.last_usage = None
+
     def chat(self, system_prompt: str, user_prompt: str) -> str:
         """
         Get the response from openai model.
@@ -45,17 +63,43 @@ class OpenAIHandler:
         # Get response from model
         response = self.client.chat(messages)
 
+        usage = response.additional_kwargs or {}
+        if "prompt_tokens" in usage:
+            self.last_usage = {
+                "prompt_tokens": usage.get("prompt_tokens", 0),
+                "completion_tokens": usage.get("completion_tokens", 0)
+            }
+
         return response.message.content.strip()
+
+    def chat_stream(self, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        """
+        Stream the response from openai model as it is generated.
+
+        :param system_prompt: The system prompt content
+        :param user_prompt: The user prompt content
+        :return: Iterator over response text chunks
+        """
+
+        messages = [
+            ChatMessage(role=MessageRole.SYSTEM, content=system_prompt),
+            ChatMessage(role=MessageRole.USER, content=user_prompt)
+        ]
+
+        for response in self.client.stream_chat(messages):
+            if response.delta:
+                yield response.delta
     
 class PerplexityHandler:
     """PerpelxityHandler handles interaction with Perplexity."""
 
-    def __init__(self, temperature=0, model_name="llama-3.1-sonar-small-128k-online"):
+    def __init__(self, temperature=0, model_name="llama-3.1-sonar-small-128k-online", max_tokens=None):
         """
         Initialize the PerplexityHandler.
 
         :param temperature: Temperature
         :param model_name: The name of the model
+        :param max_tokens: Optional limit of completion tokens
         """
 
         self.logger = setup_logger("PerplexityHandler")
@@ -63,11 +107,14 @@ class PerplexityHandler:
 
         self.client = PerplexityClient(
             api_key=os.getenv("PERPLEXITY_API_KEY"),
-            base_url="https://api.perplexity.ai"
+            base_url="https://api.perplexity.ai",
+            max_retries=0
         )
 
         self.model = model_name
         self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.last_usage = None
 
     def chat(self, system_prompt: str, user_prompt: str) -> str:
         """
@@ -87,10 +134,43 @@ class PerplexityHandler:
         response = self.client.chat.completions.create(
             model=self.model,
             messages=messages,
-            temperature=self.temperature
+            temperature=self.temperature,
+            max_tokens=self.max_tokens
         )
 
+        if response.usage is not None:
+            self.last_usage = {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens
+            }
+
         return response.choices[0].message.content.strip()
+
+    def chat_stream(self, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        """
+        Stream the response from Perplexity model as it is generated.
+
+        :param system_prompt: The system prompt content
+        :param user_prompt: The user prompt content
+        :return: Iterator over response text chunks
+        """
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True
+        )
+
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
     
 class LLMLoader:
     """LLMLoader provides a unified interface to handle interactions with different LLM models."""
@@ -112,8 +192,45 @@ class LLMLoader:
             return 
         
         self.logger = setup_logger("LLMLoader")
+        self.rate_limiter = RateLimiter.from_config()
+        # Default routing, analyses route their calls with their own router through routing()
+        self.model_router = ModelRouter.from_config()
+        self.usage_tracker = UsageTracker()
+        self.tracer = Tracer()
+        self.handler_factory = None
         self._initialized = True 
     
+    @property
+    def router(self) -> ModelRouter:
+        """Model router of the current context, the default router outside of routing()."""
+
+        return _active_router.get() or self.model_router
+
+    @contextmanager
+    def routing(self, router: ModelRouter):
+        """
+        Route the LLM calls made inside the block with a router, without changing the routing of other analyses.
+
+        Worker threads only see the router when they run in a copy of the caller's context.
+
+        :param router: Model router of the calls
+        """
+
+        token = _active_router.set(router)
+        try:
+            yield
+        finally:
+            _active_router.reset(token)
+
+    def set_handler_factory(self, factory: Optional[Callable[..., Any]]) -> None:
+        """
+        Override how handlers are created, e.g. with a mock LLM for offline benchmarks.
+
+        :param factory: Callable taking (platform, **kwargs) and returning a handler, or None to restore the default
+        """
+
+        self.handler_factory = factory
+
     def get_llm(self, platform: str, **kwargs) -> Any:
         """
         Get the appropriate LLM handler for the specified platform.
@@ -123,6 +240,9 @@ class LLMLoader:
         :return: An instance of the appropriate LLM handler
         :raises ValueError: If the platform is not supported
         """
+        if self.handler_factory is not None:
+            return self.handler_factory(platform, **kwargs)
+
         if platform.lower() == 'openai':
             return OpenAIHandler(**kwargs)
         elif platform.lower() == 'perplexity':
@@ -130,18 +250,236 @@ class LLMLoader:
         else:
             raise ValueError(f"Unsupported platform: {platform}")
     
-    def chat(self, platform: str, system_prompt: str, user_prompt: str, **kwargs) -> str:
+    def chat(
+            self,
+            platform: str,
+            system_prompt: str,
+            user_prompt: str,
+            component: Optional[str] = None,
+            stage: Optional[str] = None,
+            accept: Optional[Callable[[str], bool]] = None,
+            **kwargs
+    ) -> str:
         """
         Get chat response from the specified platform.
-        
+
+        The model router may replace the platform, model, temperature and max_tokens
+        by the route of the stage. In cascade mode, calls with an acceptance check go
+        through the cascade of their stage: a tier's response is returned when the check
+        accepts it, otherwise the next, larger tier is called. Calls of every tier are
+        tagged with cascade_tier in the usage tracker.
+
         :param platform: 'openai' or 'perplexity'
         :param system_prompt: The system prompt content
         :param user_prompt: The user prompt content
+        :param component: Optional calling component kind for usage accounting
+        :param stage: Optional pipeline stage for model routing and usage accounting
+        :param accept: Optional check whether a response parses, validates and is confident
+        :param **kwargs: Additional arguments for platform-specific initialization
+        :return: The response content from the selected platform
+        """
+
+        if accept is None:
+            tiers = [self.router.route(stage, platform, **kwargs)]
+        else:
+            tiers = self.router.tiers(stage, platform, **kwargs)
+
+        if len(tiers) == 1:
+            tier_platform, tier_kwargs = tiers[0]
+            return self._chat_once(tier_platform, system_prompt, user_prompt, component, stage, **tier_kwargs)
+
+        target = tiers[-1][1].get("model_name")
+        for tier, (tier_platform, tier_kwargs) in enumerate(tiers):
+            with self.usage_tracker.scope(cascade_tier=tier, cascade_tiers=len(tiers), cascade_target=target):
+                if tier == len(tiers) - 1:
+                    return self._chat_once(tier_platform, system_prompt, user_prompt, component, stage, **tier_kwargs)
+
+                try:
+                    response = self._chat_once(tier_platform, system_prompt, user_prompt, component, stage, **tier_kwargs)
+                except Exception as e:
+                    self.logger.warning(f"[CASCADE] {stage} tier {tier} ({tier_kwargs.get('model_name')}) failed, escalating: {str(e)}")
+                    continue
+
+            if self._accepted(accept, response):
+                return response
+
+            self.logger.info(f"[CASCADE] {stage} response of {tier_kwargs.get('model_name')} rejected, escalating to {tiers[tier + 1][1].get('model_name')}")
+
+    @staticmethod
+    def _accepted(accept: Callable[[str], bool], response: str) -> bool:
+        """Run an acceptance check, treating a failing check as a rejection."""
+
+        try:
+            return bool(accept(response))
+        except Exception:
+            return False
+
+    def _chat_once(
+            self,
+            platform: str,
+            system_prompt: str,
+            user_prompt: str,
+            component: Optional[str] = None,
+            stage: Optional[str] = None,
+            **kwargs
+    ) -> str:
+        """
+        Get chat response from one already routed model.
+
+        Requests pass through the per-platform/model rate limiter, and rate limited or
+        transient failures are retried with exponential backoff. Every call is recorded
+        in the usage tracker with its tokens, latency and retries.
+
+        :param platform: 'openai' or 'perplexity'
+        :param system_prompt: The system prompt content
+        :param user_prompt: The user prompt content
+        :param component: Optional calling component kind for usage accounting
+        :param stage: Optional pipeline stage for usage accounting
         :param **kwargs: Additional arguments for platform-specific initialization
         :return: The response content from the selected platform
         """
 
         handler = self.get_llm(platform, **kwargs)
-        return handler.chat(system_prompt, user_prompt)
-    
-        
\ No newline at end of file
+        estimated_tokens = self.rate_limiter.estimate_tokens(system_prompt, user_prompt)
+        start_time = time.perf_counter()
+
+        with self.tracer.span("llm.chat", "llm", platform=platform, model=handler.model, stage=stage):
+            for attempt in range(self.rate_limiter.max_retries + 1):
+                try:
+                    with self.rate_limiter.limit(platform, handler.model, estimated_tokens) as permit:
+                        response = handler.chat(system_prompt, user_prompt)
+                        usage = self._record_usage(
+                            platform, handler, system_prompt, user_prompt, response,
+                            start_time, attempt, component, stage
+                        )
+                        if permit is not None:
+                            permit.actual_tokens = usage["prompt_tokens"] + usage["completion_tokens"]
+                        return response
+
+                except Exception as e:
+                    if attempt >= self.rate_limiter.max_retries or not is_transient_error(e):
+                        self._record_usage(
+                            platform, handler, system_prompt, user_prompt, "",
+                            start_time, attempt, component, stage, status="error"
+                        )
+                        raise
+
+                    delay = self.rate_limiter.backoff_delay(attempt)
+                    self.logger.warning(f"[RETRY] {platform}/{handler.model} attempt {attempt + 1} failed: {str(e)}. Retrying in {delay:.1f}s")
+                    time.sleep(delay)
+
+    def chat_stream(
+            self,
+            platform: str,
+            system_prompt: str,
+            user_prompt: str,
+            component: Optional[str] = None,
+            stage: Optional[str] = None,
+            **kwargs
+    ) -> Iterator[str]:
+        """
+        Stream chat response chunks from the specified platform.
+
+        The stage is routed like chat(). The rate limit permit is held until the stream
+        is exhausted. Failures are only retried before the first chunk arrives, so
+        callers never receive duplicated text.
+
+        :param platform: 'openai' or 'perplexity'
+        :param system_prompt: The system prompt content
+        :param user_prompt: The user prompt content
+        :param component: Optional calling component kind for usage accounting
+        :param stage: Optional pipeline stage for model routing and usage accounting
+        :param **kwargs: Additional arguments for platform-specific initialization
+        :return: Iterator over response text chunks
+        """
+
+        platform, kwargs = self.router.route(stage, platform, **kwargs)
+        handler = self.get_llm(platform, **kwargs)
+        estimated_tokens = self.rate_limiter.estimate_tokens(system_prompt, user_prompt)
+        start_time = time.perf_counter()
+
+        with self.tracer.span("llm.chat_stream", "llm", platform=platform, model=handler.model, stage=stage):
+            for attempt in range(self.rate_limiter.max_retries + 1):
+                started = False
+                chunks = []
+                try:
+                    with self.rate_limiter.limit(platform, handler.model, estimated_tokens) as permit:
+                        for chunk in handler.chat_stream(system_prompt, user_prompt):
+                            started = True
+                            chunks.append(chunk)
+                            yield chunk
+
+                        # Streaming responses carry no usage block, so tokens are estimated
+                        usage = self._record_usage(
+                            platform, handler, system_prompt, user_prompt, "".join(chunks),
+                            start_time, attempt, component, stage
+                        )
+                        if permit is not None:
+                            permit.actual_tokens = usage["prompt_tokens"] + usage["completion_tokens"]
+                    return
+
+                except Exception as e:
+                    if started or attempt >= self.rate_limiter.max_retries or not is_transient_error(e):
+                        self._record_usage(
+                            platform, handler, system_prompt, user_prompt, "".join(chunks),
+                            start_time, attempt, component, stage, status="error"
+                        )
+                        raise
+
+                    delay = self.rate_limiter.backoff_delay(attempt)
+                    self.logger.warning(f"[RETRY] {platform}/{handler.model} stream attempt {attempt + 1} failed: {str(e)}. Retrying in {delay:.1f}s")
+                    time.sleep(delay)
+
+    def _record_usage(
+            self,
+            platform: str,
+            handler: Any,
+            system_prompt: str,
+            user_prompt: str,
+            response: str,
+            start_time: float,
+            retries: int,
+            component: Optional[str],
+            stage: Optional[str],
+            status: str = "success"
+    ) -> Dict[str, Any]:
+        """
+        Record one call in the usage tracker.
+
+        Token counts reported by the provider are preferred; otherwise they are estimated
+        with the model tokenizer.
+
+        :param platform: LLM platform
+        :param handler: The handler that served the call
+        :param system_prompt: The system prompt content
+        :param user_prompt: The user prompt content
+        :param response: The response content
+        :param start_time: perf_counter value when the call started
+        :param retries: Number of retried attempts
+        :param component: Calling component kind
+        :param stage: Pipeline stage
+        :param status: 'success' or 'error'
+        :return: The recorded usage entry
+        """
+
+        usage = getattr(handler, "last_usage", None)
+        estimated = usage is None
+        if estimated:
+            counter = TokenCounter(handler.model)
+            usage = {
+                "prompt_tokens": counter.count(system_prompt) + counter.count(user_prompt),
+                "completion_tokens": counter.count(response)
+            }
+
+        return self.usage_tracker.record(
+            platform=platform,
+            model_name=handler.model,
+            prompt_tokens=usage["prompt_tokens"],
+            completion_tokens=usage["completion_tokens"],
+            latency=round(time.perf_counter() - start_time, 3),
+            retries=retries,
+            component=component,
+            stage=stage,
+            estimated=estimated,
+            status=status
+        )
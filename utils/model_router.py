@@ -0,0 +1,143 @@
+import os
+import yaml
+from typing import Dict, Any, List, Optional, Tuple
+from utils.logger import setup_logger
+
+# Chat arguments a route may set
+ROUTE_KEYS = ("platform", "model_name", "temperature", "max_tokens")
+
+
+class ModelRouter:
+    """
+    ModelRouter maps pipeline stages to the platform, model, temperature and max_tokens
+    of their LLM calls. Stages without a route keep the arguments of the calling component.
+
+    A stage may also have a cascade, an ordered list of tiers from the smallest to the
+    largest model. Cascades are only used when cascade mode is on and the caller can
+    check the output; they replace the route of their stage.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize ModelRouter.
+
+        :param config: Routing configuration with 'enabled', a 'stages' mapping and an optional 'cascades' mapping
+        :raises ValueError: If a route changes the platform without naming a model
+        """
+
+        self.logger = setup_logger("ModelRouter")
+
+        config = config or {}
+        self.enabled = bool(config.get('enabled', True))
+        self.routes = {
+            stage: self._normalize(stage, route)
+            for stage, route in (config.get('stages', {}) or {}).items()
+            if route
+        }
+        self.cascades = {
+            stage: [self._normalize(stage, tier) for tier in tiers]
+            for stage, tiers in (config.get('cascades', {}) or {}).items()
+            if tiers
+        }
+
+        # Switched on by the Executor for analyses run in cascade mode
+        self.cascade = False
+
+        if self.enabled and self.routes:
+            self.logger.debug(f"[INIT] Model routes: {self.routes}")
+
+    @staticmethod
+    def _normalize(stage: str, route: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Normalize one route, accepting 'model' as an alias of 'model_name'.
+
+        :param stage: Stage the route applies to
+        :param route: Route from the configuration
+        :return: Route limited to ROUTE_KEYS, without unset values
+        """
+
+        route = dict(route)
+        if 'model' in route:
+            route.setdefault('model_name', route.pop('model'))
+
+        route = {key: route[key] for key in ROUTE_KEYS if route.get(key) is not None}
+        if 'platform' in route and 'model_name' not in route:
+            raise ValueError(f"Route of stage '{stage}' sets a platform without a model")
+
+        return route
+
+    @classmethod
+    def from_config(cls, config_path: Optional[str] = None) -> "ModelRouter":
+        """
+        Create a ModelRouter from the YAML configuration and environment overrides.
+
+        :param config_path: Optional path to the routing YAML file
+        :return: Configured ModelRouter
+        """
+
+        config_path = config_path or os.getenv("MODEL_ROUTING_CONFIG", "config/model_routing.yaml")
+        config = {}
+
+        if os.path.exists(config_path):
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = yaml.safe_load(f) or {}
+
+        if os.getenv("MODEL_ROUTING_ENABLED"):
+            config['enabled'] = os.getenv("MODEL_ROUTING_ENABLED").lower() in {'1', 'true', 'yes'}
+
+        return cls(config)
+
+    def route(self, stage: Optional[str], platform: str, **kwargs) -> Tuple[str, Dict[str, Any]]:
+        """
+        Apply the route of a stage to the arguments of an LLM call.
+
+        :param stage: Pipeline stage of the call
+        :param platform: Platform requested by the calling component
+        :param kwargs: Handler arguments requested by the calling component
+        :return: Tuple of the platform and handler arguments to use
+        """
+
+        route = self.routes.get(stage) if self.enabled else None
+        if not route:
+            return platform, kwargs
+
+        kwargs = {**kwargs, **{key: value for key, value in route.items() if key != 'platform'}}
+        return route.get('platform', platform), kwargs
+
+    def tiers(self, stage: Optional[str], platform: str, **kwargs) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Get the models to try for a call whose output the caller can check.
+
+        :param stage: Pipeline stage of the call
+        :param platform: Platform requested by the calling component
+        :param kwargs: Handler arguments requested by the calling component
+        :return: List of (platform, handler arguments) from the first to the last tier,
+            a single entry when the stage has no cascade or cascade mode is off
+        """
+
+        tiers = self.cascades.get(stage) if self.cascade else None
+        if not tiers:
+            return [self.route(stage, platform, **kwargs)]
+
+        return [
+            (tier.get('platform', platform), {**kwargs, **{key: value for key, value in tier.items() if key != 'platform'}})
+            for tier in tiers
+        ]
+
+    def describe(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the active routes.
+
+        :return: Mapping of stage to its route, empty when routing is disabled
+        """
+
+        return {stage: dict(route) for stage, route in self.routes.items()} if self.enabled else {}
+
+    def describe_cascades(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get the active cascades.
+
+        :return: Mapping of stage to its tiers, empty when cascade mode is off
+        """
+
+        return {stage: [dict(tier) for tier in tiers] for stage, tiers in self.cascades.items()} if self.cascade else {}
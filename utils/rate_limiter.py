@@ -0,0 +1,470 @@
+import os
+import re
+import json
+import time
+import random
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable, Tuple
+import yaml
+from utils.logger import setup_logger
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Check whether an exception raised by an LLM client is a rate limit (HTTP 429) error.
+
+    :param error: The exception to inspect
+    :return: True if the provider rejected the request because of rate limits
+    """
+
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status == 429:
+        return True
+
+    message = str(error).lower()
+    return '429' in message or 'rate limit' in message or 'rate_limit' in message
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Check whether an exception is a transient provider error worth retrying.
+
+    :param error: The exception to inspect
+    :return: True for rate limits, server errors, timeouts and connection failures
+    """
+
+    if is_rate_limit_error(error):
+        return True
+
+    status = getattr(error, 'status_code', None)
+    if isinstance(status, int) and status >= 500:
+        return True
+
+    return type(error).__name__ in {'APIConnectionError', 'APITimeoutError', 'InternalServerError', 'Timeout'}
+
+
+class MemoryStateBackend:
+    """Keeps limiter state in process memory, shared by all threads."""
+
+    shared_across_processes = False
+
+    def __init__(self):
+        """Initialize the in-memory backend."""
+
+        self._lock = threading.Lock()
+        self._states = {}
+
+    def update(self, key: str, func: Callable[[Optional[Dict[str, Any]]], Tuple[Dict[str, Any], Any]]) -> Any:
+        """
+        Atomically read, modify and write the state stored under a key.
+
+        :param key: State key
+        :param func: Function receiving the current state (or None) and returning (new_state, result)
+        :return: The result returned by func
+        """
+
+        with self._lock:
+            state, result = func(self._states.get(key))
+            self._states[key] = state
+            return result
+
+
+class FileStateBackend:
+    """Keeps limiter state in JSON files guarded by exclusive file locks, shared by all local processes."""
+
+    shared_across_processes = True
+
+    def __init__(self, state_dir: str):
+        """
+        Initialize the file backend.
+
+        :param state_dir: Directory holding one state file per platform/model
+        """
+
+        if fcntl is None:
+            raise RuntimeError("File based rate limit state requires fcntl, which is not available on this platform")
+
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _state_path(self, key: str) -> Path:
+        """Get the state file path for a key."""
+
+        return self.state_dir / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', key)}.json"
+
+    def update(self, key: str, func: Callable[[Optional[Dict[str, Any]]], Tuple[Dict[str, Any], Any]]) -> Any:
+        """
+        Atomically read, modify and write the state stored under a key.
+
+        :param key: State key
+        :param func: Function receiving the current state (or None) and returning (new_state, result)
+        :return: The result returned by func
+        """
+
+        path = self._state_path(key)
+
+        # The thread lock avoids contending on flock from threads of the same process
+        with self._lock:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            with os.fdopen(fd, 'r+', encoding='utf-8') as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    raw = f.read()
+                    try:
+                        state = json.loads(raw) if raw.strip() else None
+                    except json.JSONDecodeError:
+                        state = None
+
+                    state, result = func(state)
+
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(state, f)
+                    f.flush()
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+            return result
+
+
+class RateLimitPermit:
+    """A granted slot for one LLM request."""
+
+    def __init__(self, key: str, reserved_tokens: int):
+        """
+        Initialize the permit.
+
+        :param key: Platform/model key the permit belongs to
+        :param reserved_tokens: Tokens taken from the token bucket for this request
+        """
+
+        self.key = key
+        self.reserved_tokens = reserved_tokens
+        self.actual_tokens = None
+        self.started_at = time.monotonic()
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter with AIMD concurrency control.
+
+    Every platform/model pair gets a requests-per-minute bucket, a tokens-per-minute bucket
+    and an adaptive concurrency limit. The concurrency limit grows additively while calls
+    complete with healthy latency and is cut multiplicatively when the provider answers 429.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the RateLimiter.
+
+        :param config: Rate limit configuration, see config/rate_limits.yaml
+        """
+
+        self.logger = setup_logger("RateLimiter")
+        self.config = config or {}
+
+        self.enabled = bool(self.config.get('enabled', True))
+        self.acquire_timeout = float(self.config.get('acquire_timeout', 300))
+        self.max_retries = int(self.config.get('max_retries', 3))
+        self.retry_base_delay = float(self.config.get('retry_base_delay', 2.0))
+        self.expected_completion_tokens = int(self.config.get('expected_completion_tokens', 512))
+
+        concurrency = self.config.get('concurrency', {}) or {}
+        self.initial_concurrency = float(concurrency.get('initial', 4))
+        self.min_concurrency = float(concurrency.get('min', 1))
+        self.max_concurrency = float(concurrency.get('max', 16))
+        self.additive_increase = float(concurrency.get('additive_increase', 1.0))
+        self.multiplicative_decrease = float(concurrency.get('multiplicative_decrease', 0.5))
+        self.healthy_latency = float(concurrency.get('healthy_latency', 60.0))
+        self.latency_tolerance = float(concurrency.get('latency_tolerance', 2.0))
+        self.cooldown = float(concurrency.get('cooldown', 5.0))
+
+        backend = self.config.get('backend', 'memory')
+        if backend == 'file' and fcntl is not None:
+            self.backend = FileStateBackend(self.config.get('state_dir', '.deot/rate_limits'))
+        else:
+            if backend == 'file':
+                self.logger.warning("[INIT] File backend unavailable on this platform, falling back to memory backend")
+            self.backend = MemoryStateBackend()
+
+        self.logger.debug(f"[INIT] RateLimiter initialized with backend={type(self.backend).__name__}, enabled={self.enabled}")
+
+    @classmethod
+    def from_config(cls, config_path: Optional[str] = None) -> "RateLimiter":
+        """
+        Create a RateLimiter from the YAML configuration and environment overrides.
+
+        :param config_path: Optional path to the rate limit YAML file
+        :return: Configured RateLimiter
+        """
+
+        config_path = config_path or os.getenv("RATE_LIMIT_CONFIG", "config/rate_limits.yaml")
+        config = {}
+
+        if os.path.exists(config_path):
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = yaml.safe_load(f) or {}
+
+        if os.getenv("RATE_LIMIT_ENABLED"):
+            config['enabled'] = os.getenv("RATE_LIMIT_ENABLED").lower() in {'1', 'true', 'yes'}
+        if os.getenv("RATE_LIMIT_BACKEND"):
+            config['backend'] = os.getenv("RATE_LIMIT_BACKEND")
+        if os.getenv("RATE_LIMIT_STATE_DIR"):
+            config['state_dir'] = os.getenv("RATE_LIMIT_STATE_DIR")
+
+        return cls(config)
+
+    def get_limits(self, platform: str, model_name: str) -> Dict[str, float]:
+        """
+        Get the configured limits for a platform/model pair.
+
+        :param platform: LLM platform
+        :param model_name: Model name
+        :return: Dictionary with requests_per_minute and tokens_per_minute
+        """
+
+        platform_config = (self.config.get('platforms', {}) or {}).get(platform.lower(), {}) or {}
+        limits = dict(platform_config.get('default', {}) or {})
+        limits.update((platform_config.get('models', {}) or {}).get(model_name, {}) or {})
+
+        return {
+            'requests_per_minute': float(limits.get('requests_per_minute', 0) or 0),
+            'tokens_per_minute': float(limits.get('tokens_per_minute', 0) or 0)
+        }
+
+    def estimate_tokens(self, *texts: str) -> int:
+        """
+        Roughly estimate the tokens a request will consume.
+
+        :param texts: Prompt texts sent with the request
+        :return: Estimated prompt tokens plus the expected completion tokens
+        """
+
+        return sum(len(text or '') for text in texts) // 4 + self.expected_completion_tokens
+
+    def _new_state(self, limits: Dict[str, float], now: float) -> Dict[str, Any]:
+        """Create the initial state for a platform/model pair."""
+
+        return {
+            'requests': limits['requests_per_minute'],
+            'tokens': limits['tokens_per_minute'],
+            'updated_at': now,
+            'concurrency': self.initial_concurrency,
+            'in_flight': {},
+            'latency_ewma': None,
+            'cooldown_until': 0.0
+        }
+
+    def _refill(self, state: Dict[str, Any], limits: Dict[str, float], now: float) -> None:
+        """Refill both buckets for the time elapsed since the last update."""
+
+        elapsed = max(0.0, now - state['updated_at'])
+        state['requests'] = min(limits['requests_per_minute'], state['requests'] + elapsed * limits['requests_per_minute'] / 60.0)
+        state['tokens'] = min(limits['tokens_per_minute'], state['tokens'] + elapsed * limits['tokens_per_minute'] / 60.0)
+        state['updated_at'] = now
+
+        # Drop in-flight slots held by processes that exited without releasing them
+        if self.backend.shared_across_processes:
+            for pid in list(state['in_flight']):
+                if not self._pid_alive(int(pid)):
+                    del state['in_flight'][pid]
+
+    @staticmethod
+    def _pid_alive(pid: int) -> bool:
+        """Check whether a process is still running."""
+
+        if pid == os.getpid():
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _try_acquire(self, key: str, limits: Dict[str, float], tokens: int) -> Tuple[Optional[RateLimitPermit], float]:
+        """
+        Try to take a permit without blocking.
+
+        :return: (permit, 0) on success, (None, seconds to wait) otherwise
+        """
+
+        pid = str(os.getpid())
+
+        def apply(state):
+            now = time.time()
+            state = state or self._new_state(limits, now)
+            self._refill(state, limits, now)
+
+            if now < state['cooldown_until']:
+                return state, (None, state['cooldown_until'] - now)
+
+            in_flight = sum(state['in_flight'].values())
+            if in_flight >= max(1, int(state['concurrency'])):
+                return state, (None, 0.05)
+
+            rpm = limits['requests_per_minute']
+            if rpm and state['requests'] < 1:
+                return state, (None, (1 - state['requests']) * 60.0 / rpm)
+
+            # A request larger than the whole bucket only waits for a full bucket
+            tpm = limits['tokens_per_minute']
+            needed = min(tokens, tpm) if tpm else 0
+            if tpm and state['tokens'] < needed:
+                return state, (None, (needed - state['tokens']) * 60.0 / tpm)
+
+            if rpm:
+                state['requests'] -= 1
+            if tpm:
+                state['tokens'] -= needed
+            state['in_flight'][pid] = state['in_flight'].get(pid, 0) + 1
+
+            return state, (RateLimitPermit(key, needed), 0.0)
+
+        return self.backend.update(key, apply)
+
+    def acquire(self, platform: str, model_name: str, tokens: int = 0) -> Optional[RateLimitPermit]:
+        """
+        Block until a request to the platform/model may be sent.
+
+        :param platform: LLM platform
+        :param model_name: Model name
+        :param tokens: Estimated tokens for the request
+        :return: The granted permit, or None if rate limiting is disabled
+        :raises TimeoutError: If no permit could be obtained within acquire_timeout
+        """
+
+        if not self.enabled:
+            return None
+
+        key = f"{platform.lower()}:{model_name}"
+        limits = self.get_limits(platform, model_name)
+        deadline = time.monotonic() + self.acquire_timeout
+
+        while True:
+            permit, wait = self._try_acquire(key, limits, tokens)
+            if permit:
+                return permit
+
+            if time.monotonic() + wait > deadline:
+                raise TimeoutError(f"Timed out waiting for rate limit permit for {key}")
+
+            self.logger.debug(f"[WAIT] Waiting {wait:.2f}s for rate limit permit on {key}")
+            time.sleep(min(wait, 1.0) + random.uniform(0, 0.01))
+
+    def release(self, permit: Optional[RateLimitPermit], throttled: bool = False) -> None:
+        """
+        Return a permit and feed the outcome into the AIMD controller.
+
+        :param permit: Permit returned by acquire
+        :param throttled: Whether the provider rejected the request with a rate limit error
+        """
+
+        if permit is None:
+            return
+
+        latency = time.monotonic() - permit.started_at
+        pid = str(os.getpid())
+
+        def apply(state):
+            if state is None:
+                return state, None
+
+            if state['in_flight'].get(pid, 0) > 1:
+                state['in_flight'][pid] -= 1
+            else:
+                state['in_flight'].pop(pid, None)
+
+            # Give back the reservation difference once the real usage is known
+            if permit.actual_tokens is not None and permit.reserved_tokens:
+                state['tokens'] += permit.reserved_tokens - permit.actual_tokens
+
+            if throttled:
+                state['concurrency'] = max(self.min_concurrency, state['concurrency'] * self.multiplicative_decrease)
+                state['cooldown_until'] = time.time() + self.cooldown
+                return state, None
+
+            ewma = state['latency_ewma']
+            healthy = latency <= self.healthy_latency and (ewma is None or latency <= ewma * self.latency_tolerance)
+            state['latency_ewma'] = latency if ewma is None else 0.8 * ewma + 0.2 * latency
+
+            if healthy:
+                state['concurrency'] = min(
+                    self.max_concurrency,
+                    state['concurrency'] + self.additive_increase / max(state['concurrency'], 1.0)
+                )
+
+            return state, None
+
+        self.backend.update(permit.key, apply)
+
+        if throttled:
+            self.logger.warning(f"[THROTTLED] Rate limited on {permit.key}, reducing concurrency")
+
+    @contextmanager
+    def limit(self, platform: str, model_name: str, tokens: int = 0):
+        """
+        Context manager that holds a permit for the duration of one request.
+
+        :param platform: LLM platform
+        :param model_name: Model name
+        :param tokens: Estimated tokens for the request
+        """
+
+        permit = self.acquire(platform, model_name, tokens)
+        throttled = False
+        try:
+            yield permit
+        except Exception as e:
+            throttled = is_rate_limit_error(e)
+            raise
+        finally:
+            # Also runs when a streaming consumer stops iterating early
+            self.release(permit, throttled=throttled)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        Get the delay before retrying a failed request.
+
+        :param attempt: Zero-based retry attempt
+        :return: Delay in seconds, exponential with jitter
+        """
+
+        return self.retry_base_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    def get_status(self, platform: str, model_name: str) -> Dict[str, Any]:
+        """
+        Get the current limiter state for a platform/model pair.
+
+        :param platform: LLM platform
+        :param model_name: Model name
+        :return: Snapshot of bucket levels, concurrency and in-flight requests
+        """
+
+        key = f"{platform.lower()}:{model_name}"
+        limits = self.get_limits(platform, model_name)
+
+        def apply(state):
+            now = time.time()
+            state = state or self._new_state(limits, now)
+            self._refill(state, limits, now)
+            return state, {
+                'requests_available': state['requests'],
+                'tokens_available': state['tokens'],
+                'concurrency': state['concurrency'],
+                'in_flight': sum(state['in_flight'].values()),
+                'latency_ewma': state['latency_ewma']
+            }
+
+        return self.backend.update(key, apply)
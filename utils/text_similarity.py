@@ -0,0 +1,255 @@
+import re
+import hashlib
+from typing import Any, List, Optional, Set
+import numpy as np
+
+# Mersenne prime and hash range of the universal hash family used for the permutations
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+# Function words ignored when comparing short queries
+QUERY_STOPWORDS = frozenset("""
+a an and are as at be by can could do does for from has have how in into is it its may might
+of on or should that the their this to was were what when where which who why will with would
+""".split())
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for similarity comparisons.
+
+    :param text: Text to normalize
+    :return: Lowercased text without punctuation and with single spaces
+    """
+
+    text = _NON_WORD.sub(" ", (text or "").lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def query_terms(query: str) -> str:
+    """
+    Reduce a query to its content words.
+
+    :param query: Query to reduce
+    :return: Normalized query without function words
+    """
+
+    return " ".join(word for word in normalize_text(query).split() if word not in QUERY_STOPWORDS)
+
+
+def shingles(text: str, size: int = 3) -> Set[str]:
+    """
+    Split text into word shingles.
+
+    :param text: Text to split
+    :param size: Number of words per shingle
+    :return: Set of shingles, a single shingle for texts shorter than the size
+    """
+
+    words = normalize_text(text).split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """MinHasher builds MinHash signatures of word shingles to estimate Jaccard similarity."""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        """
+        Initialize MinHasher.
+
+        :param num_perm: Number of hash permutations, the signature length
+        :param shingle_size: Number of words per shingle
+        :param seed: Seed of the permutations, signatures are only comparable with the same seed
+        """
+
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 61, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 61, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        Compute the MinHash signature of a text.
+
+        :param text: Text to hash
+        :return: Signature array of length num_perm, or None for text without words
+        """
+
+        tokens = shingles(text, self.shingle_size)
+        if not tokens:
+            return None
+
+        # Stable 32-bit shingle hashes, Python's hash() is salted per process
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little") for token in tokens),
+            dtype=np.uint64,
+            count=len(tokens)
+        )
+
+        # Multiplication wraps around in uint64, which is fine for hashing
+        with np.errstate(over="ignore"):
+            permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return (permuted & _MAX_HASH).min(axis=0)
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """
+        Estimate the Jaccard similarity of two signatures.
+
+        :param first: First signature
+        :param second: Second signature
+        :return: Fraction of matching permutations between 0 and 1
+        """
+
+        return float(np.mean(first == second))
+
+
+class NoveltyDetector:
+    """NoveltyDetector scores how much new content a text adds to the texts seen before."""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3):
+        """
+        Initialize NoveltyDetector.
+
+        :param num_perm: Number of MinHash permutations
+        :param shingle_size: Number of words per shingle
+        """
+
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+        self._signatures: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def reset(self) -> None:
+        """Forget all texts seen so far."""
+
+        self._signatures = []
+        self._matrix = None
+
+    def score(self, text: str) -> float:
+        """
+        Score the novelty of a text against all texts added so far.
+
+        :param text: Text to score
+        :return: 1 minus the highest estimated Jaccard similarity, 1.0 when nothing is comparable
+        """
+
+        signature = self.hasher.signature(text)
+        if signature is None or not self._signatures:
+            return 1.0
+
+        if self._matrix is None or len(self._matrix) != len(self._signatures):
+            self._matrix = np.vstack(self._signatures)
+
+        return 1.0 - float((self._matrix == signature).mean(axis=1).max())
+
+    def add(self, text: str) -> None:
+        """
+        Add a text to the ones later texts are compared against.
+
+        :param text: Text to add
+        """
+
+        signature = self.hasher.signature(text)
+        if signature is not None:
+            self._signatures.append(signature)
+
+
+class QueryIndex:
+    """
+    QueryIndex finds near-duplicate queries with MinHash locality-sensitive hashing.
+
+    Signatures are split into bands; queries sharing any band become candidates, and a
+    candidate is a duplicate when its estimated Jaccard similarity reaches the threshold.
+    """
+
+    def __init__(self, threshold: float = 0.75, num_perm: int = 64, bands: int = 16):
+        """
+        Initialize QueryIndex.
+
+        :param threshold: Estimated Jaccard similarity at which two queries are duplicates
+        :param num_perm: Number of MinHash permutations, must be divisible by bands
+        :param bands: Number of LSH bands
+        """
+
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        # Queries are short, so their content words are the shingles
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=1)
+        self.reset()
+
+    def reset(self) -> None:
+        """Remove all indexed queries."""
+
+        self._exact: dict = {}
+        self._buckets: List[dict] = [{} for _ in range(self.bands)]
+        self._entries: List[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def find(self, query: str) -> Optional[Any]:
+        """
+        Find an indexed query that is a near-duplicate of the given query.
+
+        :param query: Query to look up
+        :return: Value stored with the most similar duplicate, or None
+        """
+
+        normalized = query_terms(query)
+        if not normalized:
+            return None
+
+        if normalized in self._exact:
+            return self._exact[normalized]
+
+        signature = self.hasher.signature(normalized)
+        candidates = set()
+        for band, bucket in enumerate(self._buckets):
+            candidates.update(bucket.get(self._band_key(signature, band), ()))
+
+        best_value, best_similarity = None, self.threshold
+        for index in candidates:
+            entry_signature, value = self._entries[index]
+            similarity = MinHasher.similarity(signature, entry_signature)
+            if similarity >= best_similarity:
+                best_value, best_similarity = value, similarity
+
+        return best_value
+
+    def add(self, query: str, value: Any) -> None:
+        """
+        Index a query.
+
+        :param query: Query to index
+        :param value: Value returned when a later query duplicates this one
+        """
+
+        normalized = query_terms(query)
+        if not normalized:
+            return
+
+        self._exact.setdefault(normalized, value)
+
+        signature = self.hasher.signature(normalized)
+        index = len(self._entries)
+        self._entries.append((signature, value))
+        for band, bucket in enumerate(self._buckets):
+            bucket.setdefault(self._band_key(signature, band), []).append(index)
+
+    def _band_key(self, signature: np.ndarray, band: int) -> bytes:
+        """Get the bucket key of one signature band."""
+
+        return signature[band * self.rows:(band + 1) * self.rows].tobytes()
@@ -0,0 +1,109 @@
+from functools import lru_cache
+from typing import Any, Optional
+from utils.logger import setup_logger
+
+logger = setup_logger("TokenCounter")
+
+# Context window sizes in tokens for the models used by the framework
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "llama-3.1-sonar-small-128k-online": 127072,
+    "llama-3.1-sonar-large-128k-online": 127072,
+    "llama-3.1-sonar-huge-128k-online": 127072,
+    "sonar": 127072,
+    "sonar-pro": 200000
+}
+
+DEFAULT_CONTEXT_WINDOW = 8192
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model_name: str) -> Optional[Any]:
+    """
+    Load the tiktoken encoding for a model.
+
+    :param model_name: The name of the model
+    :return: The tiktoken encoding, or None if tiktoken cannot provide one
+    """
+
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            # Non-OpenAI models (e.g. Perplexity sonar) get a close approximation
+            return tiktoken.get_encoding("cl100k_base")
+
+    except Exception as e:
+        logger.warning(f"[TOKENIZER] tiktoken unavailable for {model_name}, using character estimate: {str(e)}")
+        return None
+
+
+class TokenCounter:
+    """TokenCounter counts and truncates text in model tokens."""
+
+    def __init__(self, model_name: str = "gpt-4o"):
+        """
+        Initialize the TokenCounter.
+
+        :param model_name: The name of the model whose tokenizer is used
+        """
+
+        self.model_name = model_name
+        self.encoding = _get_encoding(model_name)
+
+    @property
+    def context_window(self) -> int:
+        """Context window size of the model in tokens."""
+
+        if self.model_name in MODEL_CONTEXT_WINDOWS:
+            return MODEL_CONTEXT_WINDOWS[self.model_name]
+
+        # Match dated or suffixed variants such as gpt-4o-2024-08-06
+        for name in sorted(MODEL_CONTEXT_WINDOWS, key=len, reverse=True):
+            if self.model_name.startswith(name):
+                return MODEL_CONTEXT_WINDOWS[name]
+
+        return DEFAULT_CONTEXT_WINDOW
+
+    def count(self, text: str) -> int:
+        """
+        Count the tokens in a text.
+
+        :param text: Text to count
+        :return: Number of tokens
+        """
+
+        if not text:
+            return 0
+
+        if self.encoding is None:
+            return (len(text) + 3) // 4
+
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Truncate a text to at most max_tokens tokens.
+
+        :param text: Text to truncate
+        :param max_tokens: Maximum number of tokens to keep
+        :return: The truncated text
+        """
+
+        if max_tokens <= 0:
+            return ""
+
+        if self.encoding is None:
+            return text[:max_tokens * 4]
+
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+
+        return self.encoding.decode(tokens[:max_tokens])
@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Callable
+from utils.logger import setup_logger
+
+
+class Tracer:
+    """
+    Tracer records nested spans of an analysis in Chrome Trace Event format.
+    The resulting trace.json can be opened in Perfetto or chrome://tracing.
+    Spans are no-ops while tracing is disabled.
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        """Implement singleton pattern"""
+
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """Initialize the tracer state"""
+
+        if self._initialized:
+            return
+
+        self.logger = setup_logger("Tracer")
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._events = []
+        self._thread_names = {}
+        self._origin = time.perf_counter()
+
+        self._initialized = True
+
+    def start(self) -> None:
+        """Enable tracing and discard previously recorded spans."""
+
+        with self._lock:
+            self._events = []
+            self._thread_names = {}
+            self._origin = time.perf_counter()
+            self.enabled = True
+
+        self.logger.debug("[TRACE] Tracing started")
+
+    def stop(self) -> None:
+        """Disable tracing, keeping the recorded spans."""
+
+        self.enabled = False
+
+    @contextmanager
+    def span(self, name: str, category: str = "deot", **args):
+        """
+        Record the enclosed block as one span.
+
+        :param name: Span name
+        :param category: Span category shown in the trace viewer
+        :param args: Additional arguments attached to the span
+        """
+
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            args["error"] = str(e)
+            raise
+        finally:
+            self._add_span(name, category, start, time.perf_counter(), args)
+
+    def _add_span(self, name: str, category: str, start: float, end: float, args: Dict[str, Any]) -> None:
+        """Store a complete ('X') trace event."""
+
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((start - self._origin) * 1e6, 1),
+            "dur": round((end - start) * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": {key: str(value) for key, value in args.items()}
+        }
+
+        with self._lock:
+            self._events.append(event)
+            self._thread_names.setdefault(thread.ident, thread.name)
+
+    def get_events(self) -> List[Dict[str, Any]]:
+        """
+        Get the recorded events including thread name metadata.
+
+        :return: List of trace events
+        """
+
+        with self._lock:
+            metadata = [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": tid,
+                    "args": {"name": thread_name}
+                }
+                for tid, thread_name in self._thread_names.items()
+            ]
+            return metadata + sorted(self._events, key=lambda event: event["ts"])
+
+    def save(self, file_path: str) -> str:
+        """
+        Write the recorded spans to a Chrome Trace Event file.
+
+        :param file_path: Path of the trace file
+        :return: The path of the written file
+        """
+
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": self.get_events(), "displayTimeUnit": "ms"}, f)
+
+        self.logger.debug(f"[TRACE] Trace saved to {file_path}")
+        return file_path
+
+
+def traced(name: Optional[str] = None, category: str = "deot") -> Callable:
+    """
+    Decorator recording every call of a function as a span.
+
+    :param name: Span name, defaults to the function's qualified name
+    :param category: Span category shown in the trace viewer
+    :return: The decorator
+    """
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = Tracer()
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+
+            with tracer.span(span_name, category):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
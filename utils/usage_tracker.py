@@ -0,0 +1,269 @@
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from utils.logger import setup_logger
+
+# USD per one million (prompt, completion) tokens
+MODEL_PRICING = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "llama-3.1-sonar-small-128k-online": (0.20, 0.20),
+    "llama-3.1-sonar-large-128k-online": (1.00, 1.00),
+    "llama-3.1-sonar-huge-128k-online": (5.00, 5.00),
+    "sonar": (1.00, 1.00),
+    "sonar-pro": (3.00, 15.00)
+}
+
+# Tags attached to every LLM call made within a scope, such as the node being generated
+_usage_tags = contextvars.ContextVar("usage_tags", default={})
+
+
+def estimate_cost(model_name: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """
+    Estimate the cost of one LLM call in USD.
+
+    :param model_name: The name of the model
+    :param prompt_tokens: Number of prompt tokens
+    :param completion_tokens: Number of completion tokens
+    :return: Estimated cost, 0 for models without known pricing
+    """
+
+    pricing = MODEL_PRICING.get(model_name)
+    if pricing is None:
+        # Match dated or suffixed variants such as gpt-4o-2024-08-06
+        for name in sorted(MODEL_PRICING, key=len, reverse=True):
+            if model_name.startswith(name):
+                pricing = MODEL_PRICING[name]
+                break
+        else:
+            return 0.0
+
+    return (prompt_tokens * pricing[0] + completion_tokens * pricing[1]) / 1_000_000
+
+
+class UsageTracker:
+    """
+    UsageTracker records token usage, latency and cost of every LLM call.
+    Records of the latest analysis are kept and can be aggregated per stage, component and node.
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        """Implement singleton pattern"""
+
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """Initialize the usage tracker state"""
+
+        if self._initialized:
+            return
+
+        self.logger = setup_logger("UsageTracker")
+        self._lock = threading.Lock()
+        self._records = {}
+        self._current_analysis_id = None
+
+        self._initialized = True
+
+    def start_analysis(self, analysis_id: str) -> None:
+        """
+        Start recording calls for a new analysis.
+
+        Records of the previous analysis are dropped, it was summarized into its result
+        when it completed, so long-lived processes keep the records of one analysis only.
+
+        :param analysis_id: Unique identifier for the analysis
+        """
+
+        with self._lock:
+            self._current_analysis_id = analysis_id
+            self._records = {analysis_id: []}
+
+    @contextmanager
+    def scope(self, **tags):
+        """
+        Attach tags (e.g. node_id) to every LLM call made inside the block.
+
+        :param tags: Tags to attach
+        """
+
+        token = _usage_tags.set({**_usage_tags.get(), **tags})
+        try:
+            yield
+        finally:
+            _usage_tags.reset(token)
+
+    def current_tags(self) -> Dict[str, Any]:
+        """Get the tags of the current scope."""
+
+        return dict(_usage_tags.get())
+
+    def record(
+            self,
+            platform: str,
+            model_name: str,
+            prompt_tokens: int,
+            completion_tokens: int,
+            latency: float,
+            retries: int = 0,
+            component: Optional[str] = None,
+            stage: Optional[str] = None,
+            estimated: bool = False,
+            status: str = "success"
+    ) -> Dict[str, Any]:
+        """
+        Record one LLM call for the current analysis.
+
+        :param platform: LLM platform
+        :param model_name: Model name
+        :param prompt_tokens: Prompt tokens used
+        :param completion_tokens: Completion tokens used
+        :param latency: Wall time of the call in seconds, including retries
+        :param retries: Number of retried attempts
+        :param component: Calling component kind (agent, engine, prompter, validator, response)
+        :param stage: Pipeline stage of the call (e.g. controller, news_search)
+        :param estimated: Whether token counts were estimated rather than reported by the provider
+        :param status: 'success' or 'error'
+        :return: The stored record
+        """
+
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "platform": platform,
+            "model": model_name,
+            "component": component or "unknown",
+            "stage": stage or "unknown",
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency": latency,
+            "retries": retries,
+            "cost": estimate_cost(model_name, prompt_tokens, completion_tokens),
+            "estimated_tokens": estimated,
+            "status": status,
+            **self.current_tags()
+        }
+
+        with self._lock:
+            if self._current_analysis_id is not None:
+                self._records[self._current_analysis_id].append(entry)
+
+        return entry
+
+    def get_records(self, analysis_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the recorded calls of an analysis.
+
+        :param analysis_id: Optional analysis identifier, defaults to the current analysis
+        :return: List of call records
+        """
+
+        with self._lock:
+            return list(self._records.get(analysis_id or self._current_analysis_id, []))
+
+    def summarize(self, analysis_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Aggregate the recorded calls of an analysis.
+
+        :param analysis_id: Optional analysis identifier, defaults to the current analysis
+        :return: Dictionary with totals and breakdowns by stage, component and node
+        """
+
+        records = self.get_records(analysis_id)
+
+        totals = self._empty_totals()
+        by_stage = {}
+        by_component = {}
+        by_node = {}
+
+        for entry in records:
+            self._accumulate(totals, entry)
+            self._accumulate(by_stage.setdefault(entry["stage"], self._empty_totals()), entry)
+            self._accumulate(by_component.setdefault(entry["component"], self._empty_totals()), entry)
+            if entry.get("node_id"):
+                self._accumulate(by_node.setdefault(entry["node_id"], self._empty_totals()), entry)
+
+        return {
+            "totals": totals,
+            "by_stage": by_stage,
+            "by_component": by_component,
+            "by_node": by_node
+        }
+
+    def summarize_cascade(self, analysis_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Aggregate the model cascade calls of an analysis per stage.
+
+        Latency saved compares the cascade with calling the last tier for every request,
+        using the mean latency of the stage's escalated calls. It is None when the stage
+        never reached its last tier.
+
+        :param analysis_id: Optional analysis identifier, defaults to the current analysis
+        :return: Mapping of stage to requests, escalations, escalation rate and latency saved
+        """
+
+        stages = {}
+        for entry in self.get_records(analysis_id):
+            if "cascade_tier" not in entry:
+                continue
+
+            stage = stages.setdefault(entry["stage"], {
+                "requests": 0, "escalations": 0, "latency": 0.0, "last_tier": []
+            })
+            stage["latency"] += entry["latency"]
+            if entry["cascade_tier"] == 0:
+                stage["requests"] += 1
+            else:
+                stage["escalations"] += 1
+            if entry["cascade_tier"] == entry["cascade_tiers"] - 1 and entry["status"] == "success":
+                stage["last_tier"].append(entry["latency"])
+
+        summary = {}
+        for name, stage in stages.items():
+            last_tier = stage["last_tier"]
+            saved = None
+            if last_tier:
+                saved = round(stage["requests"] * sum(last_tier) / len(last_tier) - stage["latency"], 3)
+
+            summary[name] = {
+                "requests": stage["requests"],
+                "escalations": stage["escalations"],
+                "escalation_rate": round(stage["escalations"] / stage["requests"], 3) if stage["requests"] else 0.0,
+                "latency": round(stage["latency"], 3),
+                "latency_saved": saved
+            }
+
+        return summary
+
+    def _empty_totals(self) -> Dict[str, Any]:
+        """Create an empty aggregate."""
+
+        return {
+            "calls": 0,
+            "errors": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "latency": 0.0,
+            "retries": 0,
+            "cost": 0.0
+        }
+
+    def _accumulate(self, totals: Dict[str, Any], entry: Dict[str, Any]) -> None:
+        """Add one call record to an aggregate."""
+
+        totals["calls"] += 1
+        totals["errors"] += entry["status"] != "success"
+        totals["prompt_tokens"] += entry["prompt_tokens"]
+        totals["completion_tokens"] += entry["completion_tokens"]
+        totals["latency"] = round(totals["latency"] + entry["latency"], 3)
+        totals["retries"] += entry["retries"]
+        totals["cost"] = round(totals["cost"] + entry["cost"], 6)
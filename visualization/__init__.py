@@ -1,5 +1,9 @@
 from visualization.mermaid_generator import MermaidGenerator
+from visualization.graph import VisualizationGraph
+from visualization.html_viewer import HtmlViewer
 
 __all__ = [
-    'MermaidGenerator'
+    'MermaidGenerator',
+    'VisualizationGraph',
+    'HtmlViewer'
 ]
\ No newline at end of file
@@ -0,0 +1,100 @@
+from typing import Dict, Any, List, Optional
+
+
+class VisualizationGraph:
+    """
+    VisualizationGraph holds the nodes and edges of the analysis diagram, indexed for
+    incremental updates while the analysis runs.
+
+    Nodes are kept in a dictionary by id and edges by their (source, target) pair, so
+    adding or updating a node and deduplicating its edges take constant time, and the
+    maximum layer is tracked as nodes arrive. Insertion order is kept for the output.
+    """
+
+    def __init__(self):
+        """Initialize an empty VisualizationGraph."""
+
+        self._nodes = {}
+        self._edges = {}
+        self.max_depth = 0
+
+    def add_node(self, entry: Dict[str, Any], parent_id: Optional[str] = None) -> None:
+        """
+        Add a node or replace the entry of a node already in the graph.
+
+        The edge from the parent is typed by the node, so it is updated together with
+        the node type. A node with 'duplicate_of' is also linked to the node it reuses.
+
+        :param entry: Flat node entry with at least 'node_id', 'type' and 'layer'
+        :param parent_id: Identifier of the parent node, None for the root
+        """
+
+        node_id = entry["node_id"]
+        self._nodes[node_id] = entry
+        self.max_depth = max(self.max_depth, entry.get("layer", 0))
+
+        if parent_id is not None:
+            self.add_edge(parent_id, node_id, entry.get("type") or "unknown")
+
+        # Link duplicates to the node whose result they reuse
+        if entry.get("duplicate_of"):
+            self.add_edge(node_id, entry["duplicate_of"], "DUPLICATE_OF")
+
+    def add_edge(self, source: str, target: str, edge_type: str) -> None:
+        """
+        Add an edge, or update the type of the edge between the same nodes.
+
+        :param source: Source node identifier
+        :param target: Target node identifier
+        :param edge_type: Edge type
+        """
+
+        self._edges[(source, target)] = {"source": source, "target": target, "type": edge_type}
+
+    def get_node(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the entry of a node.
+
+        :param node_id: Node identifier
+        :return: The node entry, None if the node is not in the graph
+        """
+
+        return self._nodes.get(node_id)
+
+    def has_edge(self, source: str, target: str) -> bool:
+        """
+        Check whether two nodes are connected.
+
+        :param source: Source node identifier
+        :param target: Target node identifier
+        :return: True if the edge exists
+        """
+
+        return (source, target) in self._edges
+
+    def reset(self) -> None:
+        """Remove all nodes and edges."""
+
+        self._nodes = {}
+        self._edges = {}
+        self.max_depth = 0
+
+    @property
+    def edge_count(self) -> int:
+        """Number of edges."""
+        return len(self._edges)
+
+    def to_dict(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get the visualization data.
+
+        :return: Dictionary with 'nodes' and 'edges' in insertion order
+        """
+
+        return {"nodes": list(self._nodes.values()), "edges": list(self._edges.values())}
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self._nodes
+
+    def __len__(self) -> int:
+        return len(self._nodes)
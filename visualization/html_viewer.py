@@ -0,0 +1,459 @@
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from utils.logger import setup_logger
+
+
+def open_in_browser(path: str) -> None:
+    """
+    Open a local file with the default application of the platform.
+
+    :param path: Path to the file
+    """
+
+    if sys.platform == 'darwin':  # macOS
+        subprocess.run(['open', path])
+    elif sys.platform == 'win32':  # Windows
+        os.startfile(path)
+    else:  # Linux
+        subprocess.run(['xdg-open', path])
+
+
+class HtmlViewer:
+    """
+    HtmlViewer writes a static, lazily loading HTML viewer of the analysis tree.
+
+    The viewer is a directory with index.html, a compact tree index (index.js) and
+    node shards (nodes/<n>.js). The index holds the parent, type, layer and a short
+    label of every node in pre-order, so a subtree is contiguous and lives in few
+    shards. Full queries, decisions and summaries are only loaded from the shards
+    when a node is selected, and only expanded subtrees are rendered. Data files are
+    scripts calling the viewer instead of JSON fetched with XHR, which browsers block
+    for file:// pages, so the viewer opens from the local filesystem without a server.
+    """
+
+    # Nodes per shard, a shard is loaded when one of its nodes is selected
+    SHARD_SIZE = 50
+
+    # Characters of the query kept as the node label in the index
+    LABEL_LENGTH = 80
+
+    # Children rendered at once when a node is expanded
+    PAGE_SIZE = 200
+
+    VIEWER_DIR = "viewer"
+
+    def __init__(self, output_dir: str = "output", shard_size: int = SHARD_SIZE, label_length: int = LABEL_LENGTH):
+        """
+        Initialize HtmlViewer.
+
+        :param output_dir: Analysis directory, the viewer is written to its viewer subdirectory
+        :param shard_size: Nodes per shard file
+        :param label_length: Maximum label length in the tree index
+        """
+        self.logger = setup_logger("HtmlViewer")
+        self.output_dir = output_dir
+        self.viewer_dir = os.path.join(output_dir, self.VIEWER_DIR)
+        self.shard_size = max(1, shard_size)
+        self.label_length = label_length
+
+    def _order(self, visualization_data: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Optional[str]]]:
+        """
+        Sort the nodes in depth-first pre-order.
+
+        :param visualization_data: Dictionary containing nodes and edges
+        :return: Tuple of the ordered nodes and the parent id of every node
+        """
+
+        nodes = {node["node_id"]: node for node in visualization_data.get("nodes", []) if node.get("node_id")}
+        parents = {}
+        children = {}
+        for edge in visualization_data.get("edges", []):
+            if edge.get("type") == "DUPLICATE_OF" or edge.get("target") not in nodes:
+                continue
+            parents[edge["target"]] = edge["source"]
+            children.setdefault(edge["source"], []).append(edge["target"])
+
+        # Roots are the nodes without a known parent, usually only the analysis root
+        stack = [node_id for node_id in reversed(list(nodes)) if parents.get(node_id) not in nodes]
+        ordered = []
+        seen = set()
+        while stack:
+            node_id = stack.pop()
+            if node_id in seen:
+                continue
+            seen.add(node_id)
+            ordered.append(nodes[node_id])
+            stack.extend(reversed(children.get(node_id, [])))
+        return ordered, parents
+
+    def _label(self, node: Dict[str, Any]) -> str:
+        """Get the short single line label of a node."""
+
+        label = " ".join(str(node.get("query") or node.get("original_query") or node.get("node_id", "")).split())
+        if len(label) > self.label_length:
+            label = label[:self.label_length - 3].rstrip() + "..."
+        return label
+
+    def _write_script(self, path: str, call: str, *args: Any) -> int:
+        """
+        Write a data file as a script calling the viewer.
+
+        :param path: Path of the script
+        :param call: Viewer function called with the data
+        :param args: JSON serializable arguments
+        :return: Bytes written
+        """
+
+        payload = ",".join(json.dumps(arg, ensure_ascii=False, separators=(",", ":")) for arg in args)
+        # Line separators are valid in JSON but end string literals in older JavaScript engines
+        payload = payload.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029")
+        content = f"DEOT_VIEWER.{call}({payload});\n".encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(content)
+        return len(content)
+
+    def generate(self, visualization_data: Dict[str, Any], analysis_id: str, query: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Write the viewer of an analysis.
+
+        :param visualization_data: Dictionary containing nodes and edges
+        :param analysis_id: Unique identifier for the analysis
+        :param query: User query shown as the viewer title
+        :return: Dictionary with the viewer file, node and shard counts and the index size
+        """
+        try:
+            self.logger.debug(f"[GENERATE] Writing HTML viewer for analysis {analysis_id}...")
+
+            ordered, parents = self._order(visualization_data)
+            position = {node["node_id"]: i for i, node in enumerate(ordered)}
+            types = []
+            type_codes = {}
+            index_nodes = []
+            for node in ordered:
+                node_type = node.get("type") or "UNKNOWN"
+                if node_type not in type_codes:
+                    type_codes[node_type] = len(types)
+                    types.append(node_type)
+                entry = [
+                    position.get(parents.get(node["node_id"]), -1),
+                    type_codes[node_type],
+                    node.get("layer", 0),
+                    self._label(node)
+                ]
+                if node.get("duplicate_of") in position:
+                    entry.append(position[node["duplicate_of"]])
+                index_nodes.append(entry)
+
+            shard_dir = os.path.join(self.viewer_dir, "nodes")
+            os.makedirs(shard_dir, exist_ok=True)
+
+            shards = 0
+            for start in range(0, len(ordered), self.shard_size):
+                details = []
+                for node in ordered[start:start + self.shard_size]:
+                    decision = node.get("engine_decision") or {}
+                    details.append({
+                        "id": node["node_id"],
+                        "query": node.get("query", ""),
+                        "original_query": node.get("original_query"),
+                        "focus": decision.get("focus"),
+                        "questions": decision.get("questions") or [],
+                        "summary": node.get("node_summary", "")
+                    })
+                self._write_script(os.path.join(shard_dir, f"{shards}.js"), "loadShard", shards, details)
+                shards += 1
+
+            index = {
+                "analysis_id": analysis_id,
+                "query": query or (ordered[0].get("original_query") or ordered[0].get("query", "") if ordered else ""),
+                "shard_size": self.shard_size,
+                "page_size": self.PAGE_SIZE,
+                "types": types,
+                "nodes": index_nodes
+            }
+            index_bytes = self._write_script(os.path.join(self.viewer_dir, "index.js"), "loadIndex", index)
+
+            viewer_file = os.path.join(self.viewer_dir, "index.html")
+            with open(viewer_file, "w", encoding="utf-8") as f:
+                f.write(self.VIEWER_HTML)
+
+            self.logger.debug(f"[GENERATE] HTML viewer saved to {viewer_file} ({len(ordered)} nodes, {shards} shards)")
+            return {
+                "viewer_file": viewer_file,
+                "nodes": len(ordered),
+                "shards": shards,
+                "index_bytes": index_bytes
+            }
+
+        except Exception as e:
+            self.logger.error(f"[GENERATE ERROR] Failed to write HTML viewer: {str(e)}", exc_info=True)
+            return {"error": str(e)}
+
+    @classmethod
+    def read_index(cls, viewer_dir: str) -> Dict[str, Any]:
+        """
+        Read the tree index of a viewer back into visualization data.
+
+        Node ids are the pre-order positions and the queries are the short labels of
+        the index, which is enough to lay the tree out again without the shards.
+
+        :param viewer_dir: Viewer directory of an analysis
+        :return: Dictionary with 'nodes', 'edges' and the 'analysis_id'
+        :raises ValueError: If the index is not a viewer tree index
+        """
+
+        with open(os.path.join(viewer_dir, "index.js"), "r", encoding="utf-8") as f:
+            content = f.read()
+        prefix = "DEOT_VIEWER.loadIndex("
+        if not content.startswith(prefix):
+            raise ValueError(f"Not a viewer tree index: {viewer_dir}")
+        index = json.loads(content[len(prefix):content.rindex(")")])
+
+        nodes = []
+        edges = []
+        for i, entry in enumerate(index["nodes"]):
+            parent, type_code, layer, label = entry[:4]
+            node = {"node_id": f"n{i}", "type": index["types"][type_code], "layer": layer, "query": label}
+            nodes.append(node)
+            if parent >= 0:
+                edges.append({"source": f"n{parent}", "target": node["node_id"], "type": node["type"]})
+            if len(entry) > 4:
+                node["duplicate_of"] = f"n{entry[4]}"
+                edges.append({"source": node["node_id"], "target": node["duplicate_of"], "type": "DUPLICATE_OF"})
+        return {"analysis_id": index.get("analysis_id"), "nodes": nodes, "edges": edges}
+
+    @classmethod
+    def read_shards(cls, viewer_dir: str) -> Iterator[Dict[str, Any]]:
+        """
+        Read the node details of a viewer back from its shards, in pre-order.
+
+        :param viewer_dir: Viewer directory of an analysis
+        :return: Iterator over the node details (id, query, focus, questions, summary)
+        """
+
+        shard_dir = os.path.join(viewer_dir, "nodes")
+        number = 0
+        while os.path.exists(os.path.join(shard_dir, f"{number}.js")):
+            with open(os.path.join(shard_dir, f"{number}.js"), "r", encoding="utf-8") as f:
+                content = f.read()
+            yield from json.loads(content[content.index(",") + 1:content.rindex(")")])
+            number += 1
+
+    def open_viewer(self, viewer_file: str) -> bool:
+        """
+        Open a generated viewer in the default browser.
+
+        :param viewer_file: Path to the viewer index.html
+        :return: True if successful, False otherwise
+        """
+        try:
+            if not os.path.exists(viewer_file):
+                self.logger.error(f"[OPEN ERROR] Viewer does not exist: {viewer_file}")
+                return False
+
+            open_in_browser(viewer_file)
+            print(f"Viewer opened in browser: {viewer_file}")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"[OPEN ERROR] Failed to open viewer: {str(e)}", exc_info=True)
+            print(f"Error opening viewer: {str(e)}")
+            print(f"You can manually open the file: {viewer_file}")
+            return False
+
+    # Static page shared by all analyses, the data is read from index.js and the shards.
+    # Node text is only inserted with textContent, never parsed as HTML.
+    VIEWER_HTML = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>DEoT Analysis Viewer</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 0; background-color: #f5f5f5; color: #333; }
+        header { padding: 12px 20px; background: white; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        header h1 { font-size: 18px; margin: 0 0 4px 0; }
+        header .info { color: #666; font-size: 13px; }
+        main { display: flex; height: calc(100vh - 70px); }
+        #tree { flex: 1; overflow: auto; padding: 10px 20px; }
+        #details { width: 40%; overflow: auto; padding: 10px 20px; background: white; border-left: 1px solid #ddd; }
+        ul { list-style: none; margin: 0; padding-left: 20px; }
+        #tree > ul { padding-left: 0; }
+        .row { display: flex; align-items: baseline; gap: 6px; padding: 2px 0; white-space: nowrap; }
+        .toggle { width: 18px; border: none; background: none; cursor: pointer; color: #666; padding: 0; }
+        .label { cursor: pointer; overflow: hidden; text-overflow: ellipsis; }
+        .label:hover { text-decoration: underline; }
+        .selected > .row .label { font-weight: bold; }
+        .badge { font-size: 11px; padding: 0 4px; border-radius: 3px; border: 1px solid #999; }
+        .BREADTH { background: #e6f7ff; border-color: #0066cc; }
+        .DEPTH { background: #f0f7ff; border-color: #003366; }
+        .COMPLETE { background: #f6ffed; border-color: #52c41a; }
+        .ROOT { background: #e1f5fe; border-color: #000; }
+        .ERROR { background: #ffebee; border-color: red; }
+        .DUPLICATE { background: #fafafa; border-color: #999; border-style: dashed; }
+        .count { color: #999; font-size: 12px; }
+        .more { margin: 2px 0 2px 24px; cursor: pointer; }
+        #details h2 { font-size: 15px; }
+        #details .text { white-space: pre-wrap; line-height: 1.4; }
+        #details a { cursor: pointer; color: #0066cc; }
+    </style>
+</head>
+<body>
+    <header>
+        <h1 id="title">DEoT Analysis Viewer</h1>
+        <div class="info" id="info"></div>
+    </header>
+    <main>
+        <div id="tree"></div>
+        <div id="details"><p class="count">Select a node to show its analysis.</p></div>
+    </main>
+    <script>
+    var DEOT_VIEWER = (function () {
+        var index = null, children = [], items = [], shards = {}, pending = {}, selected = -1;
+
+        function element(tag, className, text) {
+            var node = document.createElement(tag);
+            if (className) node.className = className;
+            if (text !== undefined && text !== null) node.textContent = text;
+            return node;
+        }
+
+        function loadIndex(data) {
+            index = data;
+            for (var i = 0; i < index.nodes.length; i++) {
+                children.push([]);
+                var parent = index.nodes[i][0];
+                if (parent >= 0) children[parent].push(i);
+            }
+        }
+
+        function loadShard(number, nodes) {
+            shards[number] = nodes;
+            (pending[number] || []).forEach(function (callback) { callback(nodes); });
+            delete pending[number];
+        }
+
+        function details(i, callback) {
+            var number = Math.floor(i / index.shard_size), offset = i % index.shard_size;
+            if (shards[number]) return callback(shards[number][offset]);
+            if (!pending[number]) {
+                pending[number] = [];
+                var script = document.createElement('script');
+                script.src = 'nodes/' + number + '.js';
+                script.onerror = function () { callback(null); };
+                document.head.appendChild(script);
+            }
+            pending[number].push(function (nodes) { callback(nodes[offset]); });
+        }
+
+        function renderChildren(i, list, start) {
+            var nodes = children[i], end = Math.min(nodes.length, start + index.page_size);
+            for (var k = start; k < end; k++) list.appendChild(item(nodes[k]));
+            if (end < nodes.length) {
+                var more = element('li', 'more count', 'Show ' + Math.min(index.page_size, nodes.length - end) + ' more of ' + (nodes.length - end));
+                more.onclick = function () { list.removeChild(more); renderChildren(i, list, end); };
+                list.appendChild(more);
+            }
+        }
+
+        function expand(i, open) {
+            var li = items[i];
+            if (!li || !children[i].length) return;
+            var list = li.querySelector(':scope > ul');
+            if (!list && open) {
+                list = element('ul');
+                renderChildren(i, list, 0);
+                li.appendChild(list);
+            }
+            if (list) list.style.display = open ? '' : 'none';
+            li.querySelector(':scope > .row > .toggle').textContent = open ? '\\u25BE' : '\\u25B8';
+        }
+
+        function item(i) {
+            var node = index.nodes[i], li = element('li'), row = element('div', 'row');
+            var toggle = element('button', 'toggle', children[i].length ? '\\u25B8' : '');
+            var type = index.types[node[1]];
+            toggle.onclick = function () {
+                var list = li.querySelector(':scope > ul');
+                expand(i, !list || list.style.display === 'none');
+            };
+            row.appendChild(toggle);
+            row.appendChild(element('span', 'badge ' + type, type));
+            var label = element('span', 'label', node[3]);
+            label.onclick = function () { select(i); };
+            row.appendChild(label);
+            if (children[i].length) row.appendChild(element('span', 'count', '(' + children[i].length + ')'));
+            li.appendChild(row);
+            items[i] = li;
+            return li;
+        }
+
+        function reveal(i) {
+            var path = [];
+            for (var p = index.nodes[i][0]; p >= 0; p = index.nodes[p][0]) path.unshift(p);
+            path.forEach(function (p) {
+                expand(p, true);
+                // Children beyond the rendered page are added until the node is shown
+                var list = items[p].querySelector(':scope > ul'), more;
+                while (!items[i] && (more = list.querySelector(':scope > .more'))) more.onclick();
+            });
+            if (items[i]) items[i].scrollIntoView({ block: 'center' });
+        }
+
+        function select(i) {
+            if (selected >= 0 && items[selected]) items[selected].classList.remove('selected');
+            selected = i;
+            if (items[i]) items[i].classList.add('selected');
+            var panel = document.getElementById('details'), node = index.nodes[i];
+            panel.textContent = '';
+            panel.appendChild(element('p', 'count', 'Loading...'));
+            details(i, function (data) {
+                if (selected !== i) return;
+                panel.textContent = '';
+                if (!data) {
+                    panel.appendChild(element('p', 'count', 'Could not load the node shard.'));
+                    return;
+                }
+                panel.appendChild(element('h2', null, data.query || data.original_query || data.id));
+                panel.appendChild(element('p', 'count', index.types[node[1]] + ' \\u00B7 layer ' + node[2] + ' \\u00B7 ' + data.id));
+                if (node.length > 4) {
+                    var link = element('a', null, 'Duplicate of ' + index.nodes[node[4]][3]);
+                    link.onclick = function () { reveal(node[4]); select(node[4]); };
+                    panel.appendChild(element('p')).appendChild(link);
+                }
+                if (data.focus) panel.appendChild(element('p', null, 'Focus: ' + data.focus));
+                if (data.questions.length) {
+                    var questions = element('ul');
+                    data.questions.forEach(function (q) { questions.appendChild(element('li', null, '\\u2022 ' + q)); });
+                    panel.appendChild(questions);
+                }
+                panel.appendChild(element('div', 'text', data.summary));
+            });
+        }
+
+        function start() {
+            var tree = document.getElementById('tree');
+            if (!index) {
+                tree.appendChild(element('p', 'count', 'Tree index (index.js) could not be loaded.'));
+                return;
+            }
+            document.title = 'DEoT \\u00B7 ' + index.analysis_id;
+            document.getElementById('title').textContent = index.query || index.analysis_id;
+            document.getElementById('info').textContent = index.analysis_id + ' \\u00B7 ' + index.nodes.length + ' nodes';
+            var list = element('ul');
+            children.forEach(function (_, i) { if (index.nodes[i][0] < 0) list.appendChild(item(i)); });
+            tree.appendChild(list);
+            children.forEach(function (_, i) { if (index.nodes[i][0] < 0) expand(i, true); });
+        }
+
+        return { loadIndex: loadIndex, loadShard: loadShard, start: start };
+    })();
+    </script>
+    <script src="index.js"></script>
+    <script>DEOT_VIEWER.start();</script>
+</body>
+</html>
+"""
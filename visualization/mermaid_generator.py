@@ -1,21 +1,54 @@
+import html
 import json
 import os
 import re
-import subprocess
-import sys
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Iterator, Tuple
 from utils.logger import setup_logger
+from utils.tracer import traced
+from visualization.html_viewer import open_in_browser
+from visualization.tree_layout import TreeLayout
 
 
 class MermaidGenerator:
     """Generates Mermaid diagram representations of the dual-engine analysis process."""
 
-    def __init__(self, output_dir: str = "output"):
+    # Sanitizer translation table replacing double quotes while markdown markers and Mermaid
+    # brackets are deleted, in one pass over the UTF-8 bytes (ASCII bytes never occur inside
+    # multi-byte characters). Replacements that expand a character are applied separately.
+    SANITIZE_TABLE = bytes.maketrans(b'"', b"'")
+    SANITIZE_DELETE = b'*#{}()[]'
+    SANITIZE_EXPANSIONS = ((':', ': '), ('\n', '<br>'), ('&', 'and'))
+    URL_PATTERN = re.compile(r'http[s]?://\S+')
+
+    # Diagrams up to this size are also returned as mermaid_code and stored in the result
+    INLINE_LIMIT = 100_000
+
+    # SVG geometry in pixels, labels are wrapped to SVG_LABEL_LINES lines of SVG_LINE_CHARS
+    SVG_NODE_WIDTH = 180
+    SVG_NODE_HEIGHT = 56
+    SVG_GAP_X = 20
+    SVG_GAP_Y = 50
+    SVG_MARGIN = 20
+    SVG_LINE_CHARS = 30
+    SVG_LABEL_LINES = 3
+
+    def __init__(
+            self,
+            output_dir: str = "output",
+            max_depth: Optional[int] = None,
+            max_label: Optional[int] = None,
+            page_layers: Optional[int] = None,
+            inline_limit: int = INLINE_LIMIT
+    ):
         """
         Initialize the MermaidGenerator.
         
         :param output_dir: Directory to save generated diagrams
+        :param max_depth: Deepest layer drawn, deeper subtrees are collapsed into their ancestor at this layer
+        :param max_label: Maximum label length in characters, longer labels are truncated
+        :param page_layers: Layers per diagram file, the diagram is split by layer when set
+        :param inline_limit: Maximum diagram size in bytes returned as mermaid_code
         """
         self.logger = setup_logger("MermaidGenerator")
         self.logger.debug("[INIT] Initializing MermaidGenerator...")
@@ -23,13 +56,27 @@ class MermaidGenerator:
         self.output_dir = output_dir
         os.makedirs(self.output_dir, exist_ok=True)
 
+        # Level of detail of large diagrams, None or 0 disables an option
+        self.max_depth = max_depth or None
+        self.max_label = max_label or None
+        self.page_layers = page_layers or None
+        self.inline_limit = inline_limit
+
         # Define node styles based on node types
         self.node_styles = {
             'BREADTH': 'fill:#e6f7ff,stroke:#0066cc',
             'DEPTH': 'fill:#f0f7ff,stroke:#003366',
             'COMPLETE': 'fill:#f6ffed,stroke:#52c41a',
             'ROOT': 'fill:#e1f5fe,stroke:#000',
-            'ERROR': 'fill:#ffebee,stroke:red'
+            'ERROR': 'fill:#ffebee,stroke:red',
+            'DUPLICATE': 'fill:#fafafa,stroke:#999,stroke-dasharray: 5 5'
+        }
+
+        # Styles of the nodes that are not analysis nodes
+        self.extra_styles = {
+            'other': 'fill:white,stroke:#000',
+            'query': 'fill:#fff0f6,stroke:#eb2f96',
+            'stub': 'fill:#fafafa,stroke:#bbb,color:#888'
         }
 
         self.logger.debug(f"[INIT] MermaidGenerator initialized with output_dir={output_dir}")
@@ -39,7 +86,7 @@ class MermaidGenerator:
         Sanitize content for Mermaid diagram.
         
         :param content: Content to sanitize (can be string, dict, or other types)
-        :return: Sanitized string
+        :return: Sanitized string, truncated to max_label characters when set
         """
         try:
             if not content:
@@ -56,203 +103,261 @@ class MermaidGenerator:
                     content = str(content)
             else:
                 content = str(content)
-                
-            # First pass: Remove markdown formatting
-            content = (content
-                .replace('**', '')
-                .replace('*', '')
-                .replace('###', '')
-                .replace('####', '')
-                .replace('#', ''))
-
-            # Second pass: Handle Mermaid special characters
-            content = (content
-                .replace('{{', '')
-                .replace('}}', '')
-                .replace('(', '')
-                .replace(')', '')
-                .replace('[', '')
-                .replace(']', '')
-                .replace('{', '')
-                .replace('}', '')
-                .replace(':', ': ')  # Add space after colons
-                .replace('\n', '<br>')
-                .replace('"', "'")
-                .replace('&', 'and'))
-
-            # Remove extra whitespace
+
+            # Remove URLs before their colons are spaced out
+            if 'http' in content:
+                content = self.URL_PATTERN.sub('', content)
+
+            # Replace special characters and collapse whitespace
+            content = content.encode('utf-8').translate(self.SANITIZE_TABLE, self.SANITIZE_DELETE).decode('utf-8')
+            for character, replacement in self.SANITIZE_EXPANSIONS:
+                if character in content:
+                    content = content.replace(character, replacement)
             content = ' '.join(content.split())
 
-            # Remove URLs
-            content = re.sub(r'http[s]?://\S+', '', content)
+            if self.max_label and len(content) > self.max_label:
+                content = content[:max(self.max_label - 3, 1)]
+                # Do not leave a cut <br> behind
+                if content.rfind('<') > content.rfind('>'):
+                    content = content[:content.rfind('<')]
+                content = content.rstrip() + '...'
 
-            return content.strip()
+            return content
 
         except Exception as e:
             self.logger.error(f"[SANITIZE ERROR] Failed to sanitize content: {str(e)}", exc_info=True)
             return "Error sanitizing content"
 
+    def _plan_pages(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Apply the level of detail and split the diagram into pages.
+
+        Nodes deeper than max_depth are dropped and counted on their ancestor at max_depth.
+        With page_layers, every page holds that many consecutive layers, and the parents of
+        its first layer are drawn as stubs so the edges into the page stay visible.
+
+        :param data: Visualization data containing nodes and edges
+        :return: Pages with their nodes, stub nodes and hidden descendant counts
+        """
+        nodes = [node for node in data.get('nodes', []) if node.get('node_id')]
+        edges = data.get('edges', [])
+        hidden = {}
+
+        if self.max_depth or self.page_layers:
+            parents = {
+                edge['target']: edge['source'] for edge in edges
+                if edge.get('type') != 'DUPLICATE_OF' and edge.get('source') and edge.get('target')
+            }
+
+        if self.max_depth:
+            layers = {node['node_id']: node.get('layer', 0) for node in nodes}
+            visible = []
+            for node in nodes:
+                if node.get('layer', 0) <= self.max_depth:
+                    visible.append(node)
+                    continue
+
+                # Count the node on its ancestor at the depth limit
+                ancestor = parents.get(node['node_id'])
+                while ancestor is not None and layers.get(ancestor, 0) > self.max_depth:
+                    ancestor = parents.get(ancestor)
+                if ancestor is not None:
+                    hidden[ancestor] = hidden.get(ancestor, 0) + 1
+            nodes = visible
+
+        if not self.page_layers:
+            return [{'nodes': nodes, 'stubs': [], 'hidden': hidden}]
+
+        layer_nodes = {}
+        for node in nodes:
+            layer_nodes.setdefault(node.get('layer', 0), []).append(node)
+        layers = sorted(layer_nodes)
+        by_id = {node['node_id']: node for node in nodes}
+
+        pages = []
+        for start in range(0, len(layers), self.page_layers):
+            page_nodes = [node for layer in layers[start:start + self.page_layers] for node in layer_nodes[layer]]
+            stubs = []
+            if start > 0:
+                stub_ids = dict.fromkeys(
+                    parents[node['node_id']] for node in layer_nodes[layers[start]] if node['node_id'] in parents
+                )
+                stubs = [by_id[stub_id] for stub_id in stub_ids if stub_id in by_id]
+            pages.append({'nodes': page_nodes, 'stubs': stubs, 'hidden': hidden})
+
+        return pages or [{'nodes': [], 'stubs': [], 'hidden': hidden}]
+
+    def _root_labels(self, node: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Get the labels of the user query node and the optimized root query.
+
+        :param node: Root node entry
+        :return: Tuple of the user query label and the root label, None where not available
+        """
+        # Check various possible locations for original query
+        original_query = ""
+        if 'original_query' in node:
+            original_query = node.get('original_query', '')
+        elif isinstance(node.get('optimized_query_data'), dict):
+            original_query = node.get('optimized_query_data', {}).get('original_query', '')
+
+        if not original_query:
+            return None, None
+
+        optimized_query = node.get('query', '') or node.get('optimized_query', '')
+        if not optimized_query and isinstance(node.get('optimized_query_data'), dict):
+            optimized_query = node.get('optimized_query_data', {}).get('optimized_query', '')
+
+        root_label = f"Optimized Query: '{self._sanitize_content(optimized_query)}'" if optimized_query else None
+        return f"User Query: '{self._sanitize_content(original_query)}'", root_label
+
+    def _node_label(self, node: Dict[str, Any]) -> str:
+        """
+        Get the label of a node from its query, its summary or its id.
+
+        :param node: Node entry
+        :return: Sanitized label
+        """
+        if node.get('query'):
+            label = self._sanitize_content(node['query'])
+        elif node.get('node_summary'):
+            label = self._sanitize_content(node['node_summary'])
+        else:
+            label = node['node_id'].split('_')[-1]
+        return label or "..."
+
+    def _flowchart_lines(self, page: Dict[str, Any], edges: List[Dict[str, Any]]) -> Iterator[str]:
+        """
+        Generate the Mermaid flowchart of one page line by line.
+
+        Node styles are emitted once as class definitions and nodes get short ids, so the
+        size of the diagram grows with the labels rather than with the analysis ids.
+
+        :param page: Page from _plan_pages
+        :param edges: All edges of the visualization data, edges to nodes outside the page are skipped
+        :return: Iterator over the lines of the flowchart
+        """
+        yield "flowchart TB"
+        yield ""
+        for node_type, node_style in self.node_styles.items():
+            yield f"    classDef {node_type.lower()} {node_style}"
+        for class_name, class_style in self.extra_styles.items():
+            yield f"    classDef {class_name} {class_style}"
+        yield ""
+
+        ids = {}
+        extra_edges = []
+
+        if page['stubs']:
+            yield "    subgraph Parents[Parents on the previous page]"
+            for node in page['stubs']:
+                ids[node['node_id']] = f"n{len(ids)}"
+                yield f"        {ids[node['node_id']]}[{self._node_label(node)}]:::stub"
+            yield "    end"
+
+        layer_nodes = {}
+        for node in page['nodes']:
+            layer_nodes.setdefault(node.get('layer', 0), []).append(node)
+
+        # Add nodes layer by layer
+        for layer, nodes in sorted(layer_nodes.items()):
+            yield f"    subgraph Layer_{layer}[Layer {layer}]"
+            query_nodes = []
+
+            for node in nodes:
+                node_id = node['node_id']
+                short_id = ids[node_id] = f"n{len(ids)}"
+                node_type = node.get('type', 'UNKNOWN')
+                node_content = None
+
+                # Add the user query in front of the root, which shows the optimized query
+                if layer == 1 and node_type == 'ROOT':
+                    query_label, node_content = self._root_labels(node)
+                    if query_label:
+                        query_id = f"{short_id}_query"
+                        query_nodes.append(f"        {query_id}[\"{query_label}\"]:::query")
+                        extra_edges.append(f"    {query_id} -->|OPTIMIZE| {short_id}")
+
+                node_content = node_content or self._node_label(node)
+                if page['hidden'].get(node_id):
+                    node_content += f"<br>+{page['hidden'][node_id]} collapsed nodes"
+
+                class_name = node_type.lower() if node_type in self.node_styles else 'other'
+
+                # Select node shape based on type
+                if node_type == 'DEPTH':
+                    yield f"        {short_id}({node_content}):::{class_name}"
+                elif node_type == 'COMPLETE':
+                    yield f"        {short_id}{{{node_content}}}:::{class_name}"
+                else:
+                    yield f"        {short_id}[{node_content}]:::{class_name}"
+
+            yield from query_nodes
+            yield "    end"
+
+        yield ""
+        yield from extra_edges
+
+        for edge in edges:
+            source = ids.get(edge.get('source', ''))
+            target = ids.get(edge.get('target', ''))
+            if not source or not target:
+                continue
+
+            if edge.get('type') in ['BREADTH', 'DEPTH']:
+                yield f"    {source} -->|{edge.get('type')}| {target}"
+            elif edge.get('type') == 'DUPLICATE':
+                yield f"    {source} -.->|DUPLICATE| {target}"
+            elif edge.get('type') == 'DUPLICATE_OF':
+                yield f"    {source} -.- {target}"
+            else:
+                yield f"    {source} --> {target}"
+
     def _generate_flowchart(self, data: Dict[str, Any]) -> str:
         """
-        Generate Mermaid flowchart code.
+        Generate Mermaid flowchart code of the first page.
         
         :param data: Visualization data containing nodes and edges
         :return: Mermaid flowchart code as string
         """
         try:
-            lines = ["flowchart TB"]
-            style_lines = []
-            subgraph_lines = []
-            decision_lines = []
-            extra_nodes = []  # Store extra nodes (like original query nodes)
-            extra_edges = []  # Store extra connections
-
-            # Track layers for subgraphs
-            layer_nodes = {}
-
-            # First pass: Organize nodes by layer
-            for node in data.get('nodes', []):
-                layer = node.get('layer', 0)
-                if layer not in layer_nodes:
-                    layer_nodes[layer] = []
-                layer_nodes[layer].append(node)
-
-            # Add nodes layer by layer
-            for layer, nodes in sorted(layer_nodes.items()):
-                subgraph_id = f"Layer_{layer}"
-                subgraph_lines.append(f"    subgraph {subgraph_id}[Layer {layer}]")
-                
-                # Add original query node in the first layer
-                if layer == 1:
-                    # Find root node
-                    for node in nodes:
-                        node_id = node.get('node_id', '')
-                        if not node_id:
-                            continue
-
-                        # Handle root node, find original query
-                        if node.get('type') == 'ROOT':
-                            # Check various possible locations for original query
-                            original_query = ""
-                            
-                            # Directly check node's original_query property
-                            if 'original_query' in node:
-                                original_query = node.get('original_query', '')
-                            # Check optimized_query_data dictionary
-                            elif isinstance(node.get('optimized_query_data'), dict):
-                                original_query = node.get('optimized_query_data', {}).get('original_query', '')
-                            
-                            if original_query:
-                                # Create original query node ID
-                                original_query_id = f"{node_id}_original"
-                                
-                                # Get optimized query
-                                optimized_query = node.get('query', '') or node.get('optimized_query', '')
-                                if not optimized_query and isinstance(node.get('optimized_query_data'), dict):
-                                    optimized_query = node.get('optimized_query_data', {}).get('optimized_query', '')
-                                
-                                # Add original query node
-                                original_content = f"User Query: '{self._sanitize_content(original_query)}'"
-                                extra_nodes.append(f"        {original_query_id}[\"{original_content}\"]")
-                                
-                                # Add arrow from original query to optimized query
-                                extra_edges.append(f"    {original_query_id} -->|OPTIMIZE| {node_id}")
-                                
-                                # Set original query node style
-                                style_lines.append(f"style {original_query_id} fill:#fff0f6,stroke:#eb2f96")
-                                
-                                # Modify root node content to show only optimized query
-                                if optimized_query:
-                                    node['node_content'] = f"Optimized Query: '{self._sanitize_content(optimized_query)}'"
-                
-                # Process each node
-                for node in nodes:
-                    node_id = node.get('node_id', '')
-                    if not node_id:
-                        continue
-
-                    # Get node content
-                    if 'node_content' in node:
-                        node_content = node['node_content']
-                    else:
-                        query = node.get('query', '')
-                        node_summary = node.get('node_summary', '')
-                        if query:
-                            node_content = self._sanitize_content(query)
-                        elif node_summary:
-                            node_content = self._sanitize_content(node_summary)
-                        else:
-                            node_content = node_id.split('_')[-1]
-                    
-                    if not node_content:
-                        node_content = "..."
-
-                    node_type = node.get('type', 'UNKNOWN')
-
-                    # Select node shape based on type
-                    if node_type == 'BREADTH':
-                        node_def = f"        {node_id}[{node_content}]"
-                    elif node_type == 'DEPTH':
-                        node_def = f"        {node_id}({node_content})"
-                    elif node_type == 'COMPLETE':
-                        node_def = f"        {node_id}{{{node_content}}}"
-                    else:
-                        node_def = f"        {node_id}[{node_content}]"
-
-                    subgraph_lines.append(node_def)
-
-                    # Add style based on node type
-                    node_style = self.node_styles.get(node_type, "fill:white,stroke:#000")
-                    style_lines.append(f"style {node_id} {node_style}")
-                
-                # Add extra nodes in the first layer (original query)
-                if layer == 1:
-                    subgraph_lines.extend(extra_nodes)
-                
-                subgraph_lines.append("    end")
-
-            # Add edges
-            edge_lines = []
-            
-            # Add arrow from original query to optimized query
-            edge_lines.extend(extra_edges)
-            
-            # Add other edges
-            for edge in data.get('edges', []):
-                source = edge.get('source', '')
-                target = edge.get('target', '')
-                
-                if not source or not target:
-                    continue
-                    
-                if edge.get('type') in ['BREADTH', 'DEPTH']:
-                    edge_lines.append(f"    {source} -->|{edge.get('type')}| {target}")
-                else:
-                    edge_lines.append(f"    {source} --> {target}")
-
-            # Combine all sections
-            return "\n".join(
-                lines + 
-                [""] +  # Empty line for readability
-                subgraph_lines +
-                [""] +  # Empty line for readability
-                edge_lines +
-                [""] +  # Empty line for readability
-                decision_lines +
-                [""] +  # Empty line for readability
-                style_lines
-            )
+            page = self._plan_pages(data)[0]
+            return "\n".join(self._flowchart_lines(page, data.get('edges', [])))
 
         except Exception as e:
             self.logger.error(f"[FLOWCHART ERROR] Failed to generate flowchart: {str(e)}", exc_info=True)
             return "flowchart TB\n    error[\"Error generating flowchart\"]"
 
-    def generate(self, visualization_data: Dict[str, Any], analysis_id: str) -> Dict[str, Any]:
+    def _write_flowchart(self, page: Dict[str, Any], edges: List[Dict[str, Any]], path: str) -> int:
+        """
+        Stream the flowchart of one page to a file without building the diagram string.
+
+        :param page: Page from _plan_pages
+        :param edges: All edges of the visualization data
+        :param path: Output file path
+        :return: Number of bytes written
+        """
+        size = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for line in self._flowchart_lines(page, edges):
+                f.write(line)
+                f.write("\n")
+                size += len(line.encode('utf-8')) + 1
+        return size
+
+    @traced()
+    def generate(
+            self,
+            visualization_data: Dict[str, Any],
+            analysis_id: str,
+            llm_usage: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Generate Mermaid diagram and save to files.
         
         :param visualization_data: Dictionary containing nodes and edges
         :param analysis_id: Unique identifier for the analysis
+        :param llm_usage: Optional LLM usage summary to include in the metadata
         :return: Dictionary with file paths and metadata
         """
         try:
@@ -264,35 +369,59 @@ class MermaidGenerator:
             mermaid_file = os.path.join(self.output_dir, f"{analysis_id}.mmd")
             metadata_file = os.path.join(self.output_dir, f"{analysis_id}_metadata.json")
 
-            mermaid_code = self._generate_flowchart(visualization_data)
+            # Stream every page to its file, the first page keeps the diagram file name
+            edges = visualization_data.get('edges', [])
+            pages = self._plan_pages(visualization_data)
+            mermaid_files = []
+            sizes = []
+            for number, page in enumerate(pages, 1):
+                page_file = mermaid_file if number == 1 else os.path.join(self.output_dir, f"{analysis_id}_page{number}.mmd")
+                sizes.append(self._write_flowchart(page, edges, page_file))
+                mermaid_files.append(page_file)
             
             # Prepare metadata
             metadata = {
                 'analysis_id': analysis_id,
                 'timestamp': timestamp,
                 'total_nodes': len(visualization_data.get('nodes', [])),
-                'total_edges': len(visualization_data.get('edges', [])),
+                'total_edges': len(edges),
                 'node_types': self._count_node_types(visualization_data.get('nodes', [])),
                 'max_depth': self._calculate_max_depth(visualization_data.get('nodes', [])),
-                'mermaid_file': mermaid_file
+                'mermaid_file': mermaid_file,
+                'mermaid_bytes': sum(sizes)
             }
-
-            # Write files
-            with open(mermaid_file, 'w', encoding='utf-8') as f:
-                f.write(mermaid_code)
+            if self.max_depth or self.max_label or self.page_layers:
+                metadata['level_of_detail'] = {
+                    'max_depth': self.max_depth,
+                    'max_label': self.max_label,
+                    'page_layers': self.page_layers,
+                    'collapsed_nodes': sum(pages[0]['hidden'].values())
+                }
+            if len(mermaid_files) > 1:
+                metadata['mermaid_pages'] = mermaid_files
+            if llm_usage:
+                metadata['llm_usage'] = llm_usage
 
             with open(metadata_file, 'w', encoding='utf-8') as f:
                 json.dump(metadata, f, indent=2, ensure_ascii=False)
 
-            self.logger.debug(f"[GENERATE] Mermaid diagram saved to {mermaid_file}")
-            
-            return {
+            result = {
                 'mermaid_file': mermaid_file,
                 'metadata_file': metadata_file,
-                'metadata': metadata,
-                'mermaid_code': mermaid_code
+                'metadata': metadata
             }
 
+            # Small diagrams are also kept in the analysis result
+            if sizes[0] <= self.inline_limit:
+                with open(mermaid_file, 'r', encoding='utf-8') as f:
+                    result['mermaid_code'] = f.read()
+            else:
+                self.logger.info(f"[GENERATE] Diagram of {sizes[0]} bytes is only written to {mermaid_file}")
+
+            self.logger.debug(f"[GENERATE] Mermaid diagram saved to {mermaid_file}")
+            
+            return result
+
         except Exception as e:
             self.logger.error(f"[GENERATE ERROR] Failed to generate files: {str(e)}", exc_info=True)
             return {
@@ -300,6 +429,142 @@ class MermaidGenerator:
                 'timestamp': datetime.now().isoformat()
             }
     
+    def _wrap_label(self, text: str, hidden: int = 0) -> List[str]:
+        """
+        Wrap a plain text label into the lines of an SVG node.
+
+        :param text: Label text
+        :param hidden: Collapsed nodes noted on the last line
+        :return: Label lines, the last kept line ends with '...' when text is cut
+        """
+        words = text.split()
+        cut = bool(self.max_label and len(text) > self.max_label)
+        if cut:
+            words = text[:max(self.max_label - 3, 1)].split()
+        max_lines = self.SVG_LABEL_LINES - (1 if hidden else 0)
+
+        lines = []
+        line = ''
+        used = 0
+        for word in words:
+            if len(word) > self.SVG_LINE_CHARS:
+                word = word[:self.SVG_LINE_CHARS - 3] + '...'
+            if line and len(line) + 1 + len(word) > self.SVG_LINE_CHARS:
+                lines.append(line)
+                line = ''
+                if len(lines) == max_lines:
+                    break
+            line = f"{line} {word}" if line else word
+            used += 1
+        if line and len(lines) < max_lines:
+            lines.append(line)
+        if lines and (cut or used < len(words)):
+            lines[-1] = lines[-1][:self.SVG_LINE_CHARS - 3].rstrip() + '...'
+        if hidden:
+            lines.append(f"+{hidden} collapsed nodes")
+        return lines
+
+    def _svg_lines(self, visualization_data: Dict[str, Any]) -> Iterator[str]:
+        """
+        Lay out the visualization data as a layered tree and yield the SVG document line by line.
+
+        :param visualization_data: Dictionary containing nodes and edges
+        :return: Iterator over the SVG lines
+        """
+        layout = TreeLayout()
+        # max_depth counts layers from 1 at the root, the layout counts depth from 0
+        roots = layout.build(visualization_data, self.max_depth - 1 if self.max_depth else None)
+        nodes, width, depth = layout.layout(roots)
+
+        step_x = self.SVG_NODE_WIDTH + self.SVG_GAP_X
+        step_y = self.SVG_NODE_HEIGHT + self.SVG_GAP_Y
+        svg_width = round(width * step_x + self.SVG_NODE_WIDTH + 2 * self.SVG_MARGIN) if nodes else 2 * self.SVG_MARGIN
+        svg_height = round(depth * step_y + self.SVG_NODE_HEIGHT + 2 * self.SVG_MARGIN) if nodes else 2 * self.SVG_MARGIN
+
+        def position(node) -> Tuple[float, float]:
+            return self.SVG_MARGIN + node.x * step_x, self.SVG_MARGIN + node.depth * step_y
+
+        yield (f'<svg xmlns="http://www.w3.org/2000/svg" width="{svg_width}" height="{svg_height}" '
+               f'viewBox="0 0 {svg_width} {svg_height}" font-family="Arial, sans-serif" font-size="11">')
+        yield '<style>'
+        for node_type, style in self.node_styles.items():
+            yield f'.{node_type.lower()} rect{{{style.replace(",", ";")}}}'
+        yield f'.other rect{{{self.extra_styles["other"].replace(",", ";")}}}'
+        yield 'text{fill:#333} .edge{fill:none;stroke:#999} .link{fill:none;stroke:#bbb;stroke-dasharray:4 4}'
+        yield '</style>'
+
+        # Edges first so that the nodes are drawn over them
+        half = self.SVG_NODE_WIDTH / 2
+        yield '<g class="edges">'
+        for node in nodes:
+            if node.parent is None:
+                continue
+            px, py = position(node.parent)
+            cx, cy = position(node)
+            x1, y1, x2 = px + half, py + self.SVG_NODE_HEIGHT, cx + half
+            middle = (y1 + cy) / 2
+            yield f'<path class="edge" d="M{x1:.1f} {y1:.1f}C{x1:.1f} {middle:.1f} {x2:.1f} {middle:.1f} {x2:.1f} {cy:.1f}"/>'
+        placed = {node.node_id: node for node in nodes}
+        for edge in visualization_data.get('edges', []):
+            if edge.get('type') == 'DUPLICATE_OF' and edge.get('source') in placed and edge.get('target') in placed:
+                (sx, sy), (tx, ty) = position(placed[edge['source']]), position(placed[edge['target']])
+                yield (f'<path class="link" d="M{sx + half:.1f} {sy + self.SVG_NODE_HEIGHT / 2:.1f}'
+                       f'L{tx + half:.1f} {ty + self.SVG_NODE_HEIGHT / 2:.1f}"/>')
+        yield '</g>'
+
+        yield '<g class="nodes">'
+        for node in nodes:
+            entry = node.entry
+            node_type = entry.get('type') or 'UNKNOWN'
+            css = node_type.lower() if node_type in self.node_styles else 'other'
+            text = ' '.join(str(entry.get('original_query') or entry.get('query') or node.node_id).split())
+            lines = self._wrap_label(text, node.hidden)
+            x, y = position(node)
+            top = y + (self.SVG_NODE_HEIGHT - 13 * len(lines)) / 2 + 10
+            yield f'<g class="{css}" transform="translate({x:.1f},{y:.1f})">'
+            yield f'<title>{html.escape(node_type)}: {html.escape(text)}</title>'
+            yield f'<rect width="{self.SVG_NODE_WIDTH}" height="{self.SVG_NODE_HEIGHT}" rx="4"/>'
+            yield f'<text x="{half:.0f}" text-anchor="middle">'
+            for i, line in enumerate(lines):
+                yield f'<tspan x="{half:.0f}" y="{top - y + 13 * i:.1f}">{html.escape(line)}</tspan>'
+            yield '</text></g>'
+        yield '</g>'
+        yield '</svg>'
+
+    def generate_svg(
+            self,
+            visualization_data: Dict[str, Any],
+            analysis_id: str,
+            output_file: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Render the analysis tree to an SVG file without a browser or Mermaid runtime.
+
+        Nodes are placed with the Reingold-Tilford layout of TreeLayout, one row per
+        layer. max_depth and max_label apply as in the Mermaid diagram, page_layers does not.
+
+        :param visualization_data: Dictionary containing nodes and edges
+        :param analysis_id: Unique identifier for the analysis
+        :param output_file: SVG file path, <analysis_id>.svg in the output directory if None
+        :return: Dictionary with the SVG file path and size
+        """
+        try:
+            svg_file = output_file or os.path.join(self.output_dir, f"{analysis_id}.svg")
+            self.logger.debug(f"[SVG] Rendering {analysis_id} to {svg_file}")
+
+            size = 0
+            with open(svg_file, 'w', encoding='utf-8') as f:
+                for line in self._svg_lines(visualization_data):
+                    f.write(line)
+                    f.write("\n")
+                    size += len(line.encode('utf-8')) + 1
+
+            return {'svg_file': svg_file, 'svg_bytes': size}
+
+        except Exception as e:
+            self.logger.error(f"[SVG ERROR] Failed to render SVG: {str(e)}", exc_info=True)
+            return {'error': str(e)}
+
     def open_diagram(self, mermaid_file: str) -> bool:
         """
         Open the generated Mermaid diagram with the default application.
@@ -373,12 +638,7 @@ class MermaidGenerator:
             self.logger.debug(f"[OPEN] Created HTML file: {html_file}")
             
             # Open the HTML file with default browser
-            if sys.platform == 'darwin':  # macOS
-                subprocess.run(['open', html_file])
-            elif sys.platform == 'win32':  # Windows
-                os.startfile(html_file)
-            else:  # Linux
-                subprocess.run(['xdg-open', html_file])
+            open_in_browser(html_file)
                 
             print(f"Visualization opened in browser: {html_file}")
             return True
@@ -0,0 +1,249 @@
+from typing import Dict, Any, List, Optional, Tuple
+
+
+class LayoutNode:
+    """Node of a tree being laid out, with the working fields of the layout algorithm."""
+
+    __slots__ = (
+        "node_id", "entry", "parent", "children", "index", "depth", "hidden",
+        "x", "mod", "thread", "ancestor", "change", "shift"
+    )
+
+    def __init__(self, node_id: str, entry: Dict[str, Any]):
+        self.node_id = node_id
+        self.entry = entry
+        self.parent = None
+        self.children = []
+        self.index = 0
+        self.depth = 0
+        self.hidden = 0
+        self.x = 0.0
+        self.mod = 0.0
+        self.thread = None
+        self.ancestor = self
+        self.change = 0.0
+        self.shift = 0.0
+
+    def left(self) -> Optional["LayoutNode"]:
+        """Next node on the left contour."""
+        return self.thread or (self.children[0] if self.children else None)
+
+    def right(self) -> Optional["LayoutNode"]:
+        """Next node on the right contour."""
+        return self.thread or (self.children[-1] if self.children else None)
+
+    def left_sibling(self) -> Optional["LayoutNode"]:
+        """Sibling directly on the left, None for the first child."""
+        return self.parent.children[self.index - 1] if self.parent is not None and self.index > 0 else None
+
+
+class TreeLayout:
+    """
+    TreeLayout places the nodes of the visualization data as a layered tree with the
+    Reingold-Tilford algorithm, in the linear time variant of Buchheim, Junger and
+    Leipert. Parents are centered over their children, subtrees are packed as closely
+    as their contours allow, and identical subtrees get identical shapes.
+
+    Both tree walks are iterative, so deep trees do not hit the recursion limit.
+    Coordinates are in layout units: x is in node slots and y is the depth of the node.
+    """
+
+    def __init__(self, distance: float = 1.0):
+        """
+        Initialize TreeLayout.
+
+        :param distance: Minimum horizontal distance between neighboring nodes of a layer
+        """
+        self.distance = distance
+
+    def build(self, visualization_data: Dict[str, Any], max_depth: Optional[int] = None) -> List[LayoutNode]:
+        """
+        Build the layout tree from the visualization data.
+
+        DUPLICATE_OF edges are links between existing nodes and do not shape the tree.
+        Nodes without a parent in the data become roots of their own trees.
+
+        :param visualization_data: Dictionary containing nodes and edges
+        :param max_depth: Deepest depth kept, 0 for the root, deeper nodes are counted on their ancestor
+        :return: Root nodes
+        """
+
+        nodes = {}
+        for entry in visualization_data.get("nodes", []):
+            if entry.get("node_id"):
+                nodes[entry["node_id"]] = LayoutNode(entry["node_id"], entry)
+
+        for edge in visualization_data.get("edges", []):
+            child = nodes.get(edge.get("target"))
+            parent = nodes.get(edge.get("source"))
+            if edge.get("type") == "DUPLICATE_OF" or child is None or parent is None or child.parent is not None or child is parent:
+                continue
+            child.parent = parent
+            parent.children.append(child)
+
+        roots = [node for node in nodes.values() if node.parent is None]
+
+        # Set depths from the roots, which also drops any cycle without a root
+        stack = list(roots)
+        while stack:
+            node = stack.pop()
+            for i, child in enumerate(node.children):
+                child.index = i
+                child.depth = node.depth + 1
+                stack.append(child)
+
+        if max_depth is not None:
+            for root in roots:
+                self._collapse(root, max_depth)
+        return roots
+
+    def _collapse(self, root: LayoutNode, max_depth: int) -> None:
+        """Remove the nodes deeper than max_depth, counting them on their ancestor at max_depth."""
+
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node.depth < max_depth:
+                stack.extend(node.children)
+                continue
+            hidden = 0
+            below = list(node.children)
+            while below:
+                child = below.pop()
+                hidden += 1
+                below.extend(child.children)
+            node.hidden = hidden
+            node.children = []
+
+    def layout(self, roots: List[LayoutNode]) -> Tuple[List[LayoutNode], float, int]:
+        """
+        Compute the positions of all nodes, trees of several roots are placed side by side.
+
+        :param roots: Root nodes returned by build
+        :return: Tuple of the nodes in pre-order, the width in slots and the depth of the deepest node
+        """
+
+        placed = []
+        offset = 0.0
+        max_depth = 0
+        for root in roots:
+            self._first_walk(root)
+            nodes = self._second_walk(root)
+            left = min(node.x for node in nodes)
+            right = max(node.x for node in nodes)
+            for node in nodes:
+                node.x += offset - left
+                max_depth = max(max_depth, node.depth)
+            offset += right - left + self.distance
+            placed.extend(nodes)
+        return placed, max(offset - self.distance, 0.0), max_depth
+
+    def _first_walk(self, root: LayoutNode) -> None:
+        """Compute preliminary x coordinates and modifiers bottom-up."""
+
+        # Post-order, each finished child is apportioned against its left siblings
+        # before the next sibling subtree is walked, as in the recursive algorithm
+        default_ancestors = {}
+        stack = [(root, False)]
+        while stack:
+            node, walked = stack.pop()
+            if not walked:
+                node.x = node.mod = node.change = node.shift = 0.0
+                node.thread = None
+                node.ancestor = node
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.children))
+                continue
+
+            sibling = node.left_sibling()
+            if node.children:
+                self._execute_shifts(node)
+                midpoint = (node.children[0].x + node.children[-1].x) / 2
+                if sibling is not None:
+                    node.x = sibling.x + self.distance
+                    node.mod = node.x - midpoint
+                else:
+                    node.x = midpoint
+            elif sibling is not None:
+                node.x = sibling.x + self.distance
+
+            parent = node.parent
+            if parent is not None:
+                default = default_ancestors.get(id(parent), parent.children[0])
+                default_ancestors[id(parent)] = self._apportion(node, default)
+
+    def _apportion(self, node: LayoutNode, default_ancestor: LayoutNode) -> LayoutNode:
+        """Move the subtree of a node right until it clears the subtrees of its left siblings."""
+
+        sibling = node.left_sibling()
+        if sibling is None:
+            return default_ancestor
+
+        inner_right = outer_right = node
+        inner_left = sibling
+        outer_left = node.parent.children[0]
+        shift_inner_right = shift_outer_right = node.mod
+        shift_inner_left = inner_left.mod
+        shift_outer_left = outer_left.mod
+
+        while inner_left.right() is not None and inner_right.left() is not None:
+            inner_left = inner_left.right()
+            inner_right = inner_right.left()
+            outer_left = outer_left.left()
+            outer_right = outer_right.right()
+            outer_right.ancestor = node
+            shift = (inner_left.x + shift_inner_left) - (inner_right.x + shift_inner_right) + self.distance
+            if shift > 0:
+                ancestor = inner_left.ancestor if inner_left.ancestor.parent is node.parent else default_ancestor
+                self._move_subtree(ancestor, node, shift)
+                shift_inner_right += shift
+                shift_outer_right += shift
+            shift_inner_left += inner_left.mod
+            shift_inner_right += inner_right.mod
+            shift_outer_left += outer_left.mod
+            shift_outer_right += outer_right.mod
+
+        if inner_left.right() is not None and outer_right.right() is None:
+            outer_right.thread = inner_left.right()
+            outer_right.mod += shift_inner_left - shift_outer_right
+        else:
+            if inner_right.left() is not None and outer_left.left() is None:
+                outer_left.thread = inner_right.left()
+                outer_left.mod += shift_inner_right - shift_outer_left
+            default_ancestor = node
+        return default_ancestor
+
+    @staticmethod
+    def _move_subtree(left: LayoutNode, right: LayoutNode, shift: float) -> None:
+        """Shift a subtree and spread the shift over the siblings between the two subtrees."""
+
+        subtrees = right.index - left.index
+        right.change -= shift / subtrees
+        right.shift += shift
+        left.change += shift / subtrees
+        right.x += shift
+        right.mod += shift
+
+    @staticmethod
+    def _execute_shifts(node: LayoutNode) -> None:
+        """Apply the shifts spread by _move_subtree to the children of a node."""
+
+        shift = change = 0.0
+        for child in reversed(node.children):
+            child.x += shift
+            child.mod += shift
+            change += child.change
+            shift += child.shift + change
+
+    @staticmethod
+    def _second_walk(root: LayoutNode) -> List[LayoutNode]:
+        """Add the modifiers of the ancestors to get the final x coordinates, top-down."""
+
+        nodes = []
+        stack = [(root, 0.0)]
+        while stack:
+            node, modifier = stack.pop()
+            node.x += modifier
+            nodes.append(node)
+            stack.extend((child, modifier + node.mod) for child in reversed(node.children))
+        return nodes